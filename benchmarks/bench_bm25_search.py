@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Compare BM25 query latency: rank_bm25 full scan + sort vs. the inverted index,
+plus batched ``top_k_many`` throughput.
+
+    python benchmarks/bench_bm25_search.py --sizes 100000 1000000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.search.inverted import InvertedIndex  # noqa: E402
+
+
+def synthetic_corpus(n_sections, vocab_size=50000, mean_len=80, seed=0):
+    """Zipf-distributed tokens so a few terms are common and most are rare."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"t{i}" for i in range(vocab_size)])
+    lengths = rng.poisson(mean_len, n_sections)
+    ranks = np.minimum(rng.zipf(1.2, int(lengths.sum())), vocab_size) - 1
+    tokens = vocab[ranks].tolist()
+    corpus, pos = [], 0
+    for n in lengths.tolist():
+        corpus.append(tokens[pos : pos + n])
+        pos += n
+    return corpus
+
+
+def sample_queries(corpus, n_queries, seed=1):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n_queries):
+        doc = rng.choice([d for d in rng.sample(corpus, 10) if d] or [["t0"]])
+        queries.append(rng.sample(doc, min(3, len(doc))))
+    return queries
+
+
+def time_queries(fn, queries):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1], help="Batch search threads"
+    )
+    parser.add_argument(
+        "--skip-baseline", action="store_true", help="Do not build rank_bm25"
+    )
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        corpus = synthetic_corpus(n)
+        queries = sample_queries(corpus, args.queries)
+        print(f"== {n:,} sections")
+
+        start = time.perf_counter()
+        index = InvertedIndex.build(corpus)
+        print(f"  inverted  build {time.perf_counter() - start:8.2f}s")
+        p50, worst = time_queries(lambda q: index.top_k(q, args.k), queries)
+        print(f"  inverted  query p50 {p50:8.2f}ms  max {worst:8.2f}ms")
+        for workers in args.workers:
+            start = time.perf_counter()
+            index.top_k_many(queries, args.k, workers=workers)
+            qps = len(queries) / (time.perf_counter() - start)
+            print(f"  batch     {workers:2d} worker(s) {qps:8.1f} queries/s")
+
+        if args.skip_baseline:
+            continue
+        from rank_bm25 import BM25Okapi
+
+        start = time.perf_counter()
+        okapi = BM25Okapi(corpus)
+        print(f"  rank_bm25 build {time.perf_counter() - start:8.2f}s")
+        ids = list(range(n))
+
+        def baseline(q):
+            scores = okapi.get_scores(q)
+            return sorted(zip(ids, scores), key=lambda x: x[1], reverse=True)[: args.k]
+
+        base_p50, base_worst = time_queries(baseline, queries)
+        print(f"  rank_bm25 query p50 {base_p50:8.2f}ms  max {base_worst:8.2f}ms")
+        print(f"  speed-up (p50) {base_p50 / p50:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compare the previous per-section evidence extraction (two regex searches per
+section) with one ``DocumentEvidence`` scan of the whole document, on flat
+sections (PDF) and on nested sections whose bodies contain their subsections
+(HTML).
+
+    python benchmarks/bench_evidence.py --sections 1000 10000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.evidence import DocumentEvidence, extract_recommendations  # noqa: E402
+
+CLASS_PATTERN = re.compile(r"\bClass\s+(I{1,3}|IIa|IIb|III)\b", re.IGNORECASE)
+LEVEL_PATTERN = re.compile(r"\b(Level|Evidence)\s+(A|B|C)\b", re.IGNORECASE)
+
+PROSE = (
+    "In patients with chronic heart failure and reduced ejection fraction, "
+    "treatment should be titrated to target doses as tolerated while renal "
+    "function and potassium are monitored at each visit. "
+)
+GRADED = [
+    "Beta-blockers are recommended to reduce mortality (Class I, Level of Evidence: A). ",
+    "We suggest SGLT2 inhibitors (strong recommendation, moderate-quality evidence). ",
+    "Screening is recommended for adults aged 50 to 75 years (USPSTF Grade A). ",
+    "Offer cardiac rehabilitation (level of evidence: 1+). ",
+]
+
+
+def legacy_extract(text):
+    cls_m = CLASS_PATTERN.search(text)
+    lvl_m = LEVEL_PATTERN.search(text)
+    cls = cls_m.group(1) if cls_m else None
+    lvl = lvl_m.group(2).upper() if lvl_m else None
+    return lvl or cls
+
+
+def synthetic_sections(n, seed=0):
+    rng = random.Random(seed)
+    sections = []
+    for _ in range(n):
+        body = [PROSE] * rng.randint(2, 8)
+        if rng.random() < 0.4:
+            body.insert(rng.randrange(len(body)), rng.choice(GRADED))
+        sections.append("".join(body).strip())
+    return sections
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def per_section(texts):
+    return [legacy_extract(t) for t in texts]
+
+
+def document_level(texts, ranges):
+    text = "\n".join(texts)
+    offsets = [0]
+    for t in texts:
+        offsets.append(offsets[-1] + len(t) + 1)
+    evidence = DocumentEvidence(text)
+    return [evidence.summary(offsets[a], offsets[b] - 1) for a, b in ranges]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument(
+        "--nesting", type=int, default=4, help="Subsections per HTML parent"
+    )
+    args = parser.parse_args()
+
+    for n in args.sections:
+        texts = synthetic_sections(n)
+        size = sum(map(len, texts)) / 1e6
+        print(f"== {n:,} sections ({size:.1f} MB)")
+
+        flat = [(i, i + 1) for i in range(n)]
+        legacy, _ = timed(lambda: per_section(texts))
+        fast, _ = timed(lambda: document_level(texts, flat))
+        print(f"  flat    per-section {legacy:7.3f}s  document {fast:7.3f}s")
+
+        # Each parent body holds its own text plus that of its subsections
+        step = args.nesting + 1
+        nested = flat + [(i, min(i + step, n)) for i in range(0, n, step)]
+        bodies = ["\n".join(texts[a:b]) for a, b in nested]
+        legacy, _ = timed(lambda: per_section(bodies))
+        fast, _ = timed(lambda: document_level(texts, nested))
+        print(f"  nested  per-section {legacy:7.3f}s  document {fast:7.3f}s")
+
+        elapsed, recs = timed(lambda: extract_recommendations("\n".join(texts)))
+        print(f"  {len(recs):,} recommendations with offsets in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
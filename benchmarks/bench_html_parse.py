@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Time ``parse_html`` on a synthetic guideline page and report peak Python memory.
+
+With BeautifulSoup installed, also times building a bs4 tree of the same page,
+which is the floor of what the previous tree-walking parser cost.
+
+    python benchmarks/bench_html_parse.py --sections 200 2000 --repeat 5
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.parsers.html_parser import parse_html  # noqa: E402
+
+PARAGRAPH = (
+    "<p>In adults with heart failure and reduced ejection fraction, "
+    "beta-blockers reduce mortality and hospitalization. "
+    "Class I, Level of Evidence: A.</p>"
+)
+
+
+def synthetic_page(n_sections, paragraphs=6):
+    parts = [
+        "<!doctype html><html><head><meta charset='utf-8'>",
+        "<title>Synthetic Guideline</title>",
+        '<meta name="publication-date" content="2023-05-10">',
+        "<script>var analytics = {};</script></head><body><main>",
+    ]
+    for i in range(n_sections):
+        level = 2 + i % 3
+        parts.append(f"<section><h{level}>Recommendation {i}</h{level}>")
+        parts.append(PARAGRAPH * paragraphs)
+        parts.append("<ul><li>first</li><li>second</li></ul></section>")
+    parts.append("</main></body></html>")
+    return "".join(parts)
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, nargs="+", default=[200, 2000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        BeautifulSoup = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sections:
+            path = Path(tmp) / f"page{n}.html"
+            path.write_text(synthetic_page(n), encoding="utf-8")
+            size = path.stat().st_size / 1e6
+            print(f"== {n:,} sections ({size:.1f} MB)")
+
+            ms, peak = measure(lambda: parse_html(str(path)), args.repeat)
+            print(f"  parse_html    {ms:9.1f}ms  peak {peak:8.1f} MB")
+            if BeautifulSoup is not None:
+                data = path.read_bytes()
+                ms, peak = measure(lambda: BeautifulSoup(data, "lxml"), args.repeat)
+                print(f"  bs4 tree only {ms:9.1f}ms  peak {peak:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Import-time regression check for the CLI entry points.
+
+Runs ``python -X importtime -c "import <module>"`` several times per entry
+point, reports the best cumulative import time and fails (exit code 1) when a
+module exceeds its budget or pulls in a heavy dependency it should load lazily.
+
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --scale 2   # slower CI machines
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import budget in milliseconds, plus modules that must not be
+# imported just by loading the entry point.
+BUDGETS = {
+    "src.cli.ingest": (120, ["fitz", "pymupdf", "bs4", "lxml", "pydantic", "rich"]),
+    "src.cli.search": (80, ["numpy", "rank_bm25", "pydantic", "fitz", "bs4"]),
+    "src.cli.index": (80, ["numpy", "rank_bm25", "pydantic", "fitz", "bs4"]),
+    "src.cli.serve": (80, ["numpy", "rank_bm25", "pydantic", "fitz", "bs4"]),
+}
+
+
+def measure(module):
+    """Return (cumulative microseconds, set of imported top-level modules)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = None
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        imported.add(name.split(".")[0])
+        if name == module:
+            total = int(cumulative)
+    return total, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Multiply every budget"
+    )
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<18}{'best ms':>10}{'budget ms':>12}  heavy imports")
+    for module, (budget, forbidden) in BUDGETS.items():
+        runs = [measure(module) for _ in range(args.repeat)]
+        best = min(t for t, _ in runs) / 1000
+        heavy = sorted(set(forbidden) & runs[0][1])
+        limit = budget * args.scale
+        print(f"{module:<18}{best:>10.1f}{limit:>12.0f}  {', '.join(heavy) or '-'}")
+        if best > limit:
+            failures.append(f"{module} took {best:.1f}ms (budget {limit:.0f}ms)")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at load time")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
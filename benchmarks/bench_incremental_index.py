@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Compare a daily refresh of a segmented index (``clinical-index update``:
+re-index only changed, new and removed documents) with a full rebuild of the
+index file (``clinical-index build``). Scores are checked against the rebuild.
+
+    python benchmarks/bench_incremental_index.py --sections 200000 --changed 20
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.search.bm25_index import BM25SectionIndex  # noqa: E402
+from src.search.index_store import MappedBM25Index  # noqa: E402
+from src.search.segments import SegmentedIndex  # noqa: E402
+
+
+def make_record(rng, vocab, weights, d, per_doc):
+    sections = [
+        {"heading": f"S{j}", "level": 2, "text": " ".join(words)}
+        for j in range(per_doc)
+        for words in [rng.choices(vocab, weights, k=rng.randint(40, 120))]
+    ]
+    return {"id": f"doc-{d}", "sections": sections}
+
+
+def write_jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records.values():
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def full_build(jsonl, out):
+    BM25SectionIndex.from_jsonl(jsonl).save(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=200000)
+    parser.add_argument("--per-doc", type=int, default=20)
+    parser.add_argument("--changed", type=int, default=20, help="Documents per day")
+    parser.add_argument("--days", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocab = [f"t{i}" for i in range(30000)]
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    n_docs = -(-args.sections // args.per_doc)
+    records = {
+        d: make_record(rng, vocab, weights, d, args.per_doc) for d in range(n_docs)
+    }
+    queries = [" ".join(rng.sample(vocab[:3000], 3)) for _ in range(20)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = os.path.join(tmp, "guidelines.jsonl")
+        directory = os.path.join(tmp, "segments")
+        write_jsonl(jsonl, records)
+        print(f"{args.sections:,} sections in {n_docs:,} documents")
+        _, elapsed = timed(full_build, jsonl, os.path.join(tmp, "full.idx"))
+        print(f"  full build            {elapsed:7.2f}s")
+        index = SegmentedIndex.create(directory)
+        _, elapsed = timed(index.sync_jsonl, jsonl)
+        print(f"  initial update        {elapsed:7.2f}s")
+
+        next_id = n_docs
+        for day in range(1, args.days + 1):
+            # A third each of replaced, removed and new documents
+            third = max(args.changed // 3, 1)
+            picked = rng.sample(sorted(records), 2 * third)
+            for d in picked[:third]:
+                records[d] = make_record(rng, vocab, weights, d, args.per_doc)
+            for d in picked[third:]:
+                del records[d]
+            for d in range(next_id, next_id + third):
+                records[d] = make_record(rng, vocab, weights, d, args.per_doc)
+            next_id += third
+            write_jsonl(jsonl, records)
+            counts, elapsed = timed(index.sync_jsonl, jsonl)
+            print(
+                f"  day {day} update          {elapsed:7.2f}s  {counts}"
+                f"  segments {len(index.segment_names)}"
+            )
+            full_path = os.path.join(tmp, "full.idx")
+            _, elapsed = timed(full_build, jsonl, full_path)
+            print(f"  day {day} full rebuild    {elapsed:7.2f}s")
+
+        full = MappedBM25Index(full_path)
+        for q in queries:
+            expected = [r["score"] for r in full.search(q, k=10)]
+            got = [r["score"] for r in index.search(q, k=10)]
+            assert all(abs(a - b) < 1e-9 for a, b in zip(expected, got)), q
+        full.close()
+        _, elapsed = timed(index.merge)
+        print(f"  merge to 1 segment    {elapsed:7.2f}s")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
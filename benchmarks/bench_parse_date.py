@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark ``parse_date`` against plain fuzzy dateutil parsing on the kind
+of strings the HTML and PDF parsers feed it: tag attributes, short spans,
+paragraph text and PDF lines.
+
+    python benchmarks/bench_parse_date.py --docs 200
+"""
+
+import argparse
+import random
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dateutil import parser as date_parser  # noqa: E402
+
+from src.utils import dates  # noqa: E402
+
+MONTHS = ["January", "Feb", "March", "Apr", "May", "June", "Sept", "October", "Dec"]
+
+
+def legacy_parse_date(text):
+    """The previous implementation: filters, then fuzzy dateutil every time."""
+    if not text or len(text) < 4 or len(text) > 50:
+        return None
+    if not any(c.isdigit() for c in text):
+        return None
+    if any(word in text.lower() for word in dates.NON_DATE_WORDS):
+        return None
+    try:
+        dt = date_parser.parse(text, fuzzy=True, default=None)
+        if dt and 1900 <= dt.year <= 2030:
+            return dt.date().isoformat()
+    except Exception:
+        return None
+    return None
+
+
+def candidate_corpus(n_docs, seed=0):
+    """Date candidates for ``n_docs`` pages, with site templates repeating."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n_docs):
+        y, m, d = rng.randint(2000, 2024), rng.choice(MONTHS), rng.randint(1, 28)
+        out += [
+            f"{y}-{rng.randint(1, 12):02d}-{d:02d}",
+            f"{y}-{rng.randint(1, 12):02d}-{d:02d}T09:30:00Z",
+            f"{m} {d}, {y}",
+            f"{d} {m} {y}",
+            f"Published {m} {d}, {y}",
+            f"Last updated: {d}/{rng.randint(1, 12)}/{y}",
+            "width=device-width, initial-scale=1",
+            f"Page {rng.randint(1, 40)} of 40",
+            f"Class IIa (LOE B-R) {rng.randint(1, 9)}",
+            "Table 3",
+            "Figure 2",
+            "See section 4.2",
+            f"Recommendation {rng.randint(1, 60)}",
+        ]
+        out += ["Beta-blockers reduce mortality in patients with HFrEF. " * 2] * 20
+        out += [f"{rng.randint(1, 300)} patients" for _ in range(5)]
+    return out
+
+
+def run(fn, corpus):
+    start = time.perf_counter()
+    found = sum(1 for text in corpus if fn(text))
+    return time.perf_counter() - start, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=200)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    corpus = candidate_corpus(args.docs)
+    mismatches = sum(
+        1 for text in corpus if legacy_parse_date(text) != dates.parse_date(text)
+    )
+    dates._parse_fuzzy.cache_clear()
+
+    base, base_found = run(legacy_parse_date, corpus)
+    fast, fast_found = run(dates.parse_date, corpus)
+    info = dates._parse_fuzzy.cache_info()
+    n = len(corpus)
+    print(f"{n:,} candidates, {base_found:,} dates, {mismatches} mismatches")
+    print(f"  dateutil only {base:8.3f}s  {base / n * 1e6:8.1f}us/call")
+    print(f"  parse_date    {fast:8.3f}s  {fast / n * 1e6:8.1f}us/call")
+    print(f"  fallback cache hits {info.hits:,} misses {info.misses:,}")
+    print(f"  speed-up {base / fast:8.1f}x")
+    assert fast_found == base_found
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Whole-section BM25 against passage indexes (``--passage-tokens``) on the
+synthetic corpus, with every other document's sections merged ``--merge`` at a
+time into long sections, as PDF extraction produces. Each query is a few words
+sampled from one sentence; the section holding the sentence is the one to find.
+Reports hit rate and MRR at ``--k``, the characters of context a hit hands on
+(the whole section, or the best passage), build time and query latency.
+
+    python benchmarks/bench_passages.py --docs 300 --passage-tokens 64 128
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import corpus  # noqa: E402
+
+from src.search.bm25_index import BM25SectionIndex  # noqa: E402
+from src.search.chunking import Chunker  # noqa: E402
+
+# Frequency rank of the corpus words (drawn with Zipf weights); drug names
+# and conditions rank after all of them
+RANK = {word: rank for rank, word in reversed(list(enumerate(corpus.WORDS)))}
+
+
+def records(docs, merge, seed):
+    out = []
+    for i in range(docs):
+        record = corpus.document(i, seed)
+        sections = record["sections"]
+        if merge > 1 and i % 2 == 0:
+            record["sections"] = [
+                {
+                    "heading": sections[j]["heading"],
+                    "level": 2,
+                    "text": " ".join(s["text"] for s in sections[j : j + merge]),
+                    "evidence": None,
+                }
+                for j in range(0, len(sections), merge)
+            ]
+        out.append(record)
+    return out
+
+
+def known_items(docs, n, seed):
+    """``(query, (doc_id, heading))`` pairs: words of one sentence and the
+    section holding it."""
+    rng = random.Random(f"known-items-{seed}")
+    items = []
+    while len(items) < n:
+        record = rng.choice(docs)
+        section = rng.choice(record["sections"])
+        sentence = rng.choice(section["text"].split(". "))
+        words = set(sentence.rstrip(".").split()[1:])
+        if len(words) < 4:
+            continue
+        # The rarest words, as a clinician would pick them
+        query = " ".join(sorted(words, key=lambda w: (RANK.get(w, len(RANK)), w))[-4:])
+        items.append((query, (record["id"], section["heading"])))
+    return items
+
+
+def evaluate(index, items, k, texts):
+    hits, reciprocal, context, results = 0, 0.0, 0, 0
+    start = time.perf_counter()
+    ranked = [index.search(query, k=k) for query, _ in items]
+    seconds = time.perf_counter() - start
+    for (_, target), found in zip(items, ranked):
+        keys = [(r["doc_id"], r["section_heading"]) for r in found]
+        if target in keys:
+            hits += 1
+            reciprocal += 1 / (keys.index(target) + 1)
+        for r in found:
+            results += 1
+            if "char_start" in r:
+                context += r["char_end"] - r["char_start"]
+            else:
+                context += len(texts[(r["doc_id"], r["section_heading"])])
+    n = len(items)
+    return hits / n, reciprocal / n, context / max(results, 1), seconds * 1000 / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--merge", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument(
+        "--passage-tokens", type=int, nargs="+", default=[64, 128], metavar="N"
+    )
+    parser.add_argument("--overlap", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    docs = records(args.docs, args.merge, args.seed)
+    texts = {(d["id"], s["heading"]): s["text"] for d in docs for s in d["sections"]}
+    items = known_items(docs, args.queries, args.seed)
+    print(
+        f"{args.docs} documents, {len(texts)} sections "
+        f"(half merged {args.merge} at a time), {len(items)} queries, k={args.k}"
+    )
+    print(
+        f"  {'index':22s} {'units':>7s} {'build s':>8s} {'hit@k':>6s} "
+        f"{'MRR':>6s} {'chars/hit':>9s} {'ms/query':>8s}"
+    )
+    configs = [("sections", None)] + [
+        (
+            f"passages {n}/{min(args.overlap, n - 1)}",
+            Chunker(n, min(args.overlap, n - 1)),
+        )
+        for n in args.passage_tokens
+    ]
+    for label, chunker in configs:
+        start = time.perf_counter()
+        index = BM25SectionIndex.from_records(docs, chunker=chunker)
+        build = time.perf_counter() - start
+        units = (
+            len(index.passages) if index.passages is not None else len(index.sections)
+        )
+        hit, mrr, chars, ms = evaluate(index, items, args.k, texts)
+        print(
+            f"  {label:22s} {units:7d} {build:8.2f} {hit:6.3f} {mrr:6.3f} "
+            f"{chars:9.0f} {ms:8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
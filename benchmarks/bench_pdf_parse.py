@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Time ``parse_pdf`` on a synthetic multi-page guideline, in both the default
+line-heuristic mode and ``layout=True``, and report peak Python memory and the
+number of sections produced.
+
+    python benchmarks/bench_pdf_parse.py --pages 100 500 --repeat 3
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fitz  # noqa: E402
+
+from src.parsers.pdf_parser import parse_pdf  # noqa: E402
+
+BODY_LINE = "Beta-blockers reduce mortality in patients with reduced ejection fraction."
+
+
+def synthetic_pdf(path, pages, lines_per_page=48, pages_per_section=25):
+    """A guideline with a title page, a bold numbered heading every few pages,
+    a running header and footer, and a small all-caps dosing table per page."""
+    doc = fitz.open()
+    section = 0
+    for p in range(pages):
+        page = doc.new_page()
+        page.insert_text((36, 30), "JOURNAL OF SYNTHETIC CARDIOLOGY", fontsize=7)
+        page.insert_text((36, 820), f"Page {p + 1} of {pages}", fontsize=7)
+        y = 70
+        if p == 0:
+            page.insert_text(
+                (36, y),
+                "Synthetic Heart Failure Guideline",
+                fontsize=18,
+                fontname="hebo",
+            )
+            page.insert_text((36, y + 16), "Published: May 10, 2023", fontsize=7)
+            y += 30
+        if p % pages_per_section == 0:
+            section += 1
+            heading = f"{section}. Recommendations for Therapy {section}"
+            page.insert_text((36, y), heading, fontsize=11, fontname="hebo")
+            y += 16
+        rows = ["DRUG CLASS   DOSE   FREQUENCY", "ACE INHIBITOR   10 MG   DAILY"]
+        page.insert_text((36, y), "\n".join(rows), fontsize=7)
+        y += 12 * len(rows)
+        body = [
+            f"{BODY_LINE} Class I, Level of Evidence: A ({p})."
+            for _ in range(lines_per_page - len(rows))
+        ]
+        page.insert_text((36, y), "\n".join(body), fontsize=7)
+    doc.save(str(path))
+    doc.close()
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, statistics.median(times), peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--pages-per-section",
+        type=int,
+        default=25,
+        help="Pages between headings; large values stress long section bodies",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.pages:
+            path = Path(tmp) / f"guideline{n}.pdf"
+            synthetic_pdf(path, n, pages_per_section=args.pages_per_section)
+            print(f"== {n:,} pages ({path.stat().st_size / 1e6:.1f} MB)")
+            for layout in (False, True):
+                doc, ms, peak = measure(
+                    lambda: parse_pdf(str(path), layout=layout), args.repeat
+                )
+                print(
+                    f"  {'layout' if layout else 'text':6s} {ms:9.1f}ms"
+                    f"  peak {peak:8.1f} MB  sections {len(doc.sections):6d}"
+                )
+
+
+if __name__ == "__main__":
+    main()
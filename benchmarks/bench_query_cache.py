@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Measure ``QueryCache`` in front of a memory-mapped index: latency of cache
+hits against uncached searches, and the hit rate for a query stream where a
+few queries repeat often (Zipf-like, as in clinician search logs).
+
+    python benchmarks/bench_query_cache.py --sections 100000 --requests 20000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.search.bm25_index import BM25SectionIndex  # noqa: E402
+from src.search.cache import QueryCache  # noqa: E402
+from src.search.index_store import MappedBM25Index  # noqa: E402
+from src.search.sections import SectionRef  # noqa: E402
+
+
+def synthetic_sections(n, seed=0):
+    rng = random.Random(seed)
+    vocab = [f"t{i}" for i in range(20000)]
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    sections = [
+        SectionRef(
+            f"doc-{i // 20}",
+            f"Guideline {i // 20}",
+            "NICE",
+            f"Section {i % 20}",
+            2,
+            "2023-01-01",
+            None,
+            text=" ".join(rng.choices(vocab, weights, k=rng.randint(40, 120))),
+        )
+        for i in range(n)
+    ]
+    return sections, vocab
+
+
+def latencies(fn, queries):
+    out = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        out.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(out), sorted(out)[int(0.99 * (len(out) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=100000)
+    parser.add_argument("--distinct", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    sections, vocab = synthetic_sections(args.sections)
+    rng = random.Random(1)
+    distinct = [" ".join(rng.sample(vocab[:2000], 3)) for _ in range(args.distinct)]
+    weights = [1 / (i + 1) for i in range(len(distinct))]
+    stream = rng.choices(distinct, weights, k=args.requests)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "guidelines.idx")
+        BM25SectionIndex(sections).save(path)
+        del sections
+        index = MappedBM25Index(path)
+        cache = QueryCache(args.cache_size)
+
+        p50, p99 = latencies(lambda q: index.search(q, k=args.k), distinct[:500])
+        print(f"uncached search   p50 {p50:9.1f}us  p99 {p99:9.1f}us")
+        for q in distinct[:500]:
+            cache.search(index, q, k=args.k)
+        p50, p99 = latencies(lambda q: cache.search(index, q, k=args.k), distinct[:500])
+        print(f"cache hit         p50 {p50:9.1f}us  p99 {p99:9.1f}us")
+
+        cache = QueryCache(args.cache_size)
+        start = time.perf_counter()
+        for q in stream:
+            cache.search(index, q, k=args.k)
+        cached = time.perf_counter() - start
+        start = time.perf_counter()
+        for q in stream:
+            index.search(q, k=args.k)
+        uncached = time.perf_counter() - start
+        stats = cache.stats()
+        print(
+            f"{args.requests:,} requests over {args.distinct:,} distinct queries: "
+            f"uncached {uncached:6.2f}s  cached {cached:6.2f}s  "
+            f"hit rate {stats['hit_rate']:.1%}"
+        )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
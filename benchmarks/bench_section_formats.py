@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Compare loading section text plus document metadata from guidelines.jsonl
+(``json.loads`` per record) with a column read of the same corpus written as a
+Parquet table and as a memory-mapped Arrow IPC stream.
+
+    python benchmarks/bench_section_formats.py --docs 2000 --sections 40
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pyarrow as pa  # noqa: E402
+
+from src.guidelines.columnar import SectionTableWriter, read_sections  # noqa: E402
+
+SOURCES = ["AHA/ACC", "NICE", "USPSTF", "ESC", "WHO"]
+WORDS = (
+    "patients heart failure reduced ejection fraction therapy recommended "
+    "mortality hospitalization dose titration renal function potassium"
+).split()
+LOAD_COLUMNS = ["doc_id", "title", "source", "heading", "publication_date", "text"]
+
+
+def synthetic_records(n_docs, sections, seed=0):
+    rng = random.Random(seed)
+    for i in range(n_docs):
+        yield {
+            "id": f"doc-{i}",
+            "title": f"Guideline {i % 200} on {rng.choice(WORDS)}",
+            "source": rng.choice(SOURCES),
+            "url": None,
+            "publication_date": f"20{rng.randint(10, 24)}-0{rng.randint(1, 9)}-15",
+            "last_updated": None,
+            "raw_text_chars": 0,
+            "sections": [
+                {
+                    "heading": f"Section {j}",
+                    "level": 1 + j % 3,
+                    "text": " ".join(rng.choices(WORDS, k=rng.randint(40, 160))),
+                    "evidence": {"grade": "A", "system": "AHA/ACC", "notes": None},
+                }
+                for j in range(sections)
+            ],
+        }
+
+
+def load_jsonl(path):
+    rows = []
+    with open(path, "rb") as f:
+        for line in f:
+            obj = json.loads(line)
+            meta = (obj["id"], obj["title"], obj["source"], obj["publication_date"])
+            for sec in obj["sections"]:
+                rows.append((*meta, sec["heading"], sec["text"]))
+    return rows
+
+
+def load_table(path):
+    return read_sections(path, LOAD_COLUMNS)
+
+
+def measure(fn, path, repeat):
+    """Best wall time, and peak Python heap plus Arrow buffers held by the result."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - start)
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    result = fn(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    peak += pa.total_allocated_bytes() - arrow_before
+    return best, peak, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--sections", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {
+            "jsonl": Path(tmp) / "guidelines.jsonl",
+            "parquet": Path(tmp) / "guidelines.parquet",
+            "arrow": Path(tmp) / "guidelines.arrows",
+        }
+        with open(paths["jsonl"], "w", encoding="utf-8") as f, SectionTableWriter(
+            str(paths["parquet"])
+        ) as pq_writer, SectionTableWriter(str(paths["arrow"])) as arrow_writer:
+            for record in synthetic_records(args.docs, args.sections):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                pq_writer.add(record)
+                arrow_writer.add(record)
+
+        print(f"{args.docs:,} documents x {args.sections} sections")
+        loaders = {"jsonl": load_jsonl, "parquet": load_table, "arrow": load_table}
+        for name, path in paths.items():
+            elapsed, peak, rows = measure(loaders[name], str(path), args.repeat)
+            size = path.stat().st_size / 1e6
+            print(
+                f"  {name:8s} {size:8.1f} MB on disk  {elapsed:7.3f}s  "
+                f"peak {peak / 1e6:7.1f} MB  ({rows:,} rows)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Measure the memory held by the sections of a BM25 index: the previous list of
+``SectionRef`` dataclasses against the compact ``SectionTable``, with section
+text kept inline (in-memory indexes) and as JSONL offsets (``from_jsonl``).
+Memory is the tracemalloc peak while building; strings are created fresh per
+record, as ``json.loads`` would.
+
+    python benchmarks/bench_section_table.py --sections 100000 1000000
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.search.filters import FilterColumns  # noqa: E402
+from src.search.sections import SectionTable  # noqa: E402
+
+HEADINGS = ["Introduction", "Recommendations", "Diagnosis", "Treatment", "Follow-up"]
+WORDS = "patients heart failure therapy mortality dose renal potassium".split()
+
+
+@dataclass
+class LegacySectionRef:
+    """The previous per-section record."""
+
+    doc_id: str
+    title: Optional[str]
+    source: Optional[str]
+    section_heading: Optional[str]
+    section_level: int
+    publication_date: Optional[str]
+    last_updated: Optional[str]
+    text: Optional[str] = None
+    offset: Optional[int] = None
+    position: int = 0
+    evidence_grade: Optional[str] = None
+
+
+def rows(n, per_doc, inline, seed=0):
+    rng = random.Random(seed)
+    for i in range(n):
+        d, pos = divmod(i, per_doc)
+        # Fresh string objects per record, as json.loads produces them
+        yield (
+            f"doc-{d}",
+            f"Guideline {d} on heart failure",
+            "".join(["AHA/", "ACC"]),
+            f"{HEADINGS[pos % len(HEADINGS)]} {pos // len(HEADINGS) or ''}".strip(),
+            1 + pos % 3,
+            f"20{10 + d % 15}-05-10",
+            None,
+            " ".join(rng.choices(WORDS, k=60)) if inline else None,
+            None if inline else d * 4096,
+            pos,
+            "".join(["A"]) if pos % 4 == 0 else None,
+        )
+
+
+def build_legacy(n, per_doc, inline):
+    return [LegacySectionRef(*row) for row in rows(n, per_doc, inline)]
+
+
+def build_table(n, per_doc, inline):
+    table = SectionTable()
+    for row in rows(n, per_doc, inline):
+        table.append(*row)
+    return table
+
+
+def measure(build, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, nargs="+", default=[100000])
+    parser.add_argument("--per-doc", type=int, default=40)
+    args = parser.parse_args()
+
+    for n in args.sections:
+        for inline in (False, True):
+            label = "inline text" if inline else "JSONL offsets"
+            print(f"== {n:,} sections, {label}")
+            for name, build in (
+                ("dataclass list", build_legacy),
+                ("SectionTable", build_table),
+            ):
+                sections, elapsed, held, peak = measure(build, n, args.per_doc, inline)
+                start = time.perf_counter()
+                FilterColumns.from_sections(sections)
+                columns = time.perf_counter() - start
+                print(
+                    f"  {name:15s} held {held / 1e6:8.1f} MB  peak {peak / 1e6:8.1f} MB"
+                    f"  build {elapsed:6.2f}s  filter columns {columns:6.2f}s"
+                )
+                del sections
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Records per second for writing and reading guideline JSONL lines:
+``model_dump()`` + ``json.dumps`` (what ``clinical-ingest`` used to do)
+against ``encode_record`` with each available backend, and ``json.loads``
+against ``loads``. Every encoder is checked to produce identical bytes.
+
+    python benchmarks/bench_serialization.py --documents 500
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import corpus  # noqa: E402
+
+from src.guidelines.models import GuidelineDocument  # noqa: E402
+from src.guidelines.serialization import BACKENDS, encode_record, loads  # noqa: E402
+
+
+def best_rate(fn, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = [
+        GuidelineDocument.model_validate(corpus.document(i))
+        for i in range(args.documents)
+    ]
+    lines = [
+        (json.dumps(d.model_dump(), ensure_ascii=False) + "\n").encode("utf-8")
+        for d in docs
+    ]
+    for backend in BACKENDS:
+        assert [encode_record(d, backend) for d in docs] == lines, backend
+    size = sum(map(len, lines)) / len(lines)
+    print(f"{len(docs)} records, {size / 1024:.1f} KiB each")
+
+    baseline = best_rate(
+        lambda d: (json.dumps(d.model_dump(), ensure_ascii=False) + "\n").encode(
+            "utf-8"
+        ),
+        docs,
+        args.repeat,
+    )
+    print(f"encode  model_dump+json.dumps  {baseline:10,.0f} records/s")
+    for backend in BACKENDS:
+        rate = best_rate(lambda d: encode_record(d, backend), docs, args.repeat)
+        print(
+            f"encode  encode_record[{backend}]{'':<{8 - len(backend)}}"
+            f"{rate:10,.0f} records/s  ({rate / baseline:.2f}x)"
+        )
+
+    baseline = best_rate(json.loads, lines, args.repeat)
+    print(f"decode  json.loads             {baseline:10,.0f} records/s")
+    for backend in BACKENDS:
+        rate = best_rate(lambda line: loads(line, backend), lines, args.repeat)
+        print(
+            f"decode  loads[{backend}]{'':<{16 - len(backend)}}"
+            f"{rate:10,.0f} records/s  ({rate / baseline:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compare a single BM25 index built from guidelines.jsonl with a sharded one:
+build time (shards tokenized in worker processes) and query latency (shards
+scored concurrently, top-k lists merged). Results are checked to be identical.
+
+    python benchmarks/bench_sharded_index.py --sections 200000 --shards 2 4 8
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.search.bm25_index import BM25SectionIndex  # noqa: E402
+
+
+def write_corpus(path, n_sections, per_doc=20, vocab_size=30000, seed=0):
+    rng = random.Random(seed)
+    vocab = [f"t{i}" for i in range(vocab_size)]
+    weights = [1 / (i + 1) for i in range(vocab_size)]
+    with open(path, "w", encoding="utf-8") as f:
+        for d in range(-(-n_sections // per_doc)):
+            sections = [
+                {"heading": f"S{j}", "level": 2, "text": " ".join(words)}
+                for j in range(per_doc)
+                for words in [rng.choices(vocab, weights, k=rng.randint(40, 120))]
+            ]
+            f.write(json.dumps({"id": f"doc-{d}", "sections": sections}) + "\n")
+    return vocab
+
+
+def query_latency(index, queries, k):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=200000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "guidelines.jsonl")
+        vocab = write_corpus(path, args.sections)
+        rng = random.Random(1)
+        queries = [" ".join(rng.sample(vocab[:3000], 3)) for _ in range(args.queries)]
+        print(f"{args.sections:,} sections, {os.cpu_count()} CPUs")
+
+        start = time.perf_counter()
+        single = BM25SectionIndex.from_jsonl(path)
+        build = time.perf_counter() - start
+        p50, worst = query_latency(single, queries, args.k)
+        print(
+            f"  1 shard   build {build:7.2f}s  query p50 {p50:7.2f}ms  max {worst:7.2f}ms"
+        )
+
+        for shards in args.shards:
+            start = time.perf_counter()
+            index = BM25SectionIndex.from_jsonl(path, shards=shards)
+            build = time.perf_counter() - start
+            p50, worst = query_latency(index, queries, args.k)
+            print(
+                f"  {shards} shards  build {build:7.2f}s  query p50 {p50:7.2f}ms"
+                f"  max {worst:7.2f}ms"
+            )
+            for q in queries[:10]:
+                assert index.search(q, k=args.k) == single.search(q, k=args.k)
+            index.index.close()
+
+
+if __name__ == "__main__":
+    main()
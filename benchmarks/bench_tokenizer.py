@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Compare index building from section text: the previous path (regex, then
+``.lower()`` per match into a list of strings, interned term by term) against
+``Tokenizer.ids`` feeding ``InvertedIndexBuilder.add_ids``. Also times query
+tokenization to term ids.
+
+    python benchmarks/bench_tokenizer.py --sections 20000 50000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.search.inverted import InvertedIndexBuilder  # noqa: E402
+from src.search.tokenizer import Tokenizer  # noqa: E402
+
+TOKEN = re.compile(r"\b[\w\-]+\b", re.UNICODE)
+WORDS = (
+    "Patients with Heart Failure and reduced ejection fraction should receive "
+    "ACE-inhibitor or ARNI therapy, beta-blockers and MRA unless contraindicated "
+    "Class I Level A SGLT2 inhibitors reduce hospitalization eGFR potassium"
+).split()
+
+
+def legacy_tokenize(text):
+    return [t.lower() for t in TOKEN.findall(text or "")]
+
+
+def legacy_add(builder, vocab, tokens):
+    """The previous ``InvertedIndexBuilder.add``: one setdefault per token."""
+    intern = vocab.setdefault
+    builder._pending.extend([intern(term, len(vocab)) for term in tokens])
+    builder._doc_len.append(len(tokens))
+    if len(builder._pending) >= builder.flush_tokens:
+        builder._flush()
+
+
+def synthetic_texts(n, seed=0):
+    rng = random.Random(seed)
+    extra = [f"term{i}" for i in range(20000)]
+    return [
+        " ".join(rng.choices(WORDS, k=60) + rng.choices(extra, k=20)) for _ in range(n)
+    ]
+
+
+def build_legacy(texts):
+    builder = InvertedIndexBuilder()
+    vocab = {}
+    for text in texts:
+        legacy_add(builder, vocab, legacy_tokenize(text))
+    builder.vocab.update(vocab)
+    return builder.build()
+
+
+def build_ids(texts, tokenizer):
+    builder = InvertedIndexBuilder()
+    vocab = builder.vocab
+    for text in texts:
+        builder.add_ids(tokenizer.ids(text, vocab))
+    return builder.build()
+
+
+def measure(fn, *args):
+    """Wall time of an untraced run, then the tracemalloc peak of a second."""
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, nargs="+", default=[20000, 50000])
+    args = parser.parse_args()
+
+    for n in args.sections:
+        texts = synthetic_texts(n)
+        print(f"== {n:,} sections ({sum(map(len, texts)) / 1e6:.1f} MB text)")
+        legacy, elapsed, peak = measure(build_legacy, texts)
+        print(f"  legacy tokens   {elapsed:7.2f}s  peak {peak / 1e6:7.1f} MB")
+        for medical in (False, True):
+            index, elapsed, peak = measure(build_ids, texts, Tokenizer(medical))
+            label = "ids (medical)" if medical else "ids"
+            print(
+                f"  {label:15s} {elapsed:7.2f}s  peak {peak / 1e6:7.1f} MB"
+                f"  vocab {len(index.vocab):,}"
+            )
+            if not medical:
+                assert array("i", index.post_docs) == array("i", legacy.post_docs)
+
+        queries = texts[:2000]
+        tokenizer = Tokenizer()
+        start = time.perf_counter()
+        for q in queries:
+            legacy.term_ids(legacy_tokenize(q))
+        before = time.perf_counter() - start
+        start = time.perf_counter()
+        for q in queries:
+            tokenizer.term_ids(q, legacy.vocab)
+        after = time.perf_counter() - start
+        per = 1e6 / len(queries)
+        print(
+            f"  query -> ids    legacy {before * per:6.1f}us  now {after * per:6.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
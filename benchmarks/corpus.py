@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic guideline corpus for benchmarks.
+
+The same documents are written three ways: HTML pages, PDFs and one
+``guidelines.jsonl`` in the format ``clinical-ingest`` produces. Document ``i``
+only depends on ``seed`` and ``i``, so a smaller corpus is a prefix of a larger
+one. Text mixes a Zipf-weighted clinical vocabulary with rarer drug-like
+terms, numbered headings at two levels, recommendation class / evidence level
+statements and publication dates.
+
+    python benchmarks/corpus.py --sections 10000 --out /tmp/corpus
+"""
+
+import argparse
+import json
+import random
+import textwrap
+from html import escape
+from pathlib import Path
+
+SECTIONS_PER_DOC = 40
+SOURCES = ["AHA/ACC", "NICE", "ESC", "USPSTF", "WHO"]
+CONDITIONS = [
+    "heart failure",
+    "atrial fibrillation",
+    "hypertension",
+    "type 2 diabetes",
+    "chronic kidney disease",
+    "stable angina",
+    "dyslipidemia",
+    "stroke prevention",
+]
+TOPICS = [
+    "Diagnosis",
+    "Risk Assessment",
+    "Pharmacological Therapy",
+    "Device Therapy",
+    "Lifestyle Interventions",
+    "Monitoring and Follow-up",
+    "Special Populations",
+    "Transitions of Care",
+]
+WORDS = (
+    "patients with reduced ejection fraction should receive therapy to lower "
+    "mortality and hospitalization risk in adults older than sixty years the "
+    "dose is titrated every two weeks as tolerated renal function and potassium "
+    "are monitored after initiation blood pressure targets depend on frailty and "
+    "comorbid conditions shared decision making is recommended when benefits "
+    "are uncertain treatment may be reasonable for selected individuals with "
+    "elevated natriuretic peptides symptoms worsen despite optimal medical care "
+    "referral to a specialist is indicated clinicians consider contraindications "
+    "including hypotension bradycardia and hyperkalemia evidence from randomized "
+    "trials supports this approach observational data suggest similar outcomes"
+).split()
+DRUG_PREFIXES = ["cardi", "neph", "vaso", "gluc", "lipo", "thromb", "angio"]
+DRUG_SUFFIXES = ["pril", "sartan", "olol", "gliflozin", "statin", "parin", "xaban"]
+CLASSES = ["I", "IIa", "IIb", "III"]
+LEVELS = ["A", "B-R", "B-NR", "C-LD", "C-EO"]
+MONTHS = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+
+
+def document(i, seed=0, sections=SECTIONS_PER_DOC):
+    """The ``i``-th synthetic guideline as a ``clinical-ingest`` record."""
+    rng = random.Random(f"{seed}-{i}")
+    weights = [1 / (r + 1) for r in range(len(WORDS))]
+    condition = CONDITIONS[i % len(CONDITIONS)]
+    year, month, day = 2010 + i % 15, 1 + i % 12, 1 + i % 28
+    drugs = [
+        rng.choice(DRUG_PREFIXES)
+        + f"{rng.randint(0, 999):03d}"[: 1 + i % 3]
+        + rng.choice(DRUG_SUFFIXES)
+        for _ in range(6)
+    ]
+    out = []
+    chapter = 0
+    for s in range(sections):
+        if s % 5 == 0:
+            chapter += 1
+            heading = f"{chapter}. {TOPICS[(i + chapter) % len(TOPICS)]}"
+            level = 2
+        else:
+            heading = f"{chapter}.{s % 5} {condition.title()} {rng.choice(drugs)}"
+            level = 3
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            words = rng.choices(WORDS, weights, k=rng.randint(8, 20))
+            if rng.random() < 0.5:
+                words.insert(rng.randint(0, len(words)), rng.choice(drugs))
+            words.insert(rng.randint(0, len(words)), condition)
+            sentences.append("In " + " ".join(words) + ".")
+        grade = None
+        if rng.random() < 0.4:
+            grade = rng.choice(LEVELS)
+            sentences.append(
+                f"Class {rng.choice(CLASSES)}, Level of Evidence: {grade}."
+            )
+        out.append(
+            {
+                "heading": heading,
+                "level": level,
+                "text": " ".join(sentences),
+                "evidence": (
+                    {"grade": grade[0], "system": "AHA/ACC", "notes": None}
+                    if grade
+                    else None
+                ),
+            }
+        )
+    return {
+        "id": f"guideline-{i:06d}",
+        "title": f"{year} Guideline for the Management of {condition.title()}",
+        "source": SOURCES[i % len(SOURCES)],
+        "url": None,
+        "publication_date": f"{year}-{month:02d}-{day:02d}",
+        "last_updated": None,
+        "sections": out,
+        "raw_text_chars": sum(len(sec["text"]) for sec in out),
+    }
+
+
+def _date_text(record):
+    year, month, day = record["publication_date"].split("-")
+    return f"{MONTHS[int(month) - 1]} {int(day)}, {year}"
+
+
+def to_html(record):
+    parts = [
+        "<!doctype html><html><head><meta charset='utf-8'>",
+        f"<title>{escape(record['title'])}</title>",
+        f'<meta name="publication-date" content="{record["publication_date"]}">',
+        "<script>window.analytics = {};</script></head><body>",
+        "<nav><a href='/'>Home</a> | <a href='/guidelines'>Guidelines</a></nav>",
+        f"<main><h1>{escape(record['title'])}</h1>",
+    ]
+    for sec in record["sections"]:
+        tag = f"h{sec['level']}"
+        parts.append(f"<section><{tag}>{escape(sec['heading'])}</{tag}>")
+        sentences = sec["text"].split(". ")
+        half = len(sentences) // 2
+        for chunk in (sentences[:half], sentences[half:]):
+            if chunk:
+                parts.append(f"<p>{escape('. '.join(chunk))}</p>")
+        parts.append("</section>")
+    parts.append("</main><footer>Synthetic corpus</footer></body></html>")
+    return "".join(parts)
+
+
+def write_pdf(record, path):
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    lines = [
+        (record["title"], 14, "hebo"),
+        (f"Published: {_date_text(record)}", 8, "helv"),
+    ]
+    for sec in record["sections"]:
+        lines.append((sec["heading"], 10, "hebo"))
+        for line in textwrap.wrap(sec["text"], 110):
+            lines.append((line, 8, "helv"))
+    # One shape per page: committing per insert_text call dominates otherwise
+    shape = None
+    y = 0.0
+    for text, size, font in lines:
+        if shape is None or y > 800:
+            if shape is not None:
+                shape.commit()
+            shape = doc.new_page().new_shape()
+            y = 50.0
+        shape.insert_text((36, y), text, fontsize=size, fontname=font)
+        y += size + 4
+    if shape is not None:
+        shape.commit()
+    doc.save(str(path))
+    doc.close()
+
+
+def generate(out_dir, sections, seed=0, formats=("html", "pdf", "jsonl")):
+    """Write a corpus of ``sections`` sections to ``out_dir``; returns its
+    description. An existing corpus with the same sections and seed that has
+    every requested format is reused."""
+    out = Path(out_dir)
+    info = {"sections": sections, "seed": seed, "formats": sorted(formats)}
+    manifest = out / "corpus.json"
+    if manifest.exists():
+        existing = json.loads(manifest.read_text())
+        if (
+            existing["sections"] == sections
+            and existing["seed"] == seed
+            and set(formats) <= set(existing["formats"])
+        ):
+            return existing
+    out.mkdir(parents=True, exist_ok=True)
+    n_docs = -(-sections // SECTIONS_PER_DOC)
+    html_dir, pdf_dir = out / "html", out / "pdf"
+    if "html" in formats:
+        html_dir.mkdir(exist_ok=True)
+    if "pdf" in formats:
+        pdf_dir.mkdir(exist_ok=True)
+    with open(out / "guidelines.jsonl", "w", encoding="utf-8") as jsonl:
+        for i in range(n_docs):
+            count = min(SECTIONS_PER_DOC, sections - i * SECTIONS_PER_DOC)
+            record = document(i, seed, count)
+            if "jsonl" in formats:
+                jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if "html" in formats:
+                (html_dir / f"{record['id']}.html").write_text(
+                    to_html(record), encoding="utf-8"
+                )
+            if "pdf" in formats:
+                write_pdf(record, pdf_dir / f"{record['id']}.pdf")
+    manifest.write_text(json.dumps(info))
+    return info
+
+
+def queries(n, seed=0):
+    """Clinician-style queries over the corpus vocabulary."""
+    rng = random.Random(f"queries-{seed}")
+    out = []
+    for _ in range(n):
+        terms = [rng.choice(CONDITIONS)] + rng.sample(WORDS[:60], rng.randint(1, 3))
+        if rng.random() < 0.3:
+            terms.append(rng.choice(DRUG_SUFFIXES))
+        out.append(" ".join(terms))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=10000)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--formats", nargs="+", default=["html", "pdf", "jsonl"], metavar="FORMAT"
+    )
+    args = parser.parse_args()
+    generate(args.out, args.sections, args.seed, tuple(args.formats))
+    print(f"Wrote {args.sections:,} sections per format to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
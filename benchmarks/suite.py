@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the ingest and search hot paths.
+
+For each corpus size (sections per format, from ``corpus.py``) it times:
+
+  parse_html    ``parse_html`` on every HTML file
+  parse_pdf     ``parse_pdf`` on every PDF file
+  index_build   ``BM25SectionIndex(sections)`` from in-memory ``SectionRef``s
+  from_jsonl    ``BM25SectionIndex.from_jsonl`` on the corpus JSONL
+  search        ``BM25SectionIndex.search``, one query at a time
+  search_many   ``BM25SectionIndex.search_many`` over the same queries
+
+and reports throughput, per-item latency percentiles and peak RSS. Every stage
+runs in a fresh process, so memory figures are not polluted by earlier
+stages. Results are written as JSON; ``--compare`` reports changes against an
+earlier results file and flags regressions.
+
+    python benchmarks/suite.py --sizes 1000 10000 100000 --out bench.json
+    python benchmarks/suite.py --sizes 10000 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import corpus  # noqa: E402
+
+STAGES = [
+    "parse_html",
+    "parse_pdf",
+    "index_build",
+    "from_jsonl",
+    "search",
+    "search_many",
+]
+FORMAT_VERSION = 1
+
+
+def _proc_status_mb(field):
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS mark to the current RSS (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def rss_mb():
+    return _proc_status_mb("VmRSS")
+
+
+def peak_rss_mb():
+    """Peak resident set size in MB since the last reset (None if unknown)."""
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Not resettable, and on Linux inherited from the parent across fork/exec;
+    # macOS reports bytes, other platforms kilobytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def percentiles(values_ms):
+    if not values_ms:
+        return None
+    ordered = sorted(values_ms)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4)
+
+    return {
+        "p50": pct(0.50),
+        "p90": pct(0.90),
+        "p99": pct(0.99),
+        "max": round(ordered[-1], 4),
+        "mean": round(statistics.fmean(ordered), 4),
+    }
+
+
+def timed_each(fn, items):
+    """Call ``fn`` per item; returns (results, per-item latencies in ms)."""
+    results, latencies = [], []
+    for item in items:
+        start = time.perf_counter()
+        results.append(fn(item))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def load_refs(jsonl):
+    from src.search.bm25_index import SectionRef
+
+    refs = []
+    with open(jsonl, encoding="utf-8") as f:
+        for line in f:
+            obj = json.loads(line)
+            for sec in obj["sections"]:
+                refs.append(
+                    SectionRef(
+                        obj["id"],
+                        obj["title"],
+                        obj["source"],
+                        sec["heading"],
+                        sec["level"],
+                        obj["publication_date"],
+                        obj["last_updated"],
+                        text=sec["text"],
+                        evidence_grade=(sec.get("evidence") or {}).get("grade"),
+                    )
+                )
+    return refs
+
+
+def prepare(stage, root, n_queries, k):
+    """Untimed setup of one stage.
+
+    Returns ``(run, info)``: ``run()`` does the timed work and returns per-item
+    latencies in ms (or None), ``info`` describes the items processed.
+    """
+    jsonl = str(root / "guidelines.jsonl")
+    if stage in ("parse_html", "parse_pdf"):
+        if stage == "parse_html":
+            from src.parsers.html_parser import parse_html as parse
+
+            files = sorted((root / "html").glob("*.html"))
+        else:
+            from src.parsers.pdf_parser import parse_pdf as parse
+
+            files = sorted((root / "pdf").glob("*.pdf"))
+        info = {
+            "items": len(files),
+            "unit": "files",
+            "sections": None,
+            "bytes": sum(f.stat().st_size for f in files),
+        }
+
+        def run():
+            docs, latencies = timed_each(lambda f: parse(str(f)), files)
+            info["sections"] = sum(len(d.sections) for d in docs)
+            return latencies
+
+        return run, info
+
+    from src.search.bm25_index import BM25SectionIndex
+
+    if stage == "index_build":
+        refs = load_refs(jsonl)
+        info = {"items": len(refs), "unit": "sections", "sections": len(refs)}
+
+        def run():
+            BM25SectionIndex(refs)
+
+        return run, info
+    if stage == "from_jsonl":
+        info = {"unit": "sections", "bytes": os.path.getsize(jsonl)}
+
+        def run():
+            index = BM25SectionIndex.from_jsonl(jsonl)
+            info["items"] = info["sections"] = len(index.sections)
+
+        return run, info
+
+    index = BM25SectionIndex.from_jsonl(jsonl)
+    queries = corpus.queries(n_queries)
+    # Warm-up: filter columns and file handles are created on first use
+    index.search(queries[0], k=k)
+    info = {"items": len(queries), "unit": "queries", "sections": len(index.sections)}
+    if stage == "search":
+        return lambda: timed_each(lambda q: index.search(q, k=k), queries)[1], info
+
+    def run_batch():
+        index.search_many(queries, k=k)
+
+    return run_batch, info
+
+
+def run_stage(stage, corpus_dir, n_queries, k, repeat):
+    """Run one stage ``repeat`` times in this (fresh) process; returns metrics.
+
+    Time is the median run (``seconds_min`` the fastest); latency percentiles
+    pool the items of every run.
+    """
+    run, info = prepare(stage, Path(corpus_dir), n_queries, k)
+    before = rss_mb()
+    resettable = reset_peak_rss()
+    times, latencies = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        per_item = run()
+        times.append(time.perf_counter() - start)
+        latencies.extend(per_item or [])
+    peak = peak_rss_mb()
+    seconds = statistics.median(times)
+    result = {"stage": stage, **info, "repeat": repeat, "seconds": round(seconds, 6)}
+    result["seconds_min"] = round(min(times), 6)
+    result["throughput"] = {
+        f"{info['unit']}_per_s": round(info["items"] / seconds, 3) if seconds else None
+    }
+    if info.get("bytes") and seconds:
+        result["throughput"]["mb_per_s"] = round(info["bytes"] / 1e6 / seconds, 3)
+    result["latency_ms"] = percentiles(latencies)
+    result["peak_rss_mb"] = round(peak, 2) if peak is not None else None
+    result["rss_growth_mb"] = (
+        round(max(peak - before, 0.0), 2)
+        if resettable and peak is not None and before is not None
+        else None
+    )
+    return result
+
+
+def run_isolated(*args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(run_stage, *args).result()
+
+
+def git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).resolve().parent,
+            check=True,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new, threshold):
+    """Print per-stage changes; returns the number of regressions."""
+    previous = {(r["corpus_sections"], r["stage"]): r for r in old["results"]}
+    regressions = 0
+    print(f"\nvs {old['meta'].get('commit') or 'baseline'} (threshold {threshold:.0%})")
+    for r in new["results"]:
+        before = previous.get((r["corpus_sections"], r["stage"]))
+        if before is None:
+            continue
+        # The fastest run is the least noisy estimate on a shared machine
+        timing = "seconds_min" if "seconds_min" in before else "seconds"
+        checks = [("time", before[timing], r[timing])]
+        if r.get("latency_ms") and before.get("latency_ms"):
+            checks.append(("p50", before["latency_ms"]["p50"], r["latency_ms"]["p50"]))
+        if r.get("peak_rss_mb") and before.get("peak_rss_mb"):
+            checks.append(("rss", before["peak_rss_mb"], r["peak_rss_mb"]))
+        parts = []
+        flagged = False
+        for name, a, b in checks:
+            change = (b - a) / a if a else 0.0
+            parts.append(f"{name} {change:+7.1%}")
+            flagged |= change > threshold
+        regressions += flagged
+        print(
+            f"  {r['corpus_sections']:>7,} {r['stage']:12s} {'  '.join(parts)}"
+            f"{'  REGRESSION' if flagged else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Timed runs per stage (median kept)"
+    )
+    parser.add_argument(
+        "--corpus-dir",
+        help="Keep generated corpora here and reuse them (default: temporary)",
+    )
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown or growth reported as a regression",
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with status 1 if --compare finds a regression",
+    )
+    args = parser.parse_args()
+
+    formats = set()
+    if "parse_html" in args.stages:
+        formats.add("html")
+    if "parse_pdf" in args.stages:
+        formats.add("pdf")
+    if set(args.stages) - {"parse_html", "parse_pdf"}:
+        formats.add("jsonl")
+
+    report = {
+        "format_version": FORMAT_VERSION,
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "queries": args.queries,
+            "k": args.k,
+            "repeat": args.repeat,
+        },
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(args.corpus_dir or tmp)
+        for size in args.sizes:
+            corpus_dir = base / f"corpus-{size}"
+            start = time.perf_counter()
+            corpus.generate(corpus_dir, size, formats=tuple(sorted(formats)))
+            print(
+                f"== {size:,} sections (corpus ready in "
+                f"{time.perf_counter() - start:.1f}s)"
+            )
+            for stage in args.stages:
+                r = run_isolated(
+                    stage, str(corpus_dir), args.queries, args.k, args.repeat
+                )
+                r["corpus_sections"] = size
+                report["results"].append(r)
+                rate = next(iter(r["throughput"].items()))
+                latency = r.get("latency_ms")
+                print(
+                    f"  {stage:12s} {r['seconds']:9.3f}s  {rate[1]:>12,.1f} {rate[0]}"
+                    + (
+                        f"  p50 {latency['p50']:8.3f}ms  p99 {latency['p99']:8.3f}ms"
+                        if latency
+                        else ""
+                    )
+                    + f"  peak RSS {r['peak_rss_mb']} MB"
+                )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""Asyncio ingest pipeline behind ``clinical-ingest --async``.
+
+Four stages connected by bounded queues::
+
+    discover --paths--> read (N tasks) --data--> parse (executor) --results--> write
+
+Directories are listed one at a time as the walk goes, so readers start on
+the first files while the rest of the tree is still being discovered. Reads
+(and manifest checks) run on an I/O thread pool and overlap with parsing,
+which runs on a process pool with ``workers > 1`` and on one thread
+otherwise. The writer joins finished lines into large writes. A semaphore
+caps the files between discovery and write, which bounds the memory held in
+file contents, parsed lines and the ``ordered`` reorder buffer regardless of
+corpus size.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Coroutine,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from src.cli.ingest import FILE_PATTERNS, parse_timed, parse_to_line
+from src.utils.manifest import (
+    FileEntry,
+    Manifest,
+    fingerprint,
+    manifest_key,
+    reusable_entry,
+)
+from src.utils.metrics import IngestMetrics
+
+SUFFIXES = frozenset(pattern[1:] for pattern in FILE_PATTERNS)
+READERS = 8
+MAX_IN_FLIGHT = 64
+WRITE_BATCH_BYTES = 1 << 20
+
+
+@dataclass
+class _Item:
+    seq: int
+    path: Path
+    data: Optional[bytes] = None  # file content until parsed
+    line: Optional[bytes] = None
+    entry: Optional[FileEntry] = None
+    reused_offset: Optional[int] = None  # offset of a reused record in the old file
+    error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def list_directory(path: Path) -> Tuple[List[Path], List[Path]]:
+    """Guideline files and subdirectories of ``path``, each sorted by name."""
+    files: List[Path] = []
+    dirs: List[Path] = []
+    with os.scandir(path) as it:
+        for entry in sorted(it, key=lambda e: e.name):
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(Path(entry.path))
+            elif os.path.splitext(entry.name)[1] in SUFFIXES and entry.is_file():
+                files.append(Path(entry.path))
+    return files, dirs
+
+
+class AsyncIngest:
+    """Writes the JSONL records of every guideline file under ``root`` to ``out``.
+
+    With a non-empty ``previous`` manifest, records of unchanged files are
+    copied from ``old`` (the previous JSONL) instead of being parsed again.
+    New manifest entries are collected in ``manifest``. Records are written in
+    completion order, or in discovery order (a depth-first walk in name
+    order) when ``ordered`` is set.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        out: BinaryIO,
+        manifest: Manifest,
+        previous: Optional[Manifest] = None,
+        old: Optional[BinaryIO] = None,
+        source: Optional[str] = None,
+        pdf_layout: bool = False,
+        workers: int = 1,
+        readers: int = READERS,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        ordered: bool = False,
+        metrics: Optional[IngestMetrics] = None,
+        on_discovered: Optional[Callable[[int], None]] = None,
+        on_written: Optional[Callable[[], None]] = None,
+    ):
+        self.root = root
+        self.out = out
+        self.manifest = manifest
+        self.previous = previous or Manifest()
+        self.old = old
+        self.source = source
+        self.pdf_layout = pdf_layout
+        self.workers = max(1, workers)
+        self.readers = max(1, readers)
+        self.max_in_flight = max(1, max_in_flight)
+        self.ordered = ordered
+        self.metrics = metrics
+        self.on_discovered = on_discovered
+        self.on_written = on_written
+        self.discovered = 0
+        self.written = 0
+        self.reused = 0
+        self.parsed = 0
+        self.failed = 0
+        self._seen: Set[str] = set()
+        self._position = 0
+
+    @property
+    def removed(self) -> List[str]:
+        """Keys of the previous manifest whose files were not found."""
+        return [key for key in self.previous.files if key not in self._seen]
+
+    def run(self) -> None:
+        """Run the pipeline to completion on a new event loop."""
+        io = ThreadPoolExecutor(self.readers + 1, thread_name_prefix="ingest-io")
+        cpu: Executor
+        if self.workers > 1:
+            cpu = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            cpu = ThreadPoolExecutor(1, thread_name_prefix="ingest-parse")
+        with io, cpu:
+            _run_loop(self._main(io, cpu))
+
+    async def _main(self, io: Executor, cpu: Executor) -> None:
+        self._io, self._cpu = io, cpu
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._paths: asyncio.Queue[Optional[_Item]] = asyncio.Queue(self.readers)
+        self._parse: asyncio.Queue[Optional[_Item]] = asyncio.Queue(self.workers)
+        self._results: asyncio.Queue[Optional[_Item]] = asyncio.Queue(
+            self.max_in_flight
+        )
+        readers = [asyncio.ensure_future(self._read()) for _ in range(self.readers)]
+        # One file queued per worker on top of the one it is parsing
+        parsers = [
+            asyncio.ensure_future(self._parse_files()) for _ in range(2 * self.workers)
+        ]
+        writer = asyncio.ensure_future(self._write())
+
+        async def drive() -> None:
+            await self._discover()
+            for _ in readers:
+                await self._paths.put(None)
+            await asyncio.gather(*readers)
+            for _ in parsers:
+                await self._parse.put(None)
+            await asyncio.gather(*parsers)
+            await self._results.put(None)
+            await writer
+
+        tasks = [asyncio.ensure_future(drive()), writer, *readers, *parsers]
+        try:
+            # Returns when everything finished or as soon as any stage fails,
+            # so an error never leaves the other stages blocked on a queue
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    error = task.exception()
+                    if error is not None:
+                        raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    # -- stages ------------------------------------------------------------
+
+    async def _discover(self) -> None:
+        loop = asyncio.get_running_loop()
+        pending = [self.root]
+        while pending:
+            files, dirs = await loop.run_in_executor(
+                self._io, list_directory, pending.pop()
+            )
+            # Depth first, subdirectories in name order
+            pending.extend(reversed(dirs))
+            for f in files:
+                await self._slots.acquire()
+                self.discovered += 1
+                self._seen.add(manifest_key(f, self.root))
+                await self._paths.put(_Item(self.discovered, f))
+                if self.on_discovered is not None:
+                    self.on_discovered(self.discovered)
+
+    async def _read(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._paths.get()
+            if item is None:
+                return
+            await loop.run_in_executor(self._io, self._load, item)
+            if item.data is None:
+                # Reused record or read error: nothing to parse
+                await self._results.put(item)
+            else:
+                await self._parse.put(item)
+
+    def _load(self, item: _Item) -> None:
+        # Runs on an I/O thread
+        start = time.perf_counter()
+        try:
+            if self.previous.files:
+                entry = reusable_entry(self.previous, item.path, self.root)
+                if entry is not None:
+                    item.entry, item.reused_offset = entry, entry.offset
+                    return
+            with open(item.path, "rb") as f:
+                item.data = f.read()
+            read = time.perf_counter()
+            sha256 = hashlib.sha256(item.data).hexdigest()
+            item.entry = fingerprint(item.path, self.root, sha256)
+        except OSError as e:
+            item.data, item.error = None, str(e)
+            return
+        item.timings["read"] = read - start
+        item.timings["fingerprint"] = time.perf_counter() - read
+
+    async def _parse_files(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._parse.get()
+            if item is None:
+                return
+            data, item.data = item.data, None
+            if self.metrics is not None:
+                _, item.line, item.error, timings = await loop.run_in_executor(
+                    self._cpu,
+                    parse_timed,
+                    item.path,
+                    self.source,
+                    self.pdf_layout,
+                    False,
+                    data,
+                    self.root,
+                )
+                item.timings.update(timings)
+            else:
+                _, item.line, item.error = await loop.run_in_executor(
+                    self._cpu,
+                    parse_to_line,
+                    item.path,
+                    self.source,
+                    self.pdf_layout,
+                    data,
+                    self.root,
+                )
+            await self._results.put(item)
+
+    async def _write(self) -> None:
+        loop = asyncio.get_running_loop()
+        waiting: Dict[int, _Item] = {}
+        next_seq = 1
+        batch: List[_Item] = []
+        batch_bytes = 0
+        while True:
+            item = await self._results.get()
+            if item is None:
+                break
+            ready = [item]
+            if self.ordered:
+                waiting[item.seq] = item
+                ready = []
+                while next_seq in waiting:
+                    ready.append(waiting.pop(next_seq))
+                    next_seq += 1
+            for it in ready:
+                if it.entry is None or (it.line is None and it.reused_offset is None):
+                    self._fail(it)
+                    continue
+                if it.line is not None:
+                    it.entry.length = len(it.line)
+                it.entry.offset = self._position
+                self._position += it.entry.length
+                batch.append(it)
+                batch_bytes += it.entry.length
+            if batch and (batch_bytes >= WRITE_BATCH_BYTES or self._results.empty()):
+                seconds = await loop.run_in_executor(self._io, self._flush, batch)
+                self._written(batch, seconds)
+                batch, batch_bytes = [], 0
+        if batch:
+            seconds = await loop.run_in_executor(self._io, self._flush, batch)
+            self._written(batch, seconds)
+
+    def _flush(self, batch: List[_Item]) -> float:
+        # Runs on an I/O thread; one write per batch
+        start = time.perf_counter()
+        parts = []
+        for it in batch:
+            if it.line is not None:
+                parts.append(it.line)
+            else:
+                assert self.old is not None and it.entry is not None
+                self.old.seek(it.reused_offset or 0)
+                parts.append(self.old.read(it.entry.length))
+        self.out.write(b"".join(parts))
+        return time.perf_counter() - start
+
+    def _written(self, batch: List[_Item], seconds: float) -> None:
+        for it in batch:
+            assert it.entry is not None
+            self.manifest.files[it.entry.path] = it.entry
+            self.written += 1
+            if it.line is None:
+                self.reused += 1
+            else:
+                self.parsed += 1
+                if self.metrics is not None:
+                    it.timings["write"] = seconds / len(batch)
+                    self.metrics.record(str(it.path), it.timings, it.entry.size)
+            it.line = None
+            self._slots.release()
+            if self.on_written is not None:
+                self.on_written()
+
+    def _fail(self, item: _Item) -> None:
+        print(f"Failed to parse {item.path}: {item.error}")
+        self.failed += 1
+        if self.metrics is not None:
+            size = item.entry.size if item.entry is not None else 0
+            self.metrics.record(str(item.path), item.timings, size, item.error or "")
+        self._slots.release()
+        if self.on_written is not None:
+            self.on_written()
+
+
+def _run_loop(main: Coroutine[Any, Any, None]) -> None:
+    # uvloop (optional ``uvloop`` extra) when installed
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main)
+        return
+    uvloop.run(main)
+
+
+def ingest_jsonl(
+    root: Path,
+    out_path: Path,
+    previous: Manifest,
+    manifest: Manifest,
+    progress: Optional[Any] = None,
+    **options: Any,
+) -> AsyncIngest:
+    """Run ``AsyncIngest`` into ``out_path`` through a temporary file.
+
+    ``progress`` is a ``rich.progress.Progress`` to report to; the returned
+    pipeline carries the counts.
+    """
+    tmp_path = Path(str(out_path) + ".tmp")
+    with contextlib.ExitStack() as stack:
+        out = stack.enter_context(open(tmp_path, "wb"))
+        old = None
+        if previous.files:
+            old = stack.enter_context(open(out_path, "rb"))
+        pipeline = AsyncIngest(root, out, manifest, previous, old, **options)
+        if progress is not None:
+            task = progress.add_task("Parsing guidelines", total=None)
+            pipeline.on_discovered = lambda n: progress.update(task, total=n)
+            pipeline.on_written = lambda: progress.advance(task)
+        pipeline.run()
+    os.replace(tmp_path, out_path)
+    return pipeline
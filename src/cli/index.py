@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+
+def build(args: argparse.Namespace) -> None:
+    from src.search.bm25_index import BM25SectionIndex
+    from src.search.chunking import Chunker
+    from src.search.tokenizer import Tokenizer
+
+    corpus = args.table or args.jsonl
+    if not Path(corpus).exists():
+        kind = "Table" if args.table else "JSONL"
+        raise SystemExit(f"{kind} not found: {corpus}")
+
+    tokenizer = Tokenizer(medical=args.medical_tokens)
+    chunker = None
+    if args.passage_tokens is not None:
+        try:
+            chunker = Chunker(args.passage_tokens, args.passage_overlap)
+        except ValueError as e:
+            raise SystemExit(f"--passage-tokens/--passage-overlap: {e}")
+    elif args.passage_overlap:
+        raise SystemExit("--passage-overlap needs --passage-tokens")
+    if args.table:
+        if args.shards > 1:
+            raise SystemExit("--shards needs --jsonl")
+        index = BM25SectionIndex.from_table(args.table, tokenizer, chunker)
+    else:
+        index = BM25SectionIndex.from_jsonl(
+            args.jsonl, tokenizer, shards=args.shards, chunker=chunker
+        )
+    if not index.sections:
+        raise SystemExit(f"No searchable sections in {corpus}")
+    index.save(args.out)
+    passages = f" ({len(index.passages)} passages)" if index.passages else ""
+    print(f"Indexed {len(index.sections)} sections{passages} to {args.out}")
+
+
+def update(args: argparse.Namespace) -> None:
+    from src.search.segments import SegmentedIndex
+    from src.search.tokenizer import Tokenizer
+
+    if not Path(args.jsonl).exists():
+        raise SystemExit(f"JSONL not found: {args.jsonl}")
+    if SegmentedIndex.is_index(args.index):
+        if args.medical_tokens:
+            raise SystemExit("--medical-tokens only applies when creating an index")
+        index = SegmentedIndex(args.index)
+    elif Path(args.index).exists() and not Path(args.index).is_dir():
+        raise SystemExit(f"Not an index directory: {args.index}")
+    else:
+        tokenizer = Tokenizer(medical=args.medical_tokens)
+        index = SegmentedIndex.create(args.index, tokenizer)
+    start = time.perf_counter()
+    try:
+        counts = index.sync_jsonl(args.jsonl)
+    except ValueError as e:
+        raise SystemExit(f"{args.jsonl}: {e}")
+    elapsed = time.perf_counter() - start
+    print(
+        f"Added {counts['added']}, replaced {counts['replaced']}, "
+        f"removed {counts['removed']} documents ({counts['unchanged']} unchanged) "
+        f"in {elapsed:.2f}s; {len(index)} sections in "
+        f"{len(index.segment_names)} segments"
+    )
+
+
+def merge(args: argparse.Namespace) -> None:
+    from src.search.segments import SegmentedIndex
+
+    if not SegmentedIndex.is_index(args.index):
+        raise SystemExit(f"Not an index directory: {args.index}")
+    index = SegmentedIndex(args.index)
+    if index.merge(args.max_segments):
+        print(f"Merged into {len(index.segment_names)} segments")
+    else:
+        print("Nothing to merge")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage persistent BM25 indexes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser(
+        "build", help="Build an index file from guidelines JSONL"
+    )
+    corpus = build_parser.add_mutually_exclusive_group(required=True)
+    corpus.add_argument("--jsonl", help="Path to guidelines.jsonl")
+    corpus.add_argument(
+        "--table", help="Section table (.parquet/.arrows) from clinical-ingest"
+    )
+    build_parser.add_argument("--out", required=True, help="Index file to write")
+    build_parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Tokenize N byte ranges of the JSONL in parallel processes",
+    )
+    build_parser.add_argument(
+        "--medical-tokens",
+        action="store_true",
+        help="Spell out Greek letters and split hyphenated terms "
+        "(ACE-inhibitor matches ACE inhibitor)",
+    )
+    build_parser.add_argument(
+        "--passage-tokens",
+        type=int,
+        default=None,
+        help="Index passages of at most N tokens instead of whole sections; "
+        "results keep the best passage of each section",
+    )
+    build_parser.add_argument(
+        "--passage-overlap",
+        type=int,
+        default=0,
+        help="Tokens shared by consecutive passages of a section",
+    )
+    build_parser.set_defaults(func=build)
+
+    update_parser = commands.add_parser(
+        "update",
+        help="Create or incrementally refresh an index directory from guidelines "
+        "JSONL, re-indexing only new, changed and removed documents",
+    )
+    update_parser.add_argument(
+        "--jsonl", required=True, help="Path to guidelines.jsonl"
+    )
+    update_parser.add_argument("--index", required=True, help="Index directory")
+    update_parser.add_argument(
+        "--medical-tokens",
+        action="store_true",
+        help="When creating the index: spell out Greek letters and split "
+        "hyphenated terms",
+    )
+    update_parser.set_defaults(func=update)
+
+    merge_parser = commands.add_parser(
+        "merge",
+        help="Merge the segments of an index directory, dropping deleted sections; "
+        "safe to run while the index is being served",
+    )
+    merge_parser.add_argument("--index", required=True, help="Index directory")
+    merge_parser.add_argument(
+        "--max-segments", type=int, default=1, help="Segments to leave"
+    )
+    merge_parser.set_defaults(func=merge)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
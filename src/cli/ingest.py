@@ -1,67 +1,593 @@
 from __future__ import annotations
 
 import argparse
-import json
+import hashlib
+import importlib
 import os
+import time
+from collections import deque
+from functools import partial
 from pathlib import Path
-from typing import Any, Iterable, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
-from rich.progress import track
+from src.utils.manifest import (
+    MANIFEST_NAME,
+    FileEntry,
+    Manifest,
+    fingerprint,
+    manifest_key,
+    plan_ingest,
+)
+from src.utils.metrics import IngestMetrics, StageTimer, stage
 
-from src.parsers.html_parser import parse_html
-from src.parsers.pdf_parser import parse_pdf
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+# (path, encoded JSONL line or record dict, or None on failure; error or None)
+ParseResult = Tuple[Path, Any, Optional[str]]
+# ParseResult plus exclusive seconds per stage (see src.utils.metrics)
+TimedParseResult = Tuple[Path, Any, Optional[str], Dict[str, float]]
+# TimedParseResult plus the file's manifest entry (None if it could not be read)
+FingerprintedResult = Tuple[
+    Path, Any, Optional[str], Dict[str, float], Optional[FileEntry]
+]
+T = TypeVar("T")
+
+
+FILE_PATTERNS = ("*.pdf", "*.PDF", "*.html", "*.htm", "*.HTML", "*.HTM")
 
 
 def find_files(input_dir: str) -> Iterable[Path]:
     p = Path(input_dir)
-    for ext in ("*.pdf", "*.PDF", "*.html", "*.htm", "*.HTML", "*.HTM"):
+    for ext in FILE_PATTERNS:
         for f in p.rglob(ext):
             if f.is_file():
                 yield f
 
 
-def parse_file(path: Path, source: Optional[str] = None) -> Any:
-    suffix = path.suffix.lower()
-    if suffix == ".pdf":
-        return parse_pdf(str(path), source=source)
-    elif suffix in {".html", ".htm"}:
-        return parse_html(str(path), source=source)
+# Parser backends by suffix, imported on first use: PyMuPDF and lxml are
+# only paid for when the corpus actually contains that file type.
+PARSERS = {
+    ".pdf": ("src.parsers.pdf_parser", "parse_pdf"),
+    ".html": ("src.parsers.html_parser", "parse_html"),
+    ".htm": ("src.parsers.html_parser", "parse_html"),
+}
+
+
+def get_parser(suffix: str) -> Callable[..., Any]:
+    try:
+        module, name = PARSERS[suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported file type: {suffix.lower()}") from None
+    parser: Callable[..., Any] = getattr(importlib.import_module(module), name)
+    return parser
+
+
+def parse_file(
+    path: Path,
+    source: Optional[str] = None,
+    pdf_layout: bool = False,
+    data: Optional[bytes] = None,
+    root: Optional[Path] = None,
+) -> Any:
+    """Parse ``path``; ``data``, if given, is its already-read content.
+
+    With ``root`` (the input directory) the document's id is the path relative
+    to it, the key of its manifest entry, so it stays the same across runs.
+    """
+    parser = get_parser(path.suffix)
+    if pdf_layout and path.suffix.lower() == ".pdf":
+        doc = parser(str(path), source=source, layout=True, data=data)
     else:
-        raise ValueError(f"Unsupported file type: {suffix}")
+        doc = parser(str(path), source=source, data=data)
+    if root is not None:
+        doc.id = manifest_key(path, root)
+    return doc
+
+
+def parse_to_line(
+    path: Path,
+    source: Optional[str] = None,
+    pdf_layout: bool = False,
+    data: Optional[bytes] = None,
+    root: Optional[Path] = None,
+) -> ParseResult:
+    """Parse one file into a JSONL line, capturing failures instead of raising.
+
+    Runs inside pool workers, so serialization happens there too and only the
+    finished line crosses the process boundary.
+    """
+    from src.guidelines.serialization import encode_record
+
+    try:
+        doc = parse_file(path, source, pdf_layout, data, root)
+        with stage("serialize"):
+            line = encode_record(doc)
+        return path, line, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def parse_to_record(
+    path: Path,
+    source: Optional[str] = None,
+    pdf_layout: bool = False,
+    data: Optional[bytes] = None,
+    root: Optional[Path] = None,
+) -> ParseResult:
+    """Like ``parse_to_line`` but returns the ``model_dump()`` dict."""
+    try:
+        doc = parse_file(path, source, pdf_layout, data, root)
+        with stage("serialize"):
+            record = doc.model_dump()
+        return path, record, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def parse_timed(
+    path: Path,
+    source: Optional[str] = None,
+    pdf_layout: bool = False,
+    records: bool = False,
+    data: Optional[bytes] = None,
+    root: Optional[Path] = None,
+) -> TimedParseResult:
+    """``parse_to_line`` (or ``parse_to_record``) with per-stage timings."""
+    task = parse_to_record if records else parse_to_line
+    with StageTimer() as timer, timer.stage("other"):
+        result = task(path, source, pdf_layout, data, root)
+    return (*result, timer.times)
+
+
+def parse_fingerprinted(
+    path: Path,
+    root: Path,
+    source: Optional[str] = None,
+    pdf_layout: bool = False,
+    timed: bool = False,
+) -> FingerprintedResult:
+    """``parse_to_line`` that also fingerprints the file for the manifest.
+
+    The file is read once, in the worker: its bytes are hashed and then parsed,
+    so the main process only has to write the line. Read and hash times are
+    reported as the ``read`` and ``fingerprint`` stages when ``timed`` is set.
+    """
+    start = time.perf_counter()
+    try:
+        data = path.read_bytes()
+        read = time.perf_counter()
+        entry = fingerprint(path, root, hashlib.sha256(data).hexdigest())
+    except OSError as e:
+        return path, None, str(e), {}, None
+    hashed = time.perf_counter()
+    if not timed:
+        return (*parse_to_line(path, source, pdf_layout, data, root), {}, entry)
+    _, line, error, timings = parse_timed(path, source, pdf_layout, False, data, root)
+    timings["read"] = read - start
+    timings["fingerprint"] = hashed - read
+    return path, line, error, timings, entry
+
+
+def iter_parsed(
+    files: List[Path],
+    source: Optional[str] = None,
+    workers: int = 1,
+    ordered: bool = False,
+    max_in_flight: Optional[int] = None,
+    pdf_layout: bool = False,
+    records: bool = False,
+    root: Optional[Path] = None,
+) -> Iterator[ParseResult]:
+    """Yield parse results for ``files``, optionally from a process pool.
+
+    With ``workers > 1`` at most ``max_in_flight`` files (default ``4 * workers``)
+    are submitted at a time so memory stays bounded on large corpora. When
+    ``ordered`` is set results are yielded in input order; otherwise they are
+    yielded as soon as they complete. Results carry JSONL lines, or record
+    dicts when ``records`` is set. With ``root`` documents get ids as in
+    ``parse_file``.
+    """
+    task = parse_to_record if records else parse_to_line
+    return _run_tasks(
+        partial(task, source=source, pdf_layout=pdf_layout, root=root),
+        files,
+        workers,
+        ordered,
+        max_in_flight,
+    )
+
+
+def iter_parsed_timed(
+    files: List[Path],
+    source: Optional[str] = None,
+    workers: int = 1,
+    ordered: bool = False,
+    max_in_flight: Optional[int] = None,
+    pdf_layout: bool = False,
+    records: bool = False,
+    root: Optional[Path] = None,
+) -> Iterator[TimedParseResult]:
+    """``iter_parsed`` whose results also carry per-stage timings."""
+    return _run_tasks(
+        partial(
+            parse_timed,
+            source=source,
+            pdf_layout=pdf_layout,
+            records=records,
+            root=root,
+        ),
+        files,
+        workers,
+        ordered,
+        max_in_flight,
+    )
+
+
+def _run_tasks(
+    task: Callable[[Path], T],
+    files: List[Path],
+    workers: int,
+    ordered: bool,
+    max_in_flight: Optional[int],
+) -> Iterator[T]:
+    if workers <= 1:
+        for f in files:
+            yield task(f)
+        return
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    limit = max(1, max_in_flight or 4 * workers)
+    pending_files = iter(files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        def submit_next() -> Optional[Future[T]]:
+            f = next(pending_files, None)
+            if f is None:
+                return None
+            return pool.submit(task, f)
+
+        if ordered:
+            queue: Deque[Future[T]] = deque()
+            for _ in range(limit):
+                fut = submit_next()
+                if fut is None:
+                    break
+                queue.append(fut)
+            while queue:
+                result = queue.popleft().result()
+                fut = submit_next()
+                if fut is not None:
+                    queue.append(fut)
+                yield result
+        else:
+            in_flight: Set[Future[T]] = set()
+            for _ in range(limit):
+                fut = submit_next()
+                if fut is None:
+                    break
+                in_flight.add(fut)
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for d in done:
+                    fut = submit_next()
+                    if fut is not None:
+                        in_flight.add(fut)
+                    yield d.result()
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(
-        description="Ingest clinical guidelines into structured JSONL"
+        description="Ingest clinical guidelines into structured JSONL or tables"
     )
     parser.add_argument(
         "--input", required=True, help="Input directory containing guideline files"
     )
-    parser.add_argument("--output", required=True, help="Output directory for JSONL")
+    parser.add_argument("--output", required=True, help="Output directory")
     parser.add_argument(
-        "--format", default="jsonl", choices=["jsonl"], help="Output format"
+        "--format",
+        default="jsonl",
+        choices=["jsonl", "parquet", "arrow"],
+        help="Output format; parquet/arrow write one row per section (needs pyarrow)",
     )
     parser.add_argument("--source", default=None, help="Source label, e.g., AHA/ACC")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of parser processes (1 parses in the current process)",
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="Write records in file discovery order when using --workers",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse records from the previous run for files that have not changed",
+    )
+    parser.add_argument(
+        "--pdf-layout",
+        action="store_true",
+        help="Detect PDF headings from font size/weight and drop running headers",
+    )
+    parser.add_argument(
+        "--async",
+        dest="async_io",
+        action="store_true",
+        help="Asyncio pipeline: walk directories lazily and overlap file reads, "
+        "parsing and batched writes (JSONL only)",
+    )
+    parser.add_argument(
+        "--readers",
+        type=int,
+        default=8,
+        help="Concurrent file reads with --async (default 8)",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=64,
+        help="Files between discovery and write with --async (default 64)",
+    )
+    parser.add_argument(
+        "--metrics-out",
+        help="Write per-stage timings, histograms and the slowest files as JSON",
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=20,
+        help="Number of slowest files kept in --metrics-out (default 20)",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Write cProfile stats of the run to this file (read with pstats)",
+    )
 
     args = parser.parse_args()
 
     os.makedirs(args.output, exist_ok=True)
+    if args.format != "jsonl" and args.incremental:
+        parser.error("--incremental is only supported with --format jsonl")
+    if args.format != "jsonl" and args.async_io:
+        parser.error("--async is only supported with --format jsonl")
+
+    metrics = IngestMetrics(args.slowest) if args.metrics_out else None
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        if args.workers > 1:
+            print("Note: --profile only covers the main process; use --workers 1")
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        if args.format != "jsonl":
+            _ingest_table(args, metrics)
+        elif args.async_io:
+            _ingest_async(args, metrics)
+        else:
+            _ingest_jsonl(args, metrics)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Wrote profile to {args.profile}")
+    if metrics is not None:
+        metrics.finish()
+        metrics.save(args.metrics_out)
+        _print_slowest(metrics)
+        print(f"Wrote metrics to {args.metrics_out}")
+
+
+def _parse_all(
+    files: List[Path],
+    args: argparse.Namespace,
+    metrics: Optional[IngestMetrics],
+    records: bool = False,
+) -> Iterator[TimedParseResult]:
+    """Parse ``files`` as the CLI options say; stages are only timed for metrics."""
+    options = dict(
+        source=args.source,
+        workers=args.workers,
+        ordered=args.ordered,
+        pdf_layout=args.pdf_layout,
+        records=records,
+        root=Path(args.input),
+    )
+    if metrics is not None:
+        return iter_parsed_timed(files, **options)
+    return ((f, out, error, {}) for f, out, error in iter_parsed(files, **options))
+
+
+def _record_failure(
+    metrics: Optional[IngestMetrics],
+    f: Path,
+    error: Optional[str],
+    timings: Dict[str, float],
+) -> None:
+    # Log to stderr but continue
+    print(f"Failed to parse {f}: {error}")
+    if metrics is not None:
+        try:
+            size = f.stat().st_size
+        except OSError:
+            size = 0
+        metrics.record(str(f), timings, size, error or "")
+
+
+def _print_slowest(metrics: IngestMetrics, n: int = 5) -> None:
+    slowest = metrics.slowest_files()[:n]
+    if not slowest:
+        return
+    print("Slowest files:")
+    for entry in slowest:
+        name, ms = max(entry["stages_ms"].items(), key=lambda kv: kv[1])
+        share = ms / entry["total_ms"] if entry["total_ms"] else 0.0
+        print(
+            f"  {entry['total_ms']:10.1f} ms  {name} {share:4.0%}  "
+            f"{entry['bytes']:>10,} B  {entry['path']}"
+        )
+
+
+def _previous_manifest(args: argparse.Namespace, out_path: Path) -> Manifest:
+    """The manifest of the last run if ``--incremental`` can reuse its records."""
+    if not args.incremental or not out_path.exists():
+        return Manifest()
+    previous = Manifest.load(out_path.parent / MANIFEST_NAME)
+    if (previous.source, previous.pdf_layout) != (args.source, args.pdf_layout):
+        return Manifest()
+    return previous
+
+
+def _ingest_jsonl(args: argparse.Namespace, metrics: Optional[IngestMetrics]) -> None:
     out_path = Path(args.output) / "guidelines.jsonl"
+    manifest_path = Path(args.output) / MANIFEST_NAME
+    root = Path(args.input)
+    previous = _previous_manifest(args, out_path)
+
+    from rich.progress import track
+
+    files = list(find_files(args.input))
+    plan = plan_ingest(previous, files, root)
+    # Import only the backends this run needs, before any pool workers fork
+    for suffix in {f.suffix.lower() for f in plan.changed}:
+        get_parser(suffix)
+    manifest = Manifest(source=args.source, pdf_layout=args.pdf_layout)
 
     count = 0
-    with open(out_path, "w", encoding="utf-8") as out:
-        for f in track(list(find_files(args.input)), description="Parsing guidelines"):
-            try:
-                doc = parse_file(f, source=args.source)
-                record = doc.model_dump()
-                out.write(json.dumps(record, ensure_ascii=False) + "\n")
-                count += 1
-            except Exception as e:
-                # Log to stderr but continue
-                print(f"Failed to parse {f}: {e}")
+    tmp_path = Path(str(out_path) + ".tmp")
+    with open(tmp_path, "wb") as out:
+        if plan.unchanged:
+            with open(out_path, "rb") as old:
+                for f, entry in plan.unchanged:
+                    old.seek(entry.offset)
+                    data = old.read(entry.length)
+                    entry.offset = out.tell()
+                    out.write(data)
+                    manifest.files[entry.path] = entry
+                    count += 1
+            if metrics is not None:
+                metrics.reused = len(plan.unchanged)
+
+        # Workers hash the bytes they parse, so files are read only once
+        task = partial(
+            parse_fingerprinted,
+            root=root,
+            source=args.source,
+            pdf_layout=args.pdf_layout,
+            timed=metrics is not None,
+        )
+        results = _run_tasks(task, plan.changed, args.workers, args.ordered, None)
+        for f, line, error, timings, fingerprinted in track(
+            results, total=len(plan.changed), description="Parsing guidelines"
+        ):
+            if line is None or fingerprinted is None:
+                _record_failure(metrics, f, error, timings)
+                continue
+            start = time.perf_counter()
+            entry = fingerprinted
+            entry.offset = out.tell()
+            entry.length = len(line)
+            out.write(line)
+            manifest.files[entry.path] = entry
+            count += 1
+            if metrics is not None:
+                timings["write"] = time.perf_counter() - start
+                metrics.record(str(f), timings, entry.size)
 
+    os.replace(tmp_path, out_path)
+    manifest.save(manifest_path)
+
+    if args.incremental:
+        print(
+            f"Reused {len(plan.unchanged)}, parsed {len(plan.changed)}, "
+            f"removed {len(plan.removed)}"
+        )
     print(f"Wrote {count} records to {out_path}")
 
 
+def _ingest_async(args: argparse.Namespace, metrics: Optional[IngestMetrics]) -> None:
+    """``_ingest_jsonl`` on the asyncio pipeline of ``src.cli.async_ingest``."""
+    from rich.progress import Progress
+
+    from src.cli.async_ingest import ingest_jsonl
+
+    out_path = Path(args.output) / "guidelines.jsonl"
+    previous = _previous_manifest(args, out_path)
+    manifest = Manifest(source=args.source, pdf_layout=args.pdf_layout)
+    with Progress() as progress:
+        pipeline = ingest_jsonl(
+            Path(args.input),
+            out_path,
+            previous,
+            manifest,
+            progress,
+            source=args.source,
+            pdf_layout=args.pdf_layout,
+            workers=args.workers,
+            readers=args.readers,
+            max_in_flight=args.max_in_flight,
+            ordered=args.ordered,
+            metrics=metrics,
+        )
+    manifest.save(out_path.parent / MANIFEST_NAME)
+    if metrics is not None:
+        metrics.reused = pipeline.reused
+
+    if args.incremental:
+        print(
+            f"Reused {pipeline.reused}, parsed {pipeline.parsed + pipeline.failed}, "
+            f"removed {len(pipeline.removed)}"
+        )
+    print(f"Wrote {pipeline.written} records to {out_path}")
+
+
+def _ingest_table(args: argparse.Namespace, metrics: Optional[IngestMetrics]) -> None:
+    """Parse every file into a Parquet / Arrow section table, streaming rows."""
+    from rich.progress import track
+
+    from src.guidelines.columnar import SectionTableWriter
+
+    suffix = ".parquet" if args.format == "parquet" else ".arrows"
+    out_path = Path(args.output) / f"guidelines{suffix}"
+    files = list(find_files(args.input))
+    for ext in {f.suffix.lower() for f in files}:
+        get_parser(ext)
+
+    tmp_path = Path(str(out_path) + ".tmp")
+    with SectionTableWriter(str(tmp_path), fmt=args.format) as writer:
+        results = _parse_all(files, args, metrics, records=True)
+        for f, record, error, timings in track(
+            results, total=len(files), description="Parsing guidelines"
+        ):
+            if record is None:
+                _record_failure(metrics, f, error, timings)
+                continue
+            start = time.perf_counter()
+            writer.add(record)
+            if metrics is not None:
+                timings["write"] = time.perf_counter() - start
+                metrics.record(str(f), timings, f.stat().st_size)
+    os.replace(tmp_path, out_path)
+    print(f"Wrote {writer.documents} records ({writer.rows} rows) to {out_path}")
+
+
 if __name__ == "__main__":
     main()
@@ -3,24 +3,141 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-
-from src.search.bm25_index import BM25SectionIndex
+from typing import Any, Dict, List
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Search guideline JSONL with BM25")
-    parser.add_argument("--jsonl", required=True, help="Path to guidelines.jsonl")
-    parser.add_argument("--query", required=True, help="Search query text")
+    corpus = parser.add_mutually_exclusive_group(required=True)
+    corpus.add_argument("--jsonl", help="Path to guidelines.jsonl")
+    corpus.add_argument(
+        "--table", help="Section table (.parquet/.arrows) from clinical-ingest"
+    )
+    corpus.add_argument(
+        "--index",
+        help="Index file from `clinical-index build`, or a directory from "
+        "`clinical-index update`",
+    )
+    queries = parser.add_mutually_exclusive_group(required=True)
+    queries.add_argument("--query", help="Search query text")
+    queries.add_argument(
+        "--queries-file", help="File with one query per line, searched as a batch"
+    )
     parser.add_argument("--k", type=int, default=5, help="Top-k results")
+    parser.add_argument(
+        "--medical-tokens",
+        action="store_true",
+        help="Spell out Greek letters and split hyphenated terms "
+        "(ACE-inhibitor matches ACE inhibitor)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Threads used for --queries-file"
+    )
+    filters = parser.add_argument_group("filters")
+    filters.add_argument(
+        "--source", action="append", help="Only this source (repeatable)"
+    )
+    filters.add_argument(
+        "--date-from", help="Effective date on or after YYYY[-MM[-DD]]"
+    )
+    filters.add_argument("--date-to", help="Effective date on or before YYYY[-MM[-DD]]")
+    filters.add_argument(
+        "--level", type=int, action="append", help="Heading level (repeatable)"
+    )
+    filters.add_argument(
+        "--grade", action="append", help="Evidence grade, e.g. A (repeatable)"
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="With --jsonl: build N shards in parallel and search them concurrently",
+    )
+    parser.add_argument(
+        "--passage-tokens",
+        type=int,
+        default=None,
+        help="With --jsonl/--table: index passages of at most N tokens instead "
+        "of whole sections; results keep the best passage of each section",
+    )
+    parser.add_argument(
+        "--passage-overlap",
+        type=int,
+        default=0,
+        help="Tokens shared by consecutive passages of a section",
+    )
     args = parser.parse_args()
+    if args.index and args.medical_tokens:
+        parser.error("--medical-tokens is stored in index files; pass it to build")
+    if args.index and args.passage_tokens:
+        parser.error("--passage-tokens is stored in index files; pass it to build")
+    if args.passage_overlap and args.passage_tokens is None:
+        parser.error("--passage-overlap needs --passage-tokens")
+    if args.shards > 1 and not args.jsonl:
+        parser.error("--shards needs --jsonl")
+    chunker = _chunker(args)
+
+    from src.search.filters import SearchFilter
+
+    try:
+        search_filter = SearchFilter.from_params(vars(args))
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    if args.index:
+        from src.search.segments import open_index
+
+        if not Path(args.index).exists():
+            raise SystemExit(f"Index not found: {args.index}")
+        index: Any = open_index(args.index)
+    elif args.table:
+        from src.search.bm25_index import BM25SectionIndex
+
+        if not Path(args.table).exists():
+            raise SystemExit(f"Table not found: {args.table}")
+        index = BM25SectionIndex.from_table(args.table, _tokenizer(args), chunker)
+    else:
+        from src.search.bm25_index import BM25SectionIndex
+
+        if not Path(args.jsonl).exists():
+            raise SystemExit(f"JSONL not found: {args.jsonl}")
+        index = BM25SectionIndex.from_jsonl(
+            args.jsonl, _tokenizer(args), shards=args.shards, chunker=chunker
+        )
+
+    if args.query is not None:
+        results: List[Dict[str, Any]] = index.search(
+            args.query, k=args.k, filters=search_filter
+        )
+        print(json.dumps({"results": results}, ensure_ascii=False, indent=2))
+        return
+
+    if not Path(args.queries_file).exists():
+        raise SystemExit(f"Queries file not found: {args.queries_file}")
+    lines = Path(args.queries_file).read_text(encoding="utf-8").splitlines()
+    batch = [q.strip() for q in lines if q.strip()]
+    batch_results = index.search_many(
+        batch, k=args.k, workers=args.workers, filters=search_filter
+    )
+    payload = [{"query": q, "results": r} for q, r in zip(batch, batch_results)]
+    print(json.dumps({"queries": payload}, ensure_ascii=False, indent=2))
+
+
+def _tokenizer(args: argparse.Namespace) -> Any:
+    from src.search.tokenizer import Tokenizer
+
+    return Tokenizer(medical=args.medical_tokens)
 
-    if not Path(args.jsonl).exists():
-        raise SystemExit(f"JSONL not found: {args.jsonl}")
 
-    index = BM25SectionIndex.from_jsonl(args.jsonl)
-    results = index.search(args.query, k=args.k)
+def _chunker(args: argparse.Namespace) -> Any:
+    if args.passage_tokens is None:
+        return None
+    from src.search.chunking import Chunker
 
-    print(json.dumps({"results": results}, ensure_ascii=False, indent=2))
+    try:
+        return Chunker(args.passage_tokens, args.passage_overlap)
+    except ValueError as e:
+        raise SystemExit(f"--passage-tokens/--passage-overlap: {e}")
 
 
 if __name__ == "__main__":
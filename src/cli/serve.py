@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve BM25 search over HTTP from a warm index"
+    )
+    parser.add_argument(
+        "--index",
+        required=True,
+        help="Index file from `clinical-index build`, or a directory from "
+        "`clinical-index update`",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=2.0,
+        help="Seconds between checks for a rebuilt or updated index (0 disables)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        help="Result lists kept for repeated queries (0 disables the cache)",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        help="Seconds a cached result stays valid (default: until the index changes)",
+    )
+    args = parser.parse_args()
+
+    if not Path(args.index).exists():
+        raise SystemExit(f"Index not found: {args.index}")
+
+    from src.search.cache import QueryCache
+    from src.search.server import IndexHolder, SearchServer
+
+    holder = IndexHolder(args.index)
+    cache = QueryCache(args.cache_size, args.cache_ttl) if args.cache_size > 0 else None
+    server = SearchServer((args.host, args.port), holder, args.reload_interval, cache)
+    server.start_watcher()
+    print(
+        f"Serving {len(holder.index)} sections on http://{args.host}:{args.port} "
+        "(GET /search?q=...&k=5, POST /search, GET /metrics)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
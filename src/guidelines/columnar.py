@@ -0,0 +1,200 @@
+"""Columnar (Parquet / Arrow IPC stream) storage for parsed guidelines.
+
+Documents are flattened to one row per section. Document-level fields repeat
+on every row of the document and are dictionary-encoded, so each distinct
+value is stored once per row group. Requires the optional ``pyarrow``
+dependency (``pip install 'clinical-guideline-parser[parquet]'``).
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# Rows buffered before a row group / record batch is written
+ROW_GROUP_ROWS = 8192
+
+# Column name -> (arrow type name, dictionary-encoded)
+COLUMNS = {
+    "doc_index": ("int32", False),
+    "doc_id": ("string", True),
+    "title": ("string", True),
+    "source": ("string", True),
+    "url": ("string", True),
+    "publication_date": ("string", True),
+    "last_updated": ("string", True),
+    "raw_text_chars": ("int64", False),
+    # Position in the document's "sections"; null for a document without any
+    "section_index": ("int32", False),
+    "heading": ("string", False),
+    "level": ("int16", False),
+    "text": ("string", False),
+    "evidence_grade": ("string", True),
+    "evidence_system": ("string", True),
+    "evidence_notes": ("string", False),
+}
+
+# Row column <- document field, repeated on every section row
+DOCUMENT_COLUMNS = (
+    ("doc_id", "id"),
+    ("title", "title"),
+    ("source", "source"),
+    ("url", "url"),
+    ("publication_date", "publication_date"),
+    ("last_updated", "last_updated"),
+    ("raw_text_chars", "raw_text_chars"),
+)
+SECTION_COLUMNS = (
+    "section_index",
+    "heading",
+    "level",
+    "text",
+    "evidence_grade",
+    "evidence_system",
+    "evidence_notes",
+)
+
+# Arrow uses the IPC *stream* format: the file format cannot hold a different
+# dictionary per record batch, which streaming row groups produce
+FORMATS = {".parquet": "parquet", ".arrows": "arrow"}
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError(
+            "Parquet/Arrow output needs pyarrow: "
+            "pip install 'clinical-guideline-parser[parquet]'"
+        ) from None
+    return pyarrow
+
+
+def table_format(path: str) -> str:
+    """``"parquet"`` or ``"arrow"`` from the file suffix."""
+    try:
+        return FORMATS[Path(path).suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported table file type: {path}") from None
+
+
+def schema() -> Any:
+    pa = _pyarrow()
+    fields = []
+    for name, (type_name, dictionary) in COLUMNS.items():
+        arrow_type = getattr(pa, type_name)()
+        if dictionary:
+            arrow_type = pa.dictionary(pa.int32(), arrow_type)
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+class SectionTableWriter:
+    """Streams parsed documents into a Parquet or Arrow IPC stream file.
+
+    Rows are buffered column by column and flushed as one row group (Parquet)
+    or record batch (Arrow) every ``row_group_rows`` rows, so memory does not
+    grow with the corpus.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        row_group_rows: int = ROW_GROUP_ROWS,
+        fmt: Optional[str] = None,
+    ):
+        pa = _pyarrow()
+        self.path = path
+        self.format = fmt or table_format(path)
+        self.row_group_rows = row_group_rows
+        self.schema = schema()
+        self.documents = 0
+        self.rows = 0
+        self._columns: Dict[str, List[Any]] = {name: [] for name in COLUMNS}
+        self._writer: Any
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def __enter__(self) -> "SectionTableWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Add one document, as produced by ``GuidelineDocument.model_dump()``."""
+        doc = [(column, record.get(key)) for column, key in DOCUMENT_COLUMNS]
+        sections = record.get("sections") or [None]
+        cols = self._columns
+        for position, sec in enumerate(sections):
+            cols["doc_index"].append(self.documents)
+            for column, value in doc:
+                cols[column].append(value)
+            if sec is None:
+                for name in SECTION_COLUMNS:
+                    cols[name].append(None)
+                continue
+            evidence = sec.get("evidence") or {}
+            cols["section_index"].append(position)
+            cols["heading"].append(sec.get("heading"))
+            cols["level"].append(sec.get("level"))
+            cols["text"].append(sec.get("text"))
+            cols["evidence_grade"].append(evidence.get("grade"))
+            cols["evidence_system"].append(evidence.get("system"))
+            cols["evidence_notes"].append(evidence.get("notes"))
+        self.documents += 1
+        self.rows += len(sections)
+        if len(cols["doc_index"]) >= self.row_group_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._columns["doc_index"]:
+            return
+        pa = _pyarrow()
+        arrays = []
+        for field in self.schema:
+            values = self._columns[field.name]
+            if pa.types.is_dictionary(field.type):
+                array = pa.array(values, type=field.type.value_type)
+                arrays.append(array.dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+            values.clear()
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if self.format == "parquet":
+            self._writer.write_batch(batch, row_group_size=batch.num_rows)
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        if self.format == "arrow":
+            self._sink.close()
+        self._writer = None
+
+
+def read_sections(
+    path: str, columns: Optional[Sequence[str]] = None, fmt: Optional[str] = None
+) -> Any:
+    """Read a section table written by ``SectionTableWriter`` as a ``pyarrow.Table``.
+
+    Only ``columns`` are read. Arrow IPC files are memory-mapped, so their
+    columns are zero-copy views of the file; Parquet columns are decoded.
+    """
+    pa = _pyarrow()
+    names = list(columns) if columns is not None else None
+    if (fmt or table_format(path)) == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, columns=names, memory_map=True)
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_stream(source).read_all()
+    return table.select(names) if names is not None else table
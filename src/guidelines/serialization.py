@@ -0,0 +1,227 @@
+"""JSONL encoding and decoding of guideline records.
+
+``encode_record`` produces exactly the bytes of
+``json.dumps(doc.model_dump(), ensure_ascii=False)``, so JSONL files, record
+offsets and the record hashes of segment manifests do not change, but walks
+the models once without building the intermediate dicts.
+``GuidelineDocument``, ``GuidelineSection`` and ``Evidence`` have hand-written
+encoders, recognised by their field layout so that pydantic is not imported
+here; other models and plain dicts are walked generically. Strings go through
+the fastest escaper available: ``orjson`` when installed (it escapes exactly the characters
+``json.dumps(..., ensure_ascii=False)`` does), otherwise the C escaper of the
+``json`` module. ``loads`` decodes a line with ``orjson`` when available.
+"""
+
+from __future__ import annotations
+
+import json
+from json.encoder import encode_basestring
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+try:  # optional: pip install 'clinical-guideline-parser[fast]'
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+BACKENDS = ("orjson", "json") if orjson is not None else ("json",)
+BACKEND = BACKENDS[0]
+
+_Escape = Callable[[str], bytes]
+# Per model class: (attribute, encoded '"name": ' prefix) for every field
+_FIELDS: Dict[type, List[Tuple[str, bytes]]] = {}
+# Field layouts of GuidelineDocument / GuidelineSection / Evidence, which get
+# hand-written encoders; any other model goes through the generic walk
+_DOCUMENT = (
+    "id",
+    "title",
+    "source",
+    "url",
+    "publication_date",
+    "last_updated",
+    "sections",
+    "raw_text_chars",
+)
+_SECTION = ("heading", "level", "text", "evidence")
+_EVIDENCE = ("grade", "system", "notes")
+_LAYOUTS: Dict[type, Tuple[str, ...]] = {}
+
+
+def _json_escape(value: str) -> bytes:
+    return encode_basestring(value).encode("utf-8")
+
+
+def _backend(backend: Optional[str]) -> str:
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown or unavailable backend: {backend}")
+    return backend
+
+
+def _escaper(backend: Optional[str]) -> _Escape:
+    if _backend(backend) == "orjson":
+        escape: _Escape = orjson.dumps
+        return escape
+    return _json_escape
+
+
+def _layout(cls: type) -> Tuple[str, ...]:
+    layout = _LAYOUTS.get(cls)
+    if layout is None:
+        layout = tuple(getattr(cls, "model_fields", None) or ())
+        _LAYOUTS[cls] = layout
+    return layout
+
+
+def _fields(cls: type, escape: _Escape) -> List[Tuple[str, bytes]]:
+    fields = _FIELDS.get(cls)
+    if fields is None:
+        fields = [(name, escape(name) + b": ") for name in _layout(cls)]
+        _FIELDS[cls] = fields
+    return fields
+
+
+def _value(value: Any, escape: _Escape) -> bytes:
+    out: List[bytes] = []
+    _encode(value, escape, out)
+    return b"".join(out)
+
+
+def _str(value: Any, escape: _Escape) -> bytes:
+    if value is None:
+        return b"null"
+    if type(value) is str:
+        return escape(value)
+    return _value(value, escape)
+
+
+def _int(value: Any, escape: _Escape) -> bytes:
+    if type(value) is int:
+        return b"%d" % value
+    return _value(value, escape)
+
+
+def _encode_evidence(ev: Any, escape: _Escape) -> bytes:
+    if ev is None:
+        return b"null"
+    if _layout(type(ev))[: len(_EVIDENCE)] != _EVIDENCE:
+        return _value(ev, escape)
+    return b"".join(
+        (
+            b'{"grade": ',
+            _str(ev.grade, escape),
+            b', "system": ',
+            _str(ev.system, escape),
+            b', "notes": ',
+            _str(ev.notes, escape),
+            b"}",
+        )
+    )
+
+
+def _encode_section(sec: Any, escape: _Escape) -> bytes:
+    # Like pydantic, a subclass in a declared field is dumped with the fields
+    # of the declared class only
+    if _layout(type(sec))[: len(_SECTION)] != _SECTION:
+        return _value(sec, escape)
+    return b"".join(
+        (
+            b'{"heading": ',
+            _str(sec.heading, escape),
+            b', "level": ',
+            _int(sec.level, escape),
+            b', "text": ',
+            _str(sec.text, escape),
+            b', "evidence": ',
+            _encode_evidence(sec.evidence, escape),
+            b"}",
+        )
+    )
+
+
+def _encode_document(doc: Any, escape: _Escape) -> bytes:
+    sections = doc.sections
+    if type(sections) is list:
+        body = b", ".join([_encode_section(sec, escape) for sec in sections])
+        encoded = b"[" + body + b"]"
+    else:
+        encoded = _value(sections, escape)
+    raw = doc.raw_text_chars
+    return b"".join(
+        (
+            b'{"id": ',
+            _str(doc.id, escape),
+            b', "title": ',
+            _str(doc.title, escape),
+            b', "source": ',
+            _str(doc.source, escape),
+            b', "url": ',
+            _str(doc.url, escape),
+            b', "publication_date": ',
+            _str(doc.publication_date, escape),
+            b', "last_updated": ',
+            _str(doc.last_updated, escape),
+            b', "sections": ',
+            encoded,
+            b', "raw_text_chars": ',
+            b"null" if raw is None else _int(raw, escape),
+            b"}",
+        )
+    )
+
+
+def _encode(value: Any, escape: _Escape, out: List[bytes]) -> None:
+    # Appends the pieces of ``value``'s JSON text to ``out``; exact types are
+    # checked first since they cover almost every value in a record
+    kind = type(value)
+    if kind is str:
+        out.append(escape(value))
+    elif value is None:
+        out.append(b"null")
+    elif kind is int:
+        out.append(b"%d" % value)
+    elif kind is list or kind is tuple:
+        out.append(b"[")
+        for i, item in enumerate(value):
+            if i:
+                out.append(b", ")
+            _encode(item, escape, out)
+        out.append(b"]")
+    elif _layout(kind):
+        # A pydantic model, dumped as model_dump() would: every field in order
+        out.append(b"{")
+        for i, (name, prefix) in enumerate(_fields(kind, escape)):
+            if i:
+                out.append(b", ")
+            out.append(prefix)
+            _encode(getattr(value, name), escape, out)
+        out.append(b"}")
+    elif kind is dict and all(type(key) is str for key in value):
+        out.append(b"{")
+        for i, (key, item) in enumerate(value.items()):
+            if i:
+                out.append(b", ")
+            out.append(escape(key))
+            out.append(b": ")
+            _encode(item, escape, out)
+        out.append(b"}")
+    else:
+        # bool, float and anything else: whatever json.dumps writes
+        out.append(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def encode_record(value: Any, backend: Optional[str] = None) -> bytes:
+    """One JSONL line (with the trailing newline) for a model or record dict."""
+    escape = _escaper(backend)
+    if _layout(type(value)) == _DOCUMENT:
+        return _encode_document(value, escape) + b"\n"
+    out: List[bytes] = []
+    _encode(value, escape, out)
+    out.append(b"\n")
+    return b"".join(out)
+
+
+def loads(data: Union[str, bytes], backend: Optional[str] = None) -> Any:
+    """``json.loads`` through the selected backend."""
+    if _backend(backend) == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,117 +1,327 @@
 from __future__ import annotations
 
-from typing import Any, List, Optional, Union
+import codecs
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from bs4 import BeautifulSoup, NavigableString, PageElement, Tag
+from lxml import etree
 
 from src.guidelines.models import Evidence, GuidelineDocument, GuidelineSection
 from src.utils.dates import parse_date
-from src.utils.evidence import extract_evidence
-
-
-def parse_html(path: str, source: Optional[str] = None) -> GuidelineDocument:
-    with open(path, "rb") as f:
-        data = f.read()
-    soup = BeautifulSoup(data, "lxml")
-
-    title = _get_title(soup)
-    pub, updated = _get_dates(soup)
-
-    sections = _extract_sections(soup)
-
-    raw_text_chars = len(soup.get_text("\n")) if soup else None
-
-    return GuidelineDocument(
-        id=None,
-        title=title,
-        source=source,
-        url=None,
-        publication_date=pub,
-        last_updated=updated,
-        sections=sections,
-        raw_text_chars=raw_text_chars,
-    )
-
-
-def _get_title(soup: BeautifulSoup) -> Optional[str]:
-    if soup.title and soup.title.string:
-        return str(soup.title.string.strip())
-    h1 = soup.find(["h1", "h2"]) if soup else None
-    if h1 and h1.get_text(strip=True):
-        return str(h1.get_text(strip=True))
-    return None
-
-
-def _get_dates(soup: BeautifulSoup) -> tuple[Optional[str], Optional[str]]:
-    pub = None
-    updated = None
-    for tag in soup.find_all(["time", "meta", "span", "p"]):
-        if not isinstance(tag, Tag):
-            continue
-        text = (
-            tag.get("datetime") or tag.get("content") or tag.get_text(" ", strip=True)
+from src.utils.evidence import DocumentEvidence
+from src.utils.metrics import stage
+
+HEADER_TAGS = frozenset(["h1", "h2", "h3", "h4"])
+DATE_TAGS = frozenset(["time", "meta", "span", "p"])
+# Text inside these never counts as document text
+SKIP_TEXT_TAGS = frozenset(["script", "style", "template"])
+DECLARED_CHARSET = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_\-:.]+)""", re.IGNORECASE
+)
+FEED_CHUNK = 1 << 16
+
+
+def parse_html(
+    path: str, source: Optional[str] = None, data: Optional[bytes] = None
+) -> GuidelineDocument:
+    """Parse an HTML guideline from ``path``, or from ``data`` if already read."""
+    if data is None:
+        with stage("read"):
+            with open(path, "rb") as f:
+                data = f.read()
+
+    handler = _GuidelineHandler()
+    with stage("extract"):
+        parser = etree.HTMLParser(
+            target=handler, encoding=_detect_encoding(data), recover=True
+        )
+        # The target receives SAX-style events, so no tree is ever built and
+        # the document is walked exactly once for title, dates, sections and
+        # size.
+        view = memoryview(data)
+        for start in range(0, len(view), FEED_CHUNK):
+            parser.feed(view[start : start + FEED_CHUNK].tobytes())
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            # Empty or whitespace-only input: nothing was emitted
+            pass
+
+    with stage("metadata"):
+        pub, updated = handler.dates()
+        title = handler.title()
+    with stage("sections"):
+        return GuidelineDocument(
+            id=None,
+            title=title,
+            source=source,
+            url=None,
+            publication_date=pub,
+            last_updated=updated,
+            sections=handler.sections(),
+            raw_text_chars=handler.raw_text_chars,
         )
-        if not text or not isinstance(text, str):
-            continue
-        d = parse_date(text)
-        if d:
-            if tag.name == "time" and tag.get("itemprop") in {
+
+
+def _detect_encoding(data: bytes) -> str:
+    """BOM, then a declared ``<meta charset>``, then UTF-8 or Windows-1252."""
+    if data.startswith(b"\xef\xbb\xbf"):
+        return "utf-8"
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return "utf-16"
+    m = DECLARED_CHARSET.search(data[:4096])
+    if m:
+        try:
+            return codecs.lookup(m.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    try:
+        data.decode("utf-8")
+    except UnicodeDecodeError:
+        return "windows-1252"
+    return "utf-8"
+
+
+class _Section:
+    __slots__ = ("level", "depth", "heading_parts", "start", "end")
+
+    def __init__(self, level: int, depth: int):
+        self.level = level
+        # Depth of the header element; the section spans its following
+        # siblings, i.e. everything until its parent (depth - 1) closes or a
+        # sibling header (same depth) opens.
+        self.depth = depth
+        self.heading_parts: List[str] = []
+        # Body as a range of the document's text parts; nested sections
+        # share parts instead of each keeping a copy
+        self.start = 0
+        self.end: Optional[int] = None
+
+
+class _DateCandidate:
+    __slots__ = ("tag", "depth", "attrs", "text", "parts")
+
+    def __init__(
+        self, tag: str, depth: int, attrs: Dict[str, str], text: Optional[str]
+    ):
+        self.tag = tag
+        self.depth = depth
+        self.attrs = attrs
+        self.text = text
+        self.parts: Optional[List[str]] = None if text else []
+
+
+class _GuidelineHandler:
+    """lxml parser target that extracts everything ``parse_html`` needs.
+
+    Text is buffered between tag events so each text node arrives as one
+    string, as it would in a tree, then routed to whichever headings, sections
+    and date candidates are open at that point.
+    """
+
+    def __init__(self) -> None:
+        self._stack: List[str] = []
+        self._buffer: List[str] = []
+        self._skip_depth = 0
+        self._all_sections: List[_Section] = []
+        self._open_headers: List[_Section] = []
+        self._active: List[_Section] = []
+        self._dates: List[_DateCandidate] = []
+        self._open_dates: List[_DateCandidate] = []
+        self._parts: List[str] = []
+        self._title_state = 0  # 0: not seen, 1: inside first <title>, 2: done
+        self._title_parts: List[str] = []
+        self._title_has_child = False
+        self._first_h12: Optional[_Section] = None
+        self._text_nodes = 0
+        self._text_chars = 0
+
+    # -- lxml target interface -------------------------------------------
+
+    def start(self, tag: Any, attrib: Any) -> None:
+        self._flush()
+        if not isinstance(tag, str):
+            return
+        depth = len(self._stack) + 1
+        self._stack.append(tag)
+        if self._title_state == 1:
+            self._title_has_child = True
+        elif tag == "title" and self._title_state == 0:
+            self._title_state = 1
+        if tag in SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+        if tag in HEADER_TAGS:
+            # A header closes earlier sections that are its siblings
+            self._cut(lambda s: s.depth != depth)
+            sec = _Section(_level_from_tag(tag), depth)
+            self._all_sections.append(sec)
+            self._open_headers.append(sec)
+            if tag in ("h1", "h2") and self._first_h12 is None:
+                self._first_h12 = sec
+        if tag in DATE_TAGS:
+            attrs = dict(attrib)
+            text = attrs.get("datetime") or attrs.get("content")
+            cand = _DateCandidate(tag, depth, attrs, text or None)
+            self._dates.append(cand)
+            if cand.parts is not None:
+                self._open_dates.append(cand)
+
+    def end(self, tag: Any) -> None:
+        self._flush()
+        if not isinstance(tag, str) or not self._stack:
+            return
+        depth = len(self._stack)
+        self._stack.pop()
+        if tag == "title" and self._title_state == 1:
+            self._title_state = 2
+        if tag in SKIP_TEXT_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        if tag in HEADER_TAGS and self._open_headers:
+            sec = self._open_headers.pop()
+            sec.start = len(self._parts)
+            self._active.append(sec)
+        if self._open_dates and self._open_dates[-1].depth == depth:
+            cand = self._open_dates.pop()
+            cand.text = " ".join(cand.parts or [])
+            cand.parts = None
+        # Closing the parent ends every section started by its child headers
+        if self._active:
+            self._cut(lambda s: s.depth <= depth)
+
+    def data(self, data: str) -> None:
+        self._buffer.append(data)
+
+    def comment(self, text: str) -> None:
+        self._flush()
+
+    def pi(self, target: str, data: Optional[str] = None) -> None:
+        self._flush()
+
+    def doctype(self, *args: Any) -> None:
+        self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        while self._stack:
+            self.end(self._stack[-1])
+
+    # -- text routing ------------------------------------------------------
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        text = "".join(self._buffer)
+        self._buffer.clear()
+        if self._skip_depth:
+            return
+        self._text_nodes += 1
+        self._text_chars += len(text)
+        if self._title_state == 1:
+            self._title_parts.append(text)
+        s = text.strip()
+        if not s:
+            return
+        self._parts.append(s)
+        for sec in self._open_headers:
+            sec.heading_parts.append(s)
+        for cand in self._open_dates:
+            if cand.parts is not None:
+                cand.parts.append(s)
+
+    # -- results -----------------------------------------------------------
+
+    @property
+    def raw_text_chars(self) -> int:
+        # Length of all text nodes joined with newlines
+        return self._text_chars + max(0, self._text_nodes - 1)
+
+    def title(self) -> Optional[str]:
+        if self._title_parts and not self._title_has_child:
+            raw = "".join(self._title_parts)
+            if raw:
+                return raw.strip()
+        h = self._first_h12
+        if h is not None and h.heading_parts:
+            return "".join(h.heading_parts)
+        return None
+
+    def dates(self) -> Tuple[Optional[str], Optional[str]]:
+        pub = None
+        updated = None
+        for cand in self._dates:
+            if pub and updated:
+                break
+            if not cand.text:
+                continue
+            d = parse_date(cand.text)
+            if not d:
+                continue
+            tag, attrs = cand.tag, cand.attrs
+            if tag == "time" and attrs.get("itemprop") in {
                 "datePublished",
                 "dateCreated",
             }:
                 pub = pub or d
-            elif tag.name == "time" and tag.get("itemprop") in {
+            elif tag == "time" and attrs.get("itemprop") in {
                 "dateModified",
                 "dateUpdated",
             }:
                 updated = updated or d
-            elif tag.name == "meta" and tag.get("name") == "publication-date":
+            elif tag == "meta" and attrs.get("name") == "publication-date":
                 pub = pub or d
-            elif tag.name == "meta" and tag.get("name") == "last-updated":
+            elif tag == "meta" and attrs.get("name") == "last-updated":
                 updated = updated or d
             else:
                 pub = pub or d
-    return pub, updated
-
-
-def _extract_sections(soup: BeautifulSoup) -> List[GuidelineSection]:
-    sections: List[GuidelineSection] = []
-    headers = soup.find_all(["h1", "h2", "h3", "h4"]) if soup else []
-
-    for h in headers:
-        if not isinstance(h, Tag):
-            continue
-        heading = h.get_text(" ", strip=True)
-        level = _level_from_tag(h.name)
-        texts: List[str] = []
-        # Gather following siblings until next header of same or higher level
-        for sib in h.next_siblings:
-            if isinstance(sib, Tag) and sib.name in ["h1", "h2", "h3", "h4"]:
-                break
-            txt = (
-                sib.get_text("\n", strip=True)
-                if hasattr(sib, "get_text")
-                else str(sib).strip()
+        return pub, updated
+
+    def _cut(self, keep: Callable[[_Section], bool]) -> None:
+        active = []
+        for sec in self._active:
+            if keep(sec):
+                active.append(sec)
+            else:
+                sec.end = len(self._parts)
+        self._active = active
+
+    def sections(self) -> List[GuidelineSection]:
+        # Section bodies are slices of the document text, whose evidence terms
+        # are found in one scan rather than once per (possibly nested) section
+        text = "\n".join(self._parts)
+        offsets = [0]
+        for part in self._parts:
+            offsets.append(offsets[-1] + len(part) + 1)
+        with stage("evidence"):
+            evidence = DocumentEvidence(text)
+
+        sections: List[GuidelineSection] = []
+        for raw in self._all_sections:
+            end = len(self._parts) if raw.end is None else raw.end
+            lo = offsets[raw.start]
+            hi = max(lo, offsets[end] - 1)
+            heading = " ".join(raw.heading_parts)
+            sections.append(
+                _make_section(heading, raw.level, text[lo:hi], evidence.summary(lo, hi))
             )
-            if txt:
-                texts.append(txt)
-        body = "\n".join(texts).strip()
-
-        sec = GuidelineSection(heading=heading, level=level, text=body)
-        grade, system, notes = extract_evidence(body)
-        if grade or system or notes:
-            sec.evidence = Evidence(grade=grade, system=system, notes=notes)
-        sections.append(sec)
-
-    if not sections:
-        # Fallback: whole page as one section
-        body = soup.get_text("\n", strip=True)
-        grade, system, notes = extract_evidence(body)
-        sec = GuidelineSection(heading=None, level=1, text=body)
-        if grade or system or notes:
-            sec.evidence = Evidence(grade=grade, system=system, notes=notes)
-        sections.append(sec)
-    return sections
+
+        if not sections:
+            # Fallback: whole page as one section
+            summary = evidence.summary(0, len(text))
+            sections.append(_make_section(None, 1, text, summary))
+        return sections
+
+
+def _make_section(
+    heading: Optional[str],
+    level: int,
+    body: str,
+    evidence: Tuple[Optional[str], Optional[str], Optional[str]],
+) -> GuidelineSection:
+    sec = GuidelineSection(heading=heading, level=level, text=body)
+    grade, system, notes = evidence
+    if grade or system or notes:
+        sec.evidence = Evidence(grade=grade, system=system, notes=notes)
+    return sec
 
 
 def _level_from_tag(tag: Optional[str]) -> int:
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
 import re
-from typing import List, Optional
+from collections import deque
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
 import fitz  # PyMuPDF
 
 from src.guidelines.models import Evidence, GuidelineDocument, GuidelineSection
 from src.utils.dates import parse_date
-from src.utils.evidence import extract_evidence
+from src.utils.evidence import DocumentEvidence
+from src.utils.metrics import stage
 
 HEADING_LINE = re.compile(r"^(\d+\.|[A-Z][A-Z\s\-/]{3,}|[IVX]+\.)\s+.*")
 DATE_CANDIDATE = re.compile(
@@ -17,33 +28,230 @@ DATE_CANDIDATE = re.compile(
 TITLE_CANDIDATE = re.compile(
     r"^(.*Guideline.*|.*Statement.*|.*Recommendation.*)$", re.IGNORECASE
 )
+# Title and date heuristics only look at the start of the document
+HEAD_LINES = 200
+
+# Layout mode (parse_pdf(layout=True))
+MARGIN_FRACTION = 0.08  # top/bottom share of the page scanned for headers/footers
+LOOKAHEAD_PAGES = 3
+HEADING_SIZE_RATIO = 1.15  # minimum size over body text for a sized heading
+MAX_HEADING_CHARS = 160
+DIGITS = re.compile(r"\d+")
+
+
+def parse_pdf(
+    path: str,
+    source: Optional[str] = None,
+    layout: bool = False,
+    data: Optional[bytes] = None,
+) -> GuidelineDocument:
+    """Parse a PDF guideline from ``path``, or from ``data`` if already read.
+
+    By default headings are guessed per text line with ``HEADING_LINE``. With
+    ``layout=True`` they are found from font size and weight instead, and
+    running headers/footers repeated across pages are dropped.
+    """
+    head: List[str] = []
+    builder = _SectionBuilder()
+    reader = _LayoutReader() if layout else None
+    n_lines = 0
+    n_chars = 0
+    # Lines are consumed page by page; only the first HEAD_LINES are kept for
+    # the title/date heuristics, and the full text is never joined.
+    with stage("read"):
+        if data is None:
+            doc = fitz.open(path)
+        else:
+            doc = fitz.open(stream=data, filetype="pdf")
+    with doc, stage("extract"):
+        items: Iterator[Tuple[str, Optional[int]]]
+        if reader is not None:
+            items = reader.lines(doc)
+        else:
+            items = ((line, None) for line in _iter_lines(doc))
+        for line, level in items:
+            n_lines += 1
+            n_chars += len(line)
+            if len(head) < HEAD_LINES:
+                head.append(line)
+            if level is None:
+                builder.add(line)
+            elif level:
+                builder.add_heading(line, level)
+            else:
+                builder.add_body(line)
+
+    with stage("metadata"):
+        title = (reader.title if reader is not None else None) or _infer_title(head)
+        pub_date, last_updated = _infer_dates(head)
+
+    with stage("sections"):
+        gl = GuidelineDocument(
+            id=None,
+            title=title,
+            source=source,
+            url=None,
+            publication_date=pub_date,
+            last_updated=last_updated,
+            sections=builder.finish(),
+            # Length of all lines joined with newlines
+            raw_text_chars=n_chars + max(0, n_lines - 1),
+        )
+    return gl
 
 
-def parse_pdf(path: str, source: Optional[str] = None) -> GuidelineDocument:
-    doc = fitz.open(path)
-    full_text_lines: List[str] = []
+def _iter_lines(doc: Any) -> Iterator[str]:
     for page in doc:
         text = page.get_text("text")
         if text:
-            full_text_lines.extend([line.rstrip() for line in text.splitlines()])
-    raw_text = "\n".join(full_text_lines)
-
-    title = _infer_title(full_text_lines)
-    pub_date, last_updated = _infer_dates(full_text_lines)
-
-    sections = _split_into_sections(full_text_lines)
-
-    gl = GuidelineDocument(
-        id=None,
-        title=title,
-        source=source,
-        url=None,
-        publication_date=pub_date,
-        last_updated=last_updated,
-        sections=sections,
-        raw_text_chars=len(raw_text),
-    )
-    return gl
+            for line in text.splitlines():
+                yield line.rstrip()
+
+
+class _LayoutLine(NamedTuple):
+    text: str
+    size: float
+    bold: bool
+    first_in_block: bool
+    # Set for lines in the top/bottom page margin: position plus the text
+    # with digits masked, so "Page 3" and "Page 4" share a key
+    margin_key: Optional[str]
+
+
+def _page_lines(page: Any) -> List[_LayoutLine]:
+    height = page.rect.height
+    top, bottom = height * MARGIN_FRACTION, height * (1 - MARGIN_FRACTION)
+    lines: List[_LayoutLine] = []
+    # TEXTFLAGS_TEXT leaves out image blocks, which "dict" would otherwise
+    # return with their full pixel data
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        if block.get("type", 0) != 0:
+            continue
+        first = True
+        for line in block["lines"]:
+            spans = [sp for sp in line["spans"] if sp["text"].strip()]
+            if not spans:
+                continue
+            text = "".join(sp["text"] for sp in line["spans"]).strip()
+            size = max(sp["size"] for sp in spans)
+            bold = all(
+                sp["flags"] & fitz.TEXT_FONT_BOLD or "bold" in sp["font"].lower()
+                for sp in spans
+            )
+            y0, y1 = line["bbox"][1], line["bbox"][3]
+            key = None
+            if y1 <= top:
+                key = "top:" + DIGITS.sub("#", text.lower())
+            elif y0 >= bottom:
+                key = "bottom:" + DIGITS.sub("#", text.lower())
+            lines.append(_LayoutLine(text, size, bold, first, key))
+            first = False
+    return lines
+
+
+class _LayoutReader:
+    """Turns ``page.get_text("dict")`` output into ``(text, level)`` lines.
+
+    ``level`` is 0 for body text. Each page is extracted once; a window of
+    ``lookahead`` pages is held back so that running headers and footers can
+    be recognised by repetition, and so the body font size (the size carrying
+    the most characters) is known before the first heading decision.
+    """
+
+    def __init__(self, lookahead: int = LOOKAHEAD_PAGES) -> None:
+        self.lookahead = lookahead
+        self.title: Optional[str] = None
+        self._margin_pages: Dict[str, int] = {}
+        self._size_chars: Dict[float, int] = {}
+        self._window: Deque[List[_LayoutLine]] = deque()
+        self._pages_emitted = 0
+
+    def lines(self, doc: Any) -> Iterator[Tuple[str, Optional[int]]]:
+        for page in doc:
+            lines = _page_lines(page)
+            for key in {ln.margin_key for ln in lines if ln.margin_key}:
+                self._margin_pages[key] = self._margin_pages.get(key, 0) + 1
+            for ln in lines:
+                if ln.margin_key is None:
+                    size = round(ln.size * 2) / 2
+                    self._size_chars[size] = self._size_chars.get(size, 0) + len(
+                        ln.text
+                    )
+            self._window.append(lines)
+            if len(self._window) > self.lookahead:
+                yield from self._emit(self._window.popleft())
+        while self._window:
+            yield from self._emit(self._window.popleft())
+
+    def body_size(self) -> float:
+        if not self._size_chars:
+            return 0.0
+        return max(self._size_chars.items(), key=lambda kv: (kv[1], -kv[0]))[0]
+
+    def heading_level(self, line: _LayoutLine, body: float) -> int:
+        text = line.text
+        if len(text) > MAX_HEADING_CHARS or not any(c.isalpha() for c in text):
+            return 0
+        ratio = line.size / body if body else 1.0
+        if ratio >= 1.6:
+            return 1
+        if ratio >= 1.3:
+            return 2
+        if ratio >= HEADING_SIZE_RATIO:
+            return 3
+        # Bold run-in headings at body size: short and not a sentence
+        if (
+            line.bold
+            and line.first_in_block
+            and ratio >= 0.95
+            and len(text.split()) <= 12
+            and not text.endswith((".", ",", ";", ":"))
+        ):
+            return 4
+        return 0
+
+    def _emit(self, lines: List[_LayoutLine]) -> Iterator[Tuple[str, Optional[int]]]:
+        body = self.body_size()
+        heading: List[str] = []
+        heading_line: Optional[_LayoutLine] = None
+        heading_level = 0
+        groups: List[Tuple[float, str]] = []
+
+        def flush() -> Iterator[Tuple[str, Optional[int]]]:
+            nonlocal heading_line
+            if heading_line is not None:
+                text = " ".join(heading)
+                groups.append((heading_line.size, text))
+                yield text, heading_level
+                heading.clear()
+                heading_line = None
+
+        for ln in lines:
+            if ln.margin_key and self._margin_pages[ln.margin_key] > 1:
+                continue
+            level = self.heading_level(ln, body)
+            if not level:
+                yield from flush()
+                yield ln.text, 0
+                continue
+            # A heading wrapped over several lines of the same block and style
+            if (
+                heading_line is not None
+                and not ln.first_in_block
+                and level == heading_level
+                and ln.size == heading_line.size
+            ):
+                heading.append(ln.text)
+                continue
+            yield from flush()
+            heading, heading_line, heading_level = [ln.text], ln, level
+        yield from flush()
+
+        if lines and self._pages_emitted == 0 and groups:
+            # Title: the largest heading on the first page
+            self.title = max(groups, key=lambda g: g[0])[1]
+        if lines:
+            self._pages_emitted += 1
 
 
 def _infer_title(lines: List[str]) -> Optional[str]:
@@ -85,39 +293,69 @@ def _infer_dates(lines: List[str]) -> tuple[Optional[str], Optional[str]]:
     return pub, updated
 
 
-def _split_into_sections(lines: List[str]) -> List[GuidelineSection]:
-    sections: List[GuidelineSection] = []
-    current: Optional[GuidelineSection] = None
+class _SectionBuilder:
+    """Groups lines into sections in one linear pass.
+
+    Body lines of all sections go into one list, each section remembering its
+    range of it. ``finish`` joins the list once, slices the section texts out
+    of it and finds evidence terms in a single scan of the whole document;
+    ``GuidelineSection`` models are only created there.
+    """
 
-    def flush() -> None:
-        nonlocal current
-        if current is not None:
-            current.text = current.text.strip()
-            if current.text:
-                sections.append(current)
-            current = None
+    def __init__(self) -> None:
+        self._lines: List[str] = []
+        self._done: List[Tuple[Optional[str], int, int, int]] = []
+        self._heading: Optional[str] = None
+        self._level = 1
+        self._start: Optional[int] = None
 
-    for line in lines:
+    def add(self, line: str) -> None:
+        """Add a text line, deciding with ``HEADING_LINE`` if it is a heading."""
         s = line.strip()
         if not s:
-            continue
+            return
         if HEADING_LINE.match(s):
-            flush()
-            current = GuidelineSection(heading=s, level=_heading_level(s), text="")
+            self.add_heading(s, _heading_level(s))
         else:
-            if current is None:
-                current = GuidelineSection(heading=None, level=1, text="")
-            current.text += s + "\n"
+            self.add_body(s)
+
+    def add_heading(self, heading: str, level: int) -> None:
+        self._close()
+        self._heading, self._level, self._start = heading, level, len(self._lines)
+
+    def add_body(self, text: str) -> None:
+        if self._start is None:
+            self._heading, self._level, self._start = None, 1, len(self._lines)
+        self._lines.append(text)
 
-    flush()
+    def _close(self) -> None:
+        # Headings with no body text are dropped
+        if self._start is not None and self._start < len(self._lines):
+            self._done.append(
+                (self._heading, self._level, self._start, len(self._lines))
+            )
+        self._start = None
 
-    # Evidence extraction pass
-    for sec in sections:
-        grade, system, notes = extract_evidence(sec.text)
-        if grade or system or notes:
-            sec.evidence = Evidence(grade=grade, system=system, notes=notes)
+    def finish(self) -> List[GuidelineSection]:
+        self._close()
+        offsets = [0]
+        for line in self._lines:
+            offsets.append(offsets[-1] + len(line) + 1)
+        text = "\n".join(self._lines)
+        self._lines = []
+        with stage("evidence"):
+            evidence = DocumentEvidence(text)
 
-    return sections
+        sections: List[GuidelineSection] = []
+        for heading, level, first, last in self._done:
+            lo, hi = offsets[first], offsets[last] - 1
+            sec = GuidelineSection(heading=heading, level=level, text=text[lo:hi])
+            grade, system, notes = evidence.summary(lo, hi)
+            if grade or system or notes:
+                sec.evidence = Evidence(grade=grade, system=system, notes=notes)
+            sections.append(sec)
+        self._done = []
+        return sections
 
 
 def _heading_level(text: str) -> int:
@@ -1 +1,12 @@
-__all__ = ["bm25_index"]
+__all__ = [
+    "bm25_index",
+    "cache",
+    "chunking",
+    "index_store",
+    "inverted",
+    "sections",
+    "segments",
+    "server",
+    "sharded",
+    "tokenizer",
+]
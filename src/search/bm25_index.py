@@ -1,95 +1,548 @@
 from __future__ import annotations
 
-import json
-import re
-from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from rank_bm25 import BM25Okapi
+import numpy as np
 
-TOKEN = re.compile(r"\b[\w\-]+\b", re.UNICODE)
+from src.guidelines.serialization import loads
+from src.search.chunking import Chunker, HeadingPath, PassageTable, top_k_sections
+from src.search.filters import FilterColumns, SearchFilter
+from src.search.inverted import InvertedIndex, InvertedIndexBuilder
+from src.search.sections import SectionRef, SectionTable
+from src.search.sharded import ShardedInvertedIndex, shard_bounds
+from src.search.tokenizer import DEFAULT_TOKENIZER, Tokenizer, tokenize  # noqa: F401
 
+SNIPPET_CHARS = 800
 
-def tokenize(text: str) -> List[str]:
-    return [t.lower() for t in TOKEN.findall(text or "")]
+SearchIndex = Union[InvertedIndex, ShardedInvertedIndex]
 
+# Section table columns read by ``BM25SectionIndex.from_table``
+TABLE_COLUMNS = (
+    "doc_index",
+    "doc_id",
+    "title",
+    "source",
+    "heading",
+    "level",
+    "publication_date",
+    "last_updated",
+    "evidence_grade",
+    "text",
+)
 
-@dataclass
-class SectionRef:
-    doc_id: str
-    title: str | None
-    source: str | None
-    section_heading: str | None
-    section_level: int
-    publication_date: str | None
-    last_updated: str | None
-    text: str
+
+class _RecordReader:
+    """Reads individual JSONL records back by byte offset, caching the last one."""
+
+    def __init__(self, path: str):
+        self._f: BinaryIO = open(path, "rb")
+        self._offset: Optional[int] = None
+        self._record: Dict[str, Any] = {}
+
+    def section_text(self, offset: int, position: int) -> str:
+        if offset != self._offset:
+            self._f.seek(offset)
+            self._record = loads(self._f.readline())
+            self._offset = offset
+        return str(self._record["sections"][position].get("text") or "")
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class _ColumnReader:
+    """Reads section text back from a section table's ``text`` column by row."""
+
+    def __init__(self, column: Any):
+        self._column = column
+
+    def section_text(self, offset: int, position: int) -> str:
+        return str(self._column[offset].as_py() or "")
+
+    def close(self) -> None:
+        pass
+
+
+_SectionReader = Union[_RecordReader, _ColumnReader]
+
+
+def _column_values(array: Any) -> List[Any]:
+    """Python values of an Arrow array; dictionary values are decoded once, so
+    rows repeating a value share one string."""
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(array.type):
+        values = array.dictionary.to_pylist()
+        return [None if i is None else values[i] for i in array.indices.to_pylist()]
+    return list(array.to_pylist())
 
 
 class BM25SectionIndex:
-    def __init__(self, sections: List[SectionRef]):
+    def __init__(
+        self,
+        sections: Union[SectionTable, Sequence[SectionRef]],
+        index: Optional[SearchIndex] = None,
+        jsonl_path: Optional[str] = None,
+        text_column: Any = None,
+        tokenizer: Optional[Tokenizer] = None,
+        shards: int = 1,
+        chunker: Optional[Chunker] = None,
+        passages: Optional[PassageTable] = None,
+    ):
+        """Index ``sections``, or serve them with a prebuilt ``index``.
+
+        With a ``chunker`` the index is built over passages of the sections;
+        a prebuilt passage index comes with its ``passages`` table.
+        """
+        self.tokenizer = tokenizer or DEFAULT_TOKENIZER
+        if not isinstance(sections, SectionTable):
+            sections = SectionTable.from_refs(sections)
         self.sections = sections
+        self.jsonl_path = jsonl_path
+        self._text_column = text_column
+        self._columns: Optional[FilterColumns] = None
+        if passages is None and chunker is not None and index is None:
+            passages = PassageTable(chunker)
+        self.passages = passages
         if not sections:
-            self.bm25: Optional[BM25Okapi] = None
+            self.index: Optional[SearchIndex] = None
+        elif index is not None:
+            self.index = index
+        elif shards > 1:
+            bounds = shard_bounds(sections.doc, shards)
+            self.index = ShardedInvertedIndex(
+                [self._build(a, b) for a, b in zip(bounds, bounds[1:])]
+            )
         else:
-            corpus = [tokenize(s.text) for s in sections]
-            self.bm25 = BM25Okapi(corpus)
+            self.index = self._build(0, len(sections))
+
+    def _build(self, start: int, end: int) -> InvertedIndex:
+        builder = InvertedIndexBuilder()
+        passages = self.passages
+        headings = HeadingPath()
+        doc = -1
+        for i in range(start, end):
+            text = self.sections.text(i) or ""
+            if passages is None:
+                builder.add_ids(self.tokenizer.ids(text, builder.vocab))
+                continue
+            if self.sections.doc[i] != doc:
+                doc, headings = self.sections.doc[i], HeadingPath()
+            ref = self.sections[i]
+            path = headings.enter(ref.section_heading, ref.section_level)
+            for ids in passages.add(text, path, self.tokenizer, builder.vocab):
+                builder.add_ids(ids)
+        return builder.build()
+
+    @property
+    def columns(self) -> FilterColumns:
+        """Filter columns, built on first use."""
+        if self._columns is None:
+            self._columns = FilterColumns.from_sections(self.sections)
+        return self._columns
 
-    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        if not self.sections or not self.bm25:
+    def search(
+        self, query: str, k: int = 5, filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        if not self.sections or not self.index:
             return []
-        tokens = tokenize(query)
-        scores = self.bm25.get_scores(tokens)
-        ranked = sorted(zip(self.sections, scores), key=lambda x: x[1], reverse=True)[
-            :k
-        ]
-        results: List[Dict[str, Any]] = []
-        for ref, score in ranked:
-            results.append(
-                {
-                    "score": float(score),
-                    "doc_id": ref.doc_id,
-                    "title": ref.title,
-                    "source": ref.source,
-                    "section_heading": ref.section_heading,
-                    "section_level": ref.section_level,
-                    "publication_date": ref.publication_date,
-                    "last_updated": ref.last_updated,
-                    "snippet": ref.text[:800],
-                }
+        mask = self.columns.mask(filters)
+        term_ids = self.tokenizer.term_ids(query, self.index.vocab)
+        if self.passages is not None:
+            section_of = self.passages.section_of()
+            hits = top_k_sections(self.index, section_of, [term_ids], k, 1, mask)
+            return self._results(hits)[0]
+        ids, scores = self.index.top_k_terms(term_ids, k, mask)
+        return self._results([(ids, scores)])[0]
+
+    def search_many(
+        self,
+        queries: Sequence[str],
+        k: int = 5,
+        workers: int = 1,
+        filters: Optional[SearchFilter] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Search several queries at once; returns one result list per query."""
+        if not self.sections or not self.index:
+            return [[] for _ in queries]
+        mask = self.columns.mask(filters)
+        vocab = self.index.vocab
+        term_ids = [self.tokenizer.term_ids(q, vocab) for q in queries]
+        if self.passages is not None:
+            section_of = self.passages.section_of()
+            return self._results(
+                top_k_sections(self.index, section_of, term_ids, k, workers, mask)
             )
-        return results
+        return self._results(self.index.top_k_many_terms(term_ids, k, workers, mask))
+
+    def _results(
+        self, hits: Sequence[Tuple[np.ndarray, np.ndarray]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Result dicts for ``(ids, scores)`` hits; ids are sections, or the
+        best passage of each section for a passage index."""
+        reader = self._reader()
+        passages = self.passages
+        out: List[List[Dict[str, Any]]] = []
+        try:
+            for ids, scores in hits:
+                results: List[Dict[str, Any]] = []
+                for hit, score in zip(ids.tolist(), scores.tolist()):
+                    sec = hit if passages is None else passages.section[hit]
+                    ref = self.sections[sec]
+                    text = self._text(ref, reader)
+                    result = {
+                        "score": float(score),
+                        "doc_id": ref.doc_id,
+                        "title": ref.title,
+                        "source": ref.source,
+                        "section_heading": ref.section_heading,
+                        "section_level": ref.section_level,
+                        "publication_date": ref.publication_date,
+                        "last_updated": ref.last_updated,
+                        "evidence_grade": ref.evidence_grade,
+                    }
+                    if passages is not None:
+                        start, end = passages.start[hit], passages.end[hit]
+                        result["heading_path"] = passages.heading_path(sec)
+                        result["char_start"] = start
+                        result["char_end"] = end
+                        text = text[start:end]
+                    result["snippet"] = text[:SNIPPET_CHARS]
+                    results.append(result)
+                out.append(results)
+        finally:
+            if reader is not None:
+                reader.close()
+        return out
+
+    def _reader(self) -> Optional[_SectionReader]:
+        if self._text_column is not None:
+            return _ColumnReader(self._text_column)
+        if self.jsonl_path is None:
+            return None
+        return _RecordReader(self.jsonl_path)
+
+    def _text(self, ref: SectionRef, reader: Optional[_SectionReader]) -> str:
+        if ref.text is not None:
+            return ref.text
+        if reader is None or ref.offset is None:
+            return ""
+        return reader.section_text(ref.offset, ref.position)
+
+    def iter_texts(self) -> Iterator[str]:
+        """Yield each section's full text in index order, reading lazily."""
+        reader = self._reader()
+        try:
+            for ref in self.sections:
+                yield self._text(ref, reader)
+        finally:
+            if reader is not None:
+                reader.close()
+
+    def _passage_snippets(self, passages: PassageTable) -> Iterator[str]:
+        p, n = 0, len(passages)
+        for sec, text in enumerate(self.iter_texts()):
+            while p < n and passages.section[p] == sec:
+                yield text[passages.start[p] : passages.end[p]][:SNIPPET_CHARS]
+                p += 1
+
+    def save(self, path: str) -> None:
+        """Write a memory-mappable index file readable by ``MappedBM25Index``."""
+        if not self.sections or not self.index:
+            raise ValueError("Cannot save an empty index")
+        from src.search.index_store import write_index
+
+        index = self.index
+        if isinstance(index, ShardedInvertedIndex):
+            index = index.merged()
+        snippets: Iterator[str]
+        if self.passages is None:
+            snippets = (text[:SNIPPET_CHARS] for text in self.iter_texts())
+        else:
+            snippets = self._passage_snippets(self.passages)
+        write_index(
+            path,
+            self.sections,
+            snippets,
+            index,
+            self.columns,
+            self.tokenizer,
+            self.passages,
+        )
 
     @staticmethod
-    def from_jsonl(path: str) -> "BM25SectionIndex":
-        sections: List[SectionRef] = []
-        content = Path(path).read_text(encoding="utf-8") if Path(path).exists() else ""
-        for line in content.splitlines():
-            if not line.strip():
-                continue
-            obj = json.loads(line)
-            doc_id = obj.get("id") or ""
-            title = obj.get("title")
-            source = obj.get("source")
-            pub = obj.get("publication_date")
-            upd = obj.get("last_updated")
-            for sec in obj.get("sections", []) or []:
-                text = sec.get("text") or ""
-                heading = sec.get("heading")
-                level = int(sec.get("level") or 1)
-                if not text.strip():
+    def from_jsonl(
+        path: str,
+        tokenizer: Optional[Tokenizer] = None,
+        shards: int = 1,
+        workers: Optional[int] = None,
+        chunker: Optional[Chunker] = None,
+    ) -> "BM25SectionIndex":
+        """Stream ``path`` one record at a time, tokenizing as it goes.
+
+        Sections keep only the byte offset of their record; text is re-read
+        from the file when a snippet is needed. With a ``chunker`` each
+        section is split into passages as it is read and the passages are
+        indexed.
+
+        With ``shards > 1`` the file is split into byte ranges of whole
+        records, each built into its own shard on a pool of ``workers``
+        processes (default: one per shard), and searched as a
+        ``ShardedInvertedIndex``.
+        """
+        tokenizer = tokenizer or DEFAULT_TOKENIZER
+        if not Path(path).exists():
+            return BM25SectionIndex(
+                SectionTable(), tokenizer=tokenizer, chunker=chunker
+            )
+        if shards <= 1:
+            sections, builder, passages = _load_jsonl_range(
+                path, 0, None, tokenizer, chunker
+            )
+            return BM25SectionIndex(
+                sections,
+                index=builder.build() if sections else None,
+                jsonl_path=path,
+                tokenizer=tokenizer,
+                passages=passages,
+            )
+
+        from src.search.sharded import ShardedInvertedIndex, line_ranges
+
+        ranges = line_ranges(path, shards)
+        params = tokenizer.to_params()
+        chunk_params = chunker.to_params() if chunker is not None else None
+        if (workers or len(ranges)) > 1 and len(ranges) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers or len(ranges)) as pool:
+                futures = [
+                    pool.submit(_build_jsonl_shard, path, a, b, params, chunk_params)
+                    for a, b in ranges
+                ]
+                parts = [f.result() for f in futures]
+        else:
+            parts = [
+                _build_jsonl_shard(path, a, b, params, chunk_params) for a, b in ranges
+            ]
+
+        sections = SectionTable()
+        passages = PassageTable(chunker) if chunker is not None else None
+        shard_indexes: List[InvertedIndex] = []
+        for table, shard, shard_passages in parts:
+            if shard is not None:
+                sections.extend(table)
+                shard_indexes.append(shard)
+                if passages is not None and shard_passages is not None:
+                    passages.extend(shard_passages)
+        del parts
+        index: Optional[SearchIndex] = None
+        if shard_indexes:
+            index = ShardedInvertedIndex(shard_indexes, workers=workers)
+        return BM25SectionIndex(
+            sections,
+            index=index,
+            jsonl_path=path,
+            tokenizer=tokenizer,
+            passages=passages,
+        )
+
+    @staticmethod
+    def from_records(
+        records: Iterable[Dict[str, Any]],
+        tokenizer: Optional[Tokenizer] = None,
+        chunker: Optional[Chunker] = None,
+    ) -> "BM25SectionIndex":
+        """Index guideline records already in memory; section text is kept."""
+        tokenizer = tokenizer or DEFAULT_TOKENIZER
+        sections = SectionTable()
+        builder = InvertedIndexBuilder()
+        passages = PassageTable(chunker) if chunker is not None else None
+        for record in records:
+            _add_record(record, sections, builder, tokenizer, passages=passages)
+        return BM25SectionIndex(
+            sections,
+            index=builder.build() if sections else None,
+            tokenizer=tokenizer,
+            passages=passages,
+        )
+
+    @staticmethod
+    def from_table(
+        path: str,
+        tokenizer: Optional[Tokenizer] = None,
+        chunker: Optional[Chunker] = None,
+    ) -> "BM25SectionIndex":
+        """Load a Parquet / Arrow section table written by ``clinical-ingest``.
+
+        Only the columns the index needs are read, one record batch at a time.
+        Sections keep their row number; text is read back from the table's
+        ``text`` column (memory-mapped for Arrow files) when a snippet is needed.
+        """
+        from src.guidelines.columnar import read_sections
+
+        sections = SectionTable()
+        tokenizer = tokenizer or DEFAULT_TOKENIZER
+        builder = InvertedIndexBuilder()
+        if not Path(path).exists():
+            return BM25SectionIndex(sections, tokenizer=tokenizer, chunker=chunker)
+        passages = PassageTable(chunker) if chunker is not None else None
+        headings = HeadingPath()
+        last_doc = -1
+        table = read_sections(path, TABLE_COLUMNS)
+        row = 0
+        for batch in table.to_batches():
+            cols = [_column_values(batch.column(name)) for name in TABLE_COLUMNS]
+            for (
+                doc,
+                doc_id,
+                title,
+                source,
+                heading,
+                level,
+                pub,
+                upd,
+                grade,
+                text,
+            ) in zip(*cols):
+                offset = row
+                row += 1
+                if passages is not None:
+                    # Rows of a document are consecutive, in section order;
+                    # ``doc_index`` numbers documents even when ids are null
+                    if doc != last_doc:
+                        last_doc, headings = doc, HeadingPath()
+                    heading_path = headings.enter(heading, int(level or 1))
+                if not text or not text.strip():
                     continue
+                if passages is None:
+                    builder.add_ids(tokenizer.ids(text, builder.vocab))
+                else:
+                    for ids in passages.add(
+                        text, heading_path, tokenizer, builder.vocab
+                    ):
+                        builder.add_ids(ids)
                 sections.append(
-                    SectionRef(
-                        doc_id=doc_id,
-                        title=title,
-                        source=source,
-                        section_heading=heading,
-                        section_level=level,
-                        publication_date=pub,
-                        last_updated=upd,
-                        text=text,
-                    )
+                    doc_id or "",
+                    title,
+                    source,
+                    heading,
+                    int(level or 1),
+                    pub,
+                    upd,
+                    offset=offset,
+                    evidence_grade=grade,
                 )
-        return BM25SectionIndex(sections)
+        index = builder.build() if sections else None
+        return BM25SectionIndex(
+            sections,
+            index=index,
+            text_column=table.column("text"),
+            tokenizer=tokenizer,
+            passages=passages,
+        )
+
+
+def _load_jsonl_range(
+    path: str,
+    start: int,
+    end: Optional[int],
+    tokenizer: Tokenizer,
+    chunker: Optional[Chunker] = None,
+) -> Tuple[SectionTable, InvertedIndexBuilder, Optional[PassageTable]]:
+    """Sections, postings and passages of the records in bytes ``[start, end)``."""
+    sections = SectionTable()
+    builder = InvertedIndexBuilder()
+    passages = PassageTable(chunker) if chunker is not None else None
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if end is not None and offset >= end:
+                break
+            line_offset = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            _add_record(
+                loads(line), sections, builder, tokenizer, line_offset, passages
+            )
+    return sections, builder, passages
+
+
+def _add_record(
+    obj: Dict[str, Any],
+    sections: SectionTable,
+    builder: InvertedIndexBuilder,
+    tokenizer: Tokenizer,
+    offset: Optional[int] = None,
+    passages: Optional[PassageTable] = None,
+) -> None:
+    """Index the non-empty sections of one guideline record.
+
+    Sections point at ``offset`` (the record's byte offset in its JSONL file)
+    or, without one, keep their text inline. With ``passages`` the sections
+    are split into passages, which are indexed instead.
+    """
+    doc_id = obj.get("id") or ""
+    title = obj.get("title")
+    source = obj.get("source")
+    pub = obj.get("publication_date")
+    upd = obj.get("last_updated")
+    headings = HeadingPath()
+    for pos, sec in enumerate(obj.get("sections", []) or []):
+        text = sec.get("text") or ""
+        heading = sec.get("heading")
+        level = int(sec.get("level") or 1)
+        if passages is not None:
+            # Sections without text still head the ones below them
+            path = headings.enter(heading, level)
+        if not text.strip():
+            continue
+        evidence = sec.get("evidence") or {}
+        if passages is None:
+            builder.add_ids(tokenizer.ids(text, builder.vocab))
+        else:
+            for ids in passages.add(text, path, tokenizer, builder.vocab):
+                builder.add_ids(ids)
+        sections.append(
+            doc_id,
+            title,
+            source,
+            heading,
+            level,
+            pub,
+            upd,
+            text=text if offset is None else None,
+            offset=offset,
+            position=pos,
+            evidence_grade=evidence.get("grade"),
+        )
+
+
+def _build_jsonl_shard(
+    path: str,
+    start: int,
+    end: int,
+    tokenizer_params: Dict[str, Any],
+    chunker_params: Optional[Dict[str, Any]] = None,
+) -> Tuple[SectionTable, Optional[InvertedIndex], Optional[PassageTable]]:
+    """Process-pool task: one shard of ``from_jsonl``."""
+    tokenizer = Tokenizer.from_params(tokenizer_params)
+    chunker = Chunker.from_params(chunker_params)
+    sections, builder, passages = _load_jsonl_range(
+        path, start, end, tokenizer, chunker
+    )
+    return sections, builder.build() if sections else None, passages
@@ -0,0 +1,159 @@
+"""Bounded cache of search results for repeated queries.
+
+Entries are keyed by the query's normalized tokens (as produced by the
+index's tokenizer), ``k`` and the filter, so "Heart failure, ACE inhibitors"
+and "heart failure ACE inhibitors" share an entry. Each lookup carries the
+index version; when it changes every entry is dropped, so results never
+outlive the index they came from.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from src.search.filters import SearchFilter
+
+Results = List[Dict[str, Any]]
+CacheKey = Tuple[Tuple[str, ...], int, Optional[Tuple[object, ...]]]
+
+
+class QueryCache:
+    """Thread-safe LRU cache of result lists with an optional TTL.
+
+    Holds at most ``max_entries`` results; entries older than ``ttl`` seconds
+    (if set) count as misses. Cached result lists are shared between callers
+    and must not be modified.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Results]]" = OrderedDict()
+        self._version: Hashable = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(
+        tokens: Sequence[str], k: int, filters: Optional[SearchFilter] = None
+    ) -> CacheKey:
+        f = None if filters is None or filters.is_empty() else filters.key()
+        return tuple(tokens), k, f
+
+    def _check_version(self, version: Hashable) -> None:
+        # Caller holds the lock
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._version = version
+
+    def get(self, key: CacheKey, version: Hashable = None) -> Optional[Results]:
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None:
+                if self._clock() - entry[0] > self.ttl:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: CacheKey, results: Results, version: Hashable = None) -> None:
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (self._clock(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def search(
+        self,
+        index: Any,
+        query: str,
+        k: int = 5,
+        filters: Optional[SearchFilter] = None,
+        version: Hashable = None,
+    ) -> Results:
+        """``index.search`` through the cache.
+
+        ``version`` identifies the index contents; it defaults to the index's
+        ``generation`` (set by updatable indexes), so pass it explicitly when
+        one cache serves indexes that are swapped out.
+        """
+        if version is None:
+            version = getattr(index, "generation", None)
+        key = self.key(index.tokenizer.tokens(query), k, filters)
+        results = self.get(key, version)
+        if results is None:
+            results = index.search(query, k=k, filters=filters)
+            self.put(key, results, version)
+        return results
+
+    def search_many(
+        self,
+        index: Any,
+        queries: Sequence[str],
+        k: int = 5,
+        workers: int = 1,
+        filters: Optional[SearchFilter] = None,
+        version: Hashable = None,
+    ) -> List[Results]:
+        """``index.search_many`` through the cache; only misses are scored."""
+        if version is None:
+            version = getattr(index, "generation", None)
+        tokens = index.tokenizer.tokens
+        keys = [self.key(tokens(q), k, filters) for q in queries]
+        out: List[Optional[Results]] = [self.get(key, version) for key in keys]
+        missing = [i for i, results in enumerate(out) if results is None]
+        if missing:
+            fresh = index.search_many(
+                [queries[i] for i in missing], k=k, workers=workers, filters=filters
+            )
+            for i, results in zip(missing, fresh):
+                out[i] = results
+                self.put(keys[i], results, version)
+        return [results or [] for results in out]
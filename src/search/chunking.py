@@ -0,0 +1,229 @@
+"""Splitting sections into token-budgeted passages for indexing.
+
+Section lengths vary wildly (a PDF "section" can run for dozens of pages), which
+skews BM25 length normalization and makes a hit's snippet an arbitrary prefix
+of its section. With a ``Chunker`` the index is built over passages of at most
+``max_tokens`` tokens, consecutive passages of a section sharing ``overlap``
+tokens. A ``PassageTable`` records each passage's section, its character range
+in the section text and the section's heading path. ``top_k_sections`` scores
+passages and keeps the best one of each section, so results still list
+sections, each with its best passage.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.search.tokenizer import Tokenizer, Vocabulary
+
+# Passages fetched per requested section before collapsing; multiplied again
+# while too few distinct sections come back
+OVERSAMPLE = 4
+# Joins the headings of a path in the passage table's dictionary
+PATH_SEPARATOR = "\x1f"
+
+
+class Chunker:
+    """Splits text into windows of at most ``max_tokens`` tokens.
+
+    A text of ``n`` tokens gets the fewest windows that fit the budget, all of
+    the same number of tokens and each sharing at least ``overlap`` tokens with
+    the previous one, so no passage is a short remainder. The first window
+    starts at the beginning of the text and the last one ends at its end.
+    """
+
+    def __init__(self, max_tokens: int, overlap: int = 0):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        if not 0 <= overlap < max_tokens:
+            raise ValueError("overlap must be at least 0 and less than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+
+    def token_windows(self, n: int) -> List[Tuple[int, int]]:
+        """Token ranges ``(first, end)`` of the passages of ``n`` tokens."""
+        if n <= self.max_tokens:
+            return [(0, n)]
+        count = -(-(n - self.overlap) // (self.max_tokens - self.overlap))
+        size = -(-(n + (count - 1) * self.overlap) // count)
+        # Starts spread evenly over the text, at most size - overlap apart
+        firsts = [i * (n - size) // (count - 1) for i in range(count)]
+        return [(first, first + size) for first in firsts]
+
+    def windows(self, text: str, tokenizer: Tokenizer) -> List[Tuple[int, int]]:
+        """Character ranges ``(start, end)`` of the passages of ``text``."""
+        # Every token takes at least one character
+        if len(text) <= self.max_tokens:
+            return [(0, len(text))]
+        return self._char_windows(text, tokenizer.spans(text))[0]
+
+    def _char_windows(
+        self, text: str, spans: List[Tuple[int, int]]
+    ) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        # Character and token ranges of the passages of ``text``
+        tokens = self.token_windows(len(spans))
+        if len(tokens) == 1:
+            return [(0, len(text))], tokens
+        chars = [(spans[a][0], spans[b - 1][1]) for a, b in tokens]
+        chars[0] = (0, chars[0][1])
+        chars[-1] = (chars[-1][0], len(text))
+        return chars, tokens
+
+    def to_params(self) -> Dict[str, Any]:
+        return {"max_tokens": self.max_tokens, "overlap": self.overlap}
+
+    @staticmethod
+    def from_params(params: Optional[Dict[str, Any]]) -> Optional["Chunker"]:
+        if not params:
+            return None
+        return Chunker(int(params["max_tokens"]), int(params.get("overlap", 0)))
+
+
+class HeadingPath:
+    """Headings enclosing each section of one document, fed in document order."""
+
+    def __init__(self) -> None:
+        self._open: List[Tuple[int, Optional[str]]] = []
+
+    def enter(self, heading: Optional[str], level: int) -> Tuple[str, ...]:
+        """Path of the next section: the headings of the sections above it with
+        a lower level, then its own; untitled sections are left out."""
+        while self._open and self._open[-1][0] >= level:
+            self._open.pop()
+        self._open.append((level, heading))
+        return tuple(h for _, h in self._open if h)
+
+
+class PassageTable:
+    """The passages of an index's sections, one row per passage.
+
+    ``section`` holds each passage's row in the ``SectionTable``, ``start`` and
+    ``end`` its character range in the section text. Heading paths are kept
+    once per section, dictionary-encoded in ``path``.
+    """
+
+    def __init__(self, chunker: Chunker):
+        self.chunker = chunker
+        self.section = array("i")
+        self.start = array("q")
+        self.end = array("q")
+        self.path = array("i")
+        self.paths: List[str] = []
+        self._path_codes: Dict[str, int] = {}
+        self._section_of: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.section)
+
+    @property
+    def num_sections(self) -> int:
+        return len(self.path)
+
+    def _encode(self, path: str) -> int:
+        code = self._path_codes.get(path)
+        if code is None:
+            code = self._path_codes[path] = len(self.paths)
+            self.paths.append(path)
+        return code
+
+    def add(
+        self, text: str, path: Sequence[str], tokenizer: Tokenizer, vocab: Vocabulary
+    ) -> List[array]:
+        """Split the text of the next section row and record its passages.
+
+        Call once per section, in row order. Returns the term ids of each
+        passage, adding unseen terms to ``vocab``; the section is tokenized
+        once and its ids sliced.
+        """
+        section = len(self.path)
+        self.path.append(self._encode(PATH_SEPARATOR.join(path)))
+        ids = tokenizer.ids(text, vocab)
+        if len(ids) <= self.chunker.max_tokens:
+            windows, parts = [(0, len(text))], [ids]
+        else:
+            spans = tokenizer.spans(text)
+            windows, tokens = self.chunker._char_windows(text, spans)
+            if len(spans) == len(ids):
+                parts = [ids[a:b] for a, b in tokens]
+            else:
+                # Case mapping changed the terms; tokenize each passage
+                parts = [tokenizer.ids(text[a:b], vocab) for a, b in windows]
+        for start, end in windows:
+            self.section.append(section)
+            self.start.append(start)
+            self.end.append(end)
+        self._section_of = None
+        return parts
+
+    def extend(self, other: "PassageTable") -> None:
+        """Append the passages of ``other``, whose sections follow ours."""
+        base = len(self.path)
+        self.section.extend(s + base for s in other.section)
+        self.start.extend(other.start)
+        self.end.extend(other.end)
+        codes = [self._encode(p) for p in other.paths]
+        self.path.extend(codes[c] for c in other.path)
+        self._section_of = None
+
+    def heading_path(self, section: int) -> List[str]:
+        path = self.paths[self.path[section]]
+        return path.split(PATH_SEPARATOR) if path else []
+
+    def section_of(self) -> np.ndarray:
+        """Section row of every passage, as an array."""
+        if self._section_of is None:
+            self._section_of = np.array(self.section, dtype=np.int32)
+        return self._section_of
+
+
+def top_k_sections(
+    index: Any,
+    section_of: np.ndarray,
+    queries: Sequence[Sequence[int]],
+    k: int,
+    workers: int = 1,
+    mask: Optional[np.ndarray] = None,
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Top ``k`` sections for each query (term ids), scored by their best passage.
+
+    ``index`` is an inverted index over passages, ``section_of`` the section of
+    each passage and ``mask`` one bool per section. Returns, per query, the ids
+    and scores of the best passage of each of the ``k`` best sections, best
+    first.
+    """
+    if mask is not None:
+        mask = mask[section_of]
+    results: List[Tuple[np.ndarray, np.ndarray]] = [
+        (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+    ] * len(queries)
+    pending = list(range(len(queries)))
+    fetch = k * OVERSAMPLE
+    while pending and k > 0:
+        if len(pending) == 1:
+            hits = [index.top_k_terms(queries[pending[0]], fetch, mask)]
+        else:
+            batch = [queries[q] for q in pending]
+            hits = index.top_k_many_terms(batch, fetch, workers, mask)
+        retry = []
+        for q, (ids, scores) in zip(pending, hits):
+            best = _collapse(ids, scores, section_of, k)
+            # Fewer sections than asked for while more passages may match
+            if len(best[0]) < k and len(ids) == fetch:
+                retry.append(q)
+            else:
+                results[q] = best
+        pending = retry
+        fetch *= OVERSAMPLE
+    return results
+
+
+def _collapse(
+    ids: np.ndarray, scores: np.ndarray, section_of: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    # ``ids`` are best first, so a section's first passage is its best
+    _, first = np.unique(section_of[ids], return_index=True)
+    first.sort()
+    return ids[first[:k]], scores[first[:k]]
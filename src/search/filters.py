@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.search.sections import SectionTable
+
+if TYPE_CHECKING:
+    from src.search.sections import SectionRef
+
+PARTIAL_DATE = re.compile(r"^(\d{4})(?:-(\d{1,2}))?(?:-(\d{1,2}))?$")
+NO_DATE = 0
+
+
+@dataclass
+class SearchFilter:
+    """Structured restrictions applied before BM25 scoring.
+
+    Every populated field must match. Sources and grades compare
+    case-insensitively. ``date_from``/``date_to`` are inclusive ``YYYY``,
+    ``YYYY-MM`` or ``YYYY-MM-DD`` bounds on a section's effective date: its
+    document's ``last_updated``, falling back to ``publication_date``.
+    Sections without any date never match a date bound.
+    """
+
+    sources: Optional[Sequence[str]] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    levels: Optional[Sequence[int]] = None
+    grades: Optional[Sequence[str]] = None
+
+    @staticmethod
+    def from_params(params: Mapping[str, Any]) -> Optional["SearchFilter"]:
+        """Build a filter from CLI/HTTP style parameters; ``None`` if empty.
+
+        List-valued keys (``source``, ``level``, ``grade``) accept a single
+        value or a list. Raises ``ValueError`` for malformed values.
+        """
+
+        def as_list(key: str) -> Optional[List[Any]]:
+            value = params.get(key)
+            if value is None or value == []:
+                return None
+            return list(value) if isinstance(value, (list, tuple)) else [value]
+
+        levels = as_list("level")
+        for bound in ("date_from", "date_to"):
+            if params.get(bound):
+                _bound(str(params[bound]))
+        f = SearchFilter(
+            sources=as_list("source"),
+            date_from=params.get("date_from") or None,
+            date_to=params.get("date_to") or None,
+            levels=[int(v) for v in levels] if levels else None,
+            grades=as_list("grade"),
+        )
+        return None if f.is_empty() else f
+
+    def is_empty(self) -> bool:
+        return not (
+            self.sources or self.date_from or self.date_to or self.levels or self.grades
+        )
+
+    def key(self) -> Tuple[object, ...]:
+        """Hashable, order-insensitive identity of this filter."""
+
+        def norm(values: Optional[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+            return tuple(sorted({v.casefold() for v in values})) if values else None
+
+        return (
+            norm(self.sources),
+            self.date_from or None,
+            self.date_to or None,
+            tuple(sorted(set(self.levels))) if self.levels else None,
+            norm(self.grades),
+        )
+
+
+def date_key(value: Optional[str], upper: bool = False) -> int:
+    """Turn a (partial) ISO date into a sortable ``YYYYMMDD`` integer.
+
+    Missing parts are filled with the earliest day, or the latest one when
+    ``upper`` is set, so ``date_key("2022", upper=True)`` is ``20221231``.
+    Returns ``NO_DATE`` for empty or unparseable values.
+    """
+    if not value:
+        return NO_DATE
+    m = PARTIAL_DATE.match(value.strip()[:10])
+    if not m:
+        return NO_DATE
+    year = int(m.group(1))
+    month = int(m.group(2) or (12 if upper else 1))
+    day = int(m.group(3) or (31 if upper else 1))
+    return year * 10000 + month * 100 + day
+
+
+class _Dictionary:
+    """Assigns small integer codes to distinct string values.
+
+    Values that differ only in case share a code; the first spelling seen is
+    the one kept in ``values``.
+    """
+
+    def __init__(self, values: Optional[List[str]] = None) -> None:
+        self.values: List[str] = list(values or [])
+        self._codes: Dict[str, int] = {
+            v.casefold(): i for i, v in enumerate(self.values)
+        }
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        key = value.casefold()
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code] if code >= 0 else None
+
+    def lookup(self, values: Sequence[str]) -> List[int]:
+        return [
+            self._codes[v.casefold()] for v in values if v.casefold() in self._codes
+        ]
+
+
+class FilterColumns:
+    """Per-section filter columns stored as flat arrays.
+
+    Sources and grades are dictionary-encoded ``int32`` codes (-1 when
+    missing), dates are ``YYYYMMDD`` integers and levels are heading levels,
+    so building a mask is a handful of vectorized comparisons.
+    """
+
+    def __init__(
+        self,
+        source_codes: np.ndarray,
+        source_values: List[str],
+        dates: np.ndarray,
+        levels: np.ndarray,
+        grade_codes: np.ndarray,
+        grade_values: List[str],
+    ):
+        self.source_codes = source_codes
+        self.sources = _Dictionary(source_values)
+        self.dates = dates
+        self.levels = levels
+        self.grade_codes = grade_codes
+        self.grades = _Dictionary(grade_values)
+
+    @staticmethod
+    def from_sections(sections: Sequence["SectionRef"]) -> "FilterColumns":
+        if isinstance(sections, SectionTable):
+            return FilterColumns.from_table(sections)
+        sources = _Dictionary()
+        grades = _Dictionary()
+        n = len(sections)
+        source_codes = np.empty(n, dtype=np.int32)
+        dates = np.empty(n, dtype=np.int32)
+        levels = np.empty(n, dtype=np.int32)
+        grade_codes = np.empty(n, dtype=np.int32)
+        for i, ref in enumerate(sections):
+            source_codes[i] = sources.encode(ref.source)
+            dates[i] = date_key(ref.last_updated or ref.publication_date)
+            levels[i] = ref.section_level
+            grade_codes[i] = grades.encode(ref.evidence_grade)
+        return FilterColumns(
+            source_codes, sources.values, dates, levels, grade_codes, grades.values
+        )
+
+    @staticmethod
+    def from_table(table: SectionTable) -> "FilterColumns":
+        """Like ``from_sections``, encoding each document's fields only once."""
+        sources = _Dictionary()
+        grades = _Dictionary()
+        doc = np.asarray(table.doc, dtype=np.int64)
+        doc_source = np.array(
+            [sources.encode(v) for v in table.sources], dtype=np.int32
+        )
+        doc_date = np.array(
+            [
+                date_key(upd or pub)
+                for pub, upd in zip(table.publication_dates, table.last_updated)
+            ],
+            dtype=np.int32,
+        )
+        # Table grade code -> filter code; the trailing -1 maps a missing grade
+        grade_map = np.array(
+            [grades.encode(v) for v in table.grade_values] + [-1], dtype=np.int32
+        )
+        return FilterColumns(
+            doc_source[doc],
+            sources.values,
+            doc_date[doc],
+            np.asarray(table.level, dtype=np.int32),
+            grade_map[np.asarray(table.grade, dtype=np.int64)],
+            grades.values,
+        )
+
+    def mask(self, f: Optional[SearchFilter]) -> Optional[np.ndarray]:
+        """Boolean mask of sections passing ``f``; ``None`` means no filtering."""
+        if f is None or f.is_empty():
+            return None
+        keep = np.ones(len(self.levels), dtype=bool)
+        if f.sources:
+            keep &= np.isin(self.source_codes, self.sources.lookup(f.sources))
+        if f.grades:
+            keep &= np.isin(self.grade_codes, self.grades.lookup(f.grades))
+        if f.levels:
+            keep &= np.isin(self.levels, list(f.levels))
+        if f.date_from or f.date_to:
+            keep &= self.dates != NO_DATE
+            if f.date_from:
+                keep &= self.dates >= _bound(f.date_from)
+            if f.date_to:
+                keep &= self.dates <= _bound(f.date_to, upper=True)
+        return keep
+
+
+def _bound(value: str, upper: bool = False) -> int:
+    key = date_key(value, upper=upper)
+    if key == NO_DATE:
+        raise ValueError(f"Invalid date bound {value!r}; use YYYY[-MM[-DD]]")
+    return key
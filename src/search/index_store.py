@@ -0,0 +1,420 @@
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Collection,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+from src.search.chunking import PATH_SEPARATOR, Chunker, top_k_sections
+from src.search.filters import FilterColumns, SearchFilter
+from src.search.inverted import InvertedIndex
+from src.search.tokenizer import Tokenizer
+
+if TYPE_CHECKING:
+    from src.search.chunking import PassageTable
+    from src.search.sections import SectionRef
+
+# Layout: MAGIC | version (u32) | reserved (u32) | header length (u64) |
+# header JSON | arrays, each aligned to ALIGN bytes. The header records every
+# array's dtype, byte offset and length so readers can map them in place.
+MAGIC = b"CGPBM25\x00"
+FORMAT_VERSION = 2
+# Indexes over passages carry extra arrays and a version of their own, so
+# readers that predate passages reject them rather than misread them
+PASSAGE_FORMAT_VERSION = 3
+ALIGN = 64
+_PREAMBLE = struct.Struct("<8sIIQ")
+
+
+class IndexFormatError(ValueError):
+    pass
+
+
+class _StringTable:
+    """Deduplicated UTF-8 strings stored as one byte buffer plus offsets."""
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.chunks: List[bytes] = []
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = len(self.chunks)
+            self.ids[value] = sid
+            self.chunks.append(value.encode("utf-8"))
+        return sid
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        return _pack_bytes(self.chunks)
+
+
+def _pack_bytes(chunks: Sequence[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    if chunks:
+        offsets[1:] = np.cumsum([len(c) for c in chunks])
+    data = np.frombuffer(b"".join(chunks), dtype=np.uint8)
+    return data, offsets
+
+
+def _write_arrays(
+    f: BinaryIO,
+    arrays: Dict[str, np.ndarray],
+    params: Dict[str, Any],
+    version: int = FORMAT_VERSION,
+) -> None:
+    entries: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        arrays[name] = arr
+        offset = -(-offset // ALIGN) * ALIGN
+        entries[name] = {
+            "dtype": arr.dtype.str,
+            "offset": offset,
+            "length": int(arr.size),
+        }
+        offset += arr.nbytes
+    header = json.dumps({"params": params, "arrays": entries}).encode("utf-8")
+    base = -(-(_PREAMBLE.size + len(header)) // ALIGN) * ALIGN
+    f.write(_PREAMBLE.pack(MAGIC, version, 0, len(header)))
+    f.write(header)
+    f.write(b"\0" * (base - _PREAMBLE.size - len(header)))
+    pos = 0
+    for name, arr in arrays.items():
+        start = entries[name]["offset"]
+        f.write(b"\0" * (start - pos))
+        f.write(arr.tobytes())
+        pos = start + arr.nbytes
+
+
+def write_index(
+    path: str,
+    sections: Sequence["SectionRef"],
+    snippets: Iterable[str],
+    index: InvertedIndex,
+    columns: FilterColumns,
+    tokenizer: Optional[Tokenizer] = None,
+    passages: Optional["PassageTable"] = None,
+) -> None:
+    """Persist an ``InvertedIndex`` and its ``SectionRef`` metadata to ``path``.
+
+    ``snippets`` yields the stored result snippet for each section in order.
+    ``tokenizer`` settings are stored so queries are tokenized the same way.
+    For an index over ``passages``, ``snippets`` yields one snippet per
+    passage, and the passages' sections, ranges and heading paths are stored.
+
+    Postings are regrouped by term sorted on UTF-8 bytes so readers can binary
+    search the mapped vocabulary without building a dict.
+    """
+    vocab = index.vocab
+    if not isinstance(vocab, dict):
+        raise TypeError("write_index needs an index built in memory")
+    terms = sorted(vocab, key=lambda t: t.encode("utf-8"))
+    old_ids = np.fromiter((vocab[t] for t in terms), np.int64, len(terms))
+    df = np.diff(index.post_offsets)[old_ids]
+    post_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(df, out=post_offsets[1:])
+    # Gather each term's posting range in the new (sorted) term order
+    starts = np.repeat(index.post_offsets[old_ids] - post_offsets[:-1], df)
+    gather = np.arange(int(post_offsets[-1]), dtype=np.int64) + starts
+    post_docs = index.post_docs[gather]
+    post_tfs = index.post_tfs[gather]
+    idf = index.idf[old_ids]
+    term_bytes, term_offsets = _pack_bytes([t.encode("utf-8") for t in terms])
+
+    strings = _StringTable()
+    doc_keys: Dict[Tuple[Optional[str], ...], int] = {}
+    doc_cols: List[List[int]] = [[], [], [], [], []]
+    sec_doc: List[int] = []
+    sec_heading: List[int] = []
+    sec_snippet: List[int] = []
+    snippets = iter(snippets)
+    for ref in sections:
+        key = (
+            ref.doc_id,
+            ref.title,
+            ref.source,
+            ref.publication_date,
+            ref.last_updated,
+        )
+        d = doc_keys.get(key)
+        if d is None:
+            d = doc_keys[key] = len(doc_keys)
+            for col, value in zip(doc_cols, key):
+                col.append(strings.add(value))
+        sec_doc.append(d)
+        sec_heading.append(strings.add(ref.section_heading))
+        if passages is None:
+            sec_snippet.append(strings.add(next(snippets)))
+    if passages is not None:
+        psg_snippet = [strings.add(snippet) for snippet in snippets]
+        sec_path = [strings.add(passages.paths[code]) for code in passages.path]
+    str_bytes, str_offsets = strings.arrays()
+
+    arrays: Dict[str, np.ndarray] = {
+        "term_bytes": term_bytes,
+        "term_offsets": term_offsets,
+        "post_offsets": post_offsets,
+        "post_docs": post_docs,
+        "post_tfs": post_tfs,
+        "idf": idf,
+        "doc_len": np.asarray(index.doc_len, dtype=np.int32),
+        "sec_doc": np.asarray(sec_doc, dtype=np.int32),
+        "sec_heading": np.asarray(sec_heading, dtype=np.int32),
+        "sec_level": np.asarray([s.section_level for s in sections], dtype=np.int32),
+        "sec_snippet": np.asarray(sec_snippet, dtype=np.int32),
+        "doc_id": np.asarray(doc_cols[0], dtype=np.int32),
+        "doc_title": np.asarray(doc_cols[1], dtype=np.int32),
+        "doc_source": np.asarray(doc_cols[2], dtype=np.int32),
+        "doc_publication_date": np.asarray(doc_cols[3], dtype=np.int32),
+        "doc_last_updated": np.asarray(doc_cols[4], dtype=np.int32),
+        "str_bytes": str_bytes,
+        "str_offsets": str_offsets,
+        "col_source": columns.source_codes,
+        "col_date": columns.dates,
+        "col_grade": columns.grade_codes,
+    }
+    version = FORMAT_VERSION
+    if passages is not None:
+        version = PASSAGE_FORMAT_VERSION
+        del arrays["sec_snippet"]
+        arrays["sec_path"] = np.asarray(sec_path, dtype=np.int32)
+        arrays["psg_section"] = np.array(passages.section, dtype=np.int32)
+        arrays["psg_start"] = np.array(passages.start, dtype=np.int64)
+        arrays["psg_end"] = np.array(passages.end, dtype=np.int64)
+        arrays["psg_snippet"] = np.asarray(psg_snippet, dtype=np.int32)
+    params = {
+        "k1": float(index.k1),
+        "b": float(index.b),
+        "avgdl": float(index.avgdl),
+        "num_sections": len(sections),
+        "tokenizer": (tokenizer or Tokenizer()).to_params(),
+        "dictionaries": {
+            "source": columns.sources.values,
+            "grade": columns.grades.values,
+        },
+    }
+    if passages is not None:
+        params["passages"] = passages.chunker.to_params()
+    tmp = Path(str(path) + ".tmp")
+    with open(tmp, "wb") as f:
+        _write_arrays(f, arrays, params, version)
+    tmp.replace(path)
+
+
+class _MappedVocabulary:
+    """Sorted on-disk vocabulary answering lookups by binary search."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _term(self, i: int) -> bytes:
+        off = self._offsets
+        return self._data[int(off[i]) : int(off[i + 1])].tobytes()
+
+    def get(self, term: str, default: int = -1, /) -> int:
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._term(lo) == key:
+            return lo
+        return default
+
+
+class MappedBM25Index:
+    """Read-only BM25 index served straight from a memory-mapped index file.
+
+    Opening the file only parses the small JSON header; postings, IDF values
+    and metadata stay on disk until a query touches them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, header_len = _PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise IndexFormatError(f"Not a BM25 index file: {path}")
+        if version not in (FORMAT_VERSION, PASSAGE_FORMAT_VERSION):
+            raise IndexFormatError(
+                f"Unsupported index format version {version}; rebuild the index"
+            )
+        header = json.loads(self._mm[_PREAMBLE.size : _PREAMBLE.size + header_len])
+        base = -(-(_PREAMBLE.size + header_len) // ALIGN) * ALIGN
+        self.params: Dict[str, Any] = header["params"]
+        # Files written before tokenizer settings were stored used the default
+        self.tokenizer = Tokenizer.from_params(self.params.get("tokenizer"))
+        self.chunker = Chunker.from_params(self.params.get("passages"))
+        self._arrays: Dict[str, np.ndarray] = {
+            name: np.frombuffer(
+                self._mm,
+                dtype=np.dtype(spec["dtype"]),
+                count=spec["length"],
+                offset=base + spec["offset"],
+            )
+            for name, spec in header["arrays"].items()
+        }
+        a = self._arrays
+        self.index = InvertedIndex(
+            _MappedVocabulary(a["term_bytes"], a["term_offsets"]),
+            a["post_offsets"],
+            a["post_docs"],
+            a["post_tfs"],
+            a["doc_len"],
+            a["idf"],
+            k1=float(self.params["k1"]),
+            b=float(self.params["b"]),
+            avgdl=float(self.params["avgdl"]),
+        )
+        dictionaries = self.params["dictionaries"]
+        self.columns = FilterColumns(
+            a["col_source"],
+            dictionaries["source"],
+            a["col_date"],
+            a["sec_level"],
+            a["col_grade"],
+            dictionaries["grade"],
+        )
+        # Section of every passage; None for an index over whole sections
+        self._section_of: Optional[np.ndarray] = a.get("psg_section")
+
+    def __len__(self) -> int:
+        return int(self.params["num_sections"])
+
+    def close(self) -> None:
+        del self.index, self.columns
+        self._section_of = None
+        self._arrays = {}
+        self._mm.close()
+
+    def _string(self, sid: int) -> Optional[str]:
+        if sid < 0:
+            return None
+        off = self._arrays["str_offsets"]
+        raw = self._arrays["str_bytes"][int(off[sid]) : int(off[sid + 1])]
+        return raw.tobytes().decode("utf-8")
+
+    def search(
+        self, query: str, k: int = 5, filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        mask = self.columns.mask(filters)
+        term_ids = self.tokenizer.term_ids(query, self.index.vocab)
+        if self._section_of is not None:
+            ids, scores = top_k_sections(
+                self.index, self._section_of, [term_ids], k, 1, mask
+            )[0]
+        else:
+            ids, scores = self.index.top_k_terms(term_ids, k, mask)
+        return [
+            self.result(sec, score) for sec, score in zip(ids.tolist(), scores.tolist())
+        ]
+
+    def search_many(
+        self,
+        queries: Sequence[str],
+        k: int = 5,
+        workers: int = 1,
+        filters: Optional[SearchFilter] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        mask = self.columns.mask(filters)
+        vocab = self.index.vocab
+        term_ids = [self.tokenizer.term_ids(q, vocab) for q in queries]
+        if self._section_of is not None:
+            hits = top_k_sections(
+                self.index, self._section_of, term_ids, k, workers, mask
+            )
+        else:
+            hits = self.index.top_k_many_terms(term_ids, k, workers, mask)
+        return [
+            [
+                self.result(sec, score)
+                for sec, score in zip(ids.tolist(), scores.tolist())
+            ]
+            for ids, scores in hits
+        ]
+
+    def terms(self) -> List[str]:
+        """The vocabulary in term id order."""
+        data = self._arrays["term_bytes"].tobytes()
+        off = self._arrays["term_offsets"].tolist()
+        return [data[a:b].decode("utf-8") for a, b in zip(off, off[1:])]
+
+    def section_mask(self, doc_ids: Collection[str]) -> np.ndarray:
+        """Boolean mask of the sections belonging to any of ``doc_ids``."""
+        a = self._arrays
+        ids = [self._string(int(sid)) or "" for sid in a["doc_id"].tolist()]
+        hit = np.array([d in doc_ids for d in ids], dtype=bool)
+        mask: np.ndarray = hit[a["sec_doc"]]
+        return mask
+
+    def section(self, sec: int) -> Tuple["SectionRef", str]:
+        """Metadata and stored snippet of section ``sec``."""
+        from src.search.sections import SectionRef
+
+        r = self.result(sec, 0.0)
+        ref = SectionRef(
+            r["doc_id"],
+            r["title"],
+            r["source"],
+            r["section_heading"],
+            r["section_level"],
+            r["publication_date"],
+            r["last_updated"],
+            evidence_grade=r["evidence_grade"],
+        )
+        return ref, r["snippet"]
+
+    def result(self, sec: int, score: float) -> Dict[str, Any]:
+        """Search result dict for section ``sec``; for an index over passages,
+        ``sec`` is a passage and the result describes its section."""
+        a = self._arrays
+        passage = None
+        if self._section_of is not None:
+            passage, sec = sec, int(self._section_of[sec])
+        d = int(a["sec_doc"][sec])
+        result = {
+            "score": score,
+            "doc_id": self._string(int(a["doc_id"][d])) or "",
+            "title": self._string(int(a["doc_title"][d])),
+            "source": self._string(int(a["doc_source"][d])),
+            "section_heading": self._string(int(a["sec_heading"][sec])),
+            "section_level": int(a["sec_level"][sec]),
+            "publication_date": self._string(int(a["doc_publication_date"][d])),
+            "last_updated": self._string(int(a["doc_last_updated"][d])),
+            "evidence_grade": self.columns.grades.decode(int(a["col_grade"][sec])),
+        }
+        if passage is None:
+            result["snippet"] = self._string(int(a["sec_snippet"][sec])) or ""
+            return result
+        path = self._string(int(a["sec_path"][sec]))
+        result["heading_path"] = path.split(PATH_SEPARATOR) if path else []
+        result["char_start"] = int(a["psg_start"][passage])
+        result["char_end"] = int(a["psg_end"][passage])
+        result["snippet"] = self._string(int(a["psg_snippet"][passage])) or ""
+        return result
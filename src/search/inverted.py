@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import math
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.search.tokenizer import TermLookup, Vocabulary
+
+# Upper bound on query x section cells scored together in ``top_k_many``
+DENSE_BATCH_CELLS = 1 << 24
+
+_EMPTY_IDS = np.empty(0, dtype=np.int64)
+_EMPTY_SCORES = np.empty(0, dtype=np.float64)
+
+
+class InvertedIndex:
+    """BM25 postings: term -> (section ids, term frequencies).
+
+    Scoring reproduces ``rank_bm25.BM25Okapi`` (same IDF smoothing, same
+    floating-point operation order) but only touches the postings of the
+    query terms instead of every section in the corpus.
+    """
+
+    def __init__(
+        self,
+        vocab: TermLookup,
+        post_offsets: np.ndarray,
+        post_docs: np.ndarray,
+        post_tfs: np.ndarray,
+        doc_len: np.ndarray,
+        idf: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+        avgdl: Optional[float] = None,
+    ):
+        self.vocab = vocab
+        self.post_offsets = post_offsets
+        self.post_docs = post_docs
+        self.post_tfs = post_tfs
+        self.doc_len = doc_len
+        self.idf = idf
+        self.k1 = k1
+        self.b = b
+        if avgdl is None:
+            avgdl = float(doc_len.sum()) / len(doc_len) if len(doc_len) else 0.0
+        self.avgdl = avgdl
+        # Per-section length normalization, computed once instead of per term
+        self._norm = k1 * (1 - b + b * doc_len / (avgdl or 1.0))
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_len)
+
+    @staticmethod
+    def build(
+        corpus: Iterable[Sequence[str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ) -> "InvertedIndex":
+        builder = InvertedIndexBuilder()
+        for tokens in corpus:
+            builder.add(tokens)
+        return builder.build(k1=k1, b=b, epsilon=epsilon)
+
+    def term_id(self, term: str) -> int:
+        return self.vocab.get(term, -1)
+
+    def term_ids(self, tokens: Sequence[str]) -> List[int]:
+        """Ids of the known ``tokens``, in order and with repeats."""
+        return [t for t in (self.term_id(tok) for tok in tokens) if t >= 0]
+
+    def postings(self, tid: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = int(self.post_offsets[tid]), int(self.post_offsets[tid + 1])
+        return self.post_docs[start:end], self.post_tfs[start:end]
+
+    def term_weights(
+        self, tid: int, mask: Optional[np.ndarray] = None, idf: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the sections containing term ``tid`` and its BM25 weight in each.
+
+        ``mask`` (one bool per section) drops postings before any weight is
+        computed, so filtered-out sections are never scored. ``idf`` overrides
+        the stored IDF, for callers holding corpus-wide statistics.
+        """
+        docs, tfs = self.postings(tid)
+        if mask is not None:
+            keep = mask[docs]
+            docs, tfs = docs[keep], tfs[keep]
+        tf = tfs.astype(np.float64)
+        weight = self.idf[tid] if idf is None else idf
+        return docs, weight * (tf * (self.k1 + 1) / (tf + self._norm[docs]))
+
+    def get_scores(
+        self, tokens: Sequence[str], mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(section_ids, scores)`` for sections matching any token.
+
+        Repeated query tokens contribute once per occurrence, as in
+        ``BM25Okapi.get_scores``.
+        """
+        return self.score_terms(self.term_ids(tokens), mask)
+
+    def score_terms(
+        self,
+        term_ids: Sequence[int],
+        mask: Optional[np.ndarray] = None,
+        idf: Optional[Sequence[float]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """``get_scores`` for a query already mapped to term ids.
+
+        ``idf``, if given, holds the IDF to use for each entry of ``term_ids``.
+        """
+        docs_parts: List[np.ndarray] = []
+        weight_parts: List[np.ndarray] = []
+        for i, tid in enumerate(term_ids):
+            docs, weights = self.term_weights(
+                tid, mask, None if idf is None else idf[i]
+            )
+            docs_parts.append(docs)
+            weight_parts.append(weights)
+        if not docs_parts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        if len(docs_parts) == 1:
+            return docs_parts[0], weight_parts[0]
+        docs = np.concatenate(docs_parts)
+        weights = np.concatenate(weight_parts)
+        if docs.size * 4 > self.num_docs:
+            # Dense accumulator: linear in corpus size but avoids sorting
+            # when common terms touch a large share of the corpus
+            dense = np.bincount(docs, weights=weights, minlength=self.num_docs)
+            hit = np.zeros(self.num_docs, dtype=bool)
+            hit[docs] = True
+            ids = np.flatnonzero(hit)
+            return ids, dense[ids]
+        ids, inverse = np.unique(docs, return_inverse=True)
+        return ids, np.bincount(inverse, weights=weights)
+
+    def top_k(
+        self, tokens: Sequence[str], k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self.top_k_terms(self.term_ids(tokens), k, mask)
+
+    def top_k_terms(
+        self, term_ids: Sequence[int], k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        ids, scores = self.score_terms(term_ids, mask)
+        return select_top_k(ids, scores, k)
+
+    def top_k_many(
+        self,
+        queries: Sequence[Sequence[str]],
+        k: int,
+        workers: int = 1,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Score a batch of tokenized queries; see ``top_k_many_terms``."""
+        return self.top_k_many_terms(
+            [self.term_ids(q) for q in queries], k, workers, mask
+        )
+
+    def top_k_many_terms(
+        self,
+        queries: Sequence[Sequence[int]],
+        k: int,
+        workers: int = 1,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Score a batch of queries, each given as term ids, together.
+
+        Each distinct term's weights are computed once per batch. Queries are
+        then scored in groups as one sparse query x section matrix: every
+        posting is keyed by ``query * num_docs + section`` and the keys are
+        accumulated in a single ``bincount``. With ``workers > 1`` the batch is
+        split across threads; the NumPy kernels doing the work release the GIL.
+        """
+        if workers <= 1 or len(queries) < 2:
+            return self._top_k_batch(queries, k, mask)
+        size = -(-len(queries) // workers)
+        parts = [queries[i : i + size] for i in range(0, len(queries), size)]
+        with ThreadPoolExecutor(max_workers=len(parts)) as pool:
+            chunks = pool.map(lambda part: self._top_k_batch(part, k, mask), parts)
+            return [r for chunk in chunks for r in chunk]
+
+    def _top_k_batch(
+        self,
+        queries: Sequence[Sequence[int]],
+        k: int,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        n = self.num_docs
+        weights: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        term_ids: List[Sequence[int]] = []
+        for tids in queries:
+            for t in tids:
+                if t not in weights:
+                    weights[t] = self.term_weights(t, mask)
+            term_ids.append(tids)
+
+        results: List[Tuple[np.ndarray, np.ndarray]] = []
+        step = max(1, DENSE_BATCH_CELLS // max(n, 1))
+        for first in range(0, len(term_ids), step):
+            group = term_ids[first : first + step]
+            key_parts: List[np.ndarray] = []
+            weight_parts: List[np.ndarray] = []
+            for qi, tids in enumerate(group):
+                for t in tids:
+                    docs, w = weights[t]
+                    key_parts.append(docs.astype(np.int64) + qi * n)
+                    weight_parts.append(w)
+            if not key_parts:
+                results.extend((_EMPTY_IDS, _EMPTY_SCORES) for _ in group)
+                continue
+            keys = np.concatenate(key_parts)
+            cells = len(group) * n
+            if keys.size * 4 > cells:
+                dense = np.bincount(
+                    keys, weights=np.concatenate(weight_parts), minlength=cells
+                )
+                hit = np.zeros(cells, dtype=bool)
+                hit[keys] = True
+                ids = np.flatnonzero(hit)
+                scores = dense[ids]
+            else:
+                ids, inverse = np.unique(keys, return_inverse=True)
+                scores = np.bincount(inverse, weights=np.concatenate(weight_parts))
+            bounds = np.searchsorted(ids, np.arange(len(group) + 1) * n)
+            for qi in range(len(group)):
+                a, b = bounds[qi], bounds[qi + 1]
+                results.append(select_top_k(ids[a:b] - qi * n, scores[a:b], k))
+        return results
+
+
+def select_top_k(
+    ids: np.ndarray, scores: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Pick the ``k`` best ``(id, score)`` pairs, best first.
+
+    Uses ``np.partition`` to find the cut-off score in linear time and only
+    sorts the survivors. Ties keep ascending id order, matching a stable sort
+    over the corpus.
+    """
+    if k <= 0 or ids.size == 0:
+        return ids[:0], scores[:0]
+    if ids.size > k:
+        kth = np.partition(scores, ids.size - k)[ids.size - k]
+        keep = scores >= kth
+        ids, scores = ids[keep], scores[keep]
+    order = np.lexsort((ids, -scores))[:k]
+    return ids[order], scores[order]
+
+
+class InvertedIndexBuilder:
+    """Accumulates tokenized sections one at a time into flat posting arrays.
+
+    Token ids are buffered and turned into ``(section, term, tf)`` postings in
+    vectorized batches of roughly ``flush_tokens`` tokens, so the per-section
+    Python work is a single vocabulary lookup per token, or none when the
+    caller passes ids from ``Tokenizer.ids(text, builder.vocab)``.
+    """
+
+    def __init__(self, flush_tokens: int = 1 << 20) -> None:
+        self.vocab = Vocabulary()
+        self.flush_tokens = flush_tokens
+        self._pending = array("i")
+        self._doc_len = array("i")
+        self._flushed_docs = 0
+        self._chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, tokens: Sequence[str]) -> int:
+        """Add one section's tokens and return its section id."""
+        return self.add_ids(array("i", map(self.vocab.__getitem__, tokens)))
+
+    def add_ids(self, term_ids: array) -> int:
+        """Add one section given as ids from ``self.vocab``; returns its id."""
+        doc = len(self._doc_len)
+        self._pending.extend(term_ids)
+        self._doc_len.append(len(term_ids))
+        if len(self._pending) >= self.flush_tokens:
+            self._flush()
+        return doc
+
+    def _flush(self) -> None:
+        first, last = self._flushed_docs, len(self._doc_len)
+        if first == last:
+            return
+        lens = np.array(self._doc_len[first:last], dtype=np.int64)
+        docs = np.repeat(np.arange(first, last, dtype=np.int64), lens)
+        terms = np.array(self._pending, dtype=np.int64)
+        # One (section, term) key per token; unique() counts term frequencies
+        keys, tfs = np.unique((docs << 32) | terms, return_counts=True)
+        self._chunks.append(
+            (
+                (keys >> 32).astype(np.int32),
+                (keys & 0xFFFFFFFF).astype(np.int32),
+                tfs.astype(np.int32),
+            )
+        )
+        self._pending = array("i")
+        self._flushed_docs = last
+
+    def build(
+        self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25
+    ) -> InvertedIndex:
+        self._flush()
+        chunks = self._chunks
+        self._chunks = []
+        if chunks:
+            docs, terms, tfs = (np.concatenate(col) for col in zip(*chunks))
+        else:
+            docs = terms = tfs = np.empty(0, dtype=np.int32)
+        del chunks
+        # Chunks are ordered by section, so a stable sort on term keeps each
+        # posting list in ascending section order
+        order = np.argsort(terms, kind="stable")
+        df = np.bincount(terms, minlength=len(self.vocab))
+        post_offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=post_offsets[1:])
+        del terms
+        post_docs = docs[order]
+        del docs
+        post_tfs = tfs[order]
+        del tfs, order
+        doc_len = np.array(self._doc_len, dtype=np.int32)
+        idf = okapi_idf(df.tolist(), len(doc_len), epsilon)
+        return InvertedIndex(
+            self.vocab, post_offsets, post_docs, post_tfs, doc_len, idf, k1=k1, b=b
+        )
+
+
+def okapi_idf(df: Sequence[int], num_docs: int, epsilon: float = 0.25) -> np.ndarray:
+    """BM25Okapi IDF: negative values are floored to ``epsilon * mean(idf)``.
+
+    ``df`` must be in first-occurrence order so the running sum, and therefore
+    the floor, is bit-identical to ``rank_bm25``.
+    """
+    idf = [math.log(num_docs - n + 0.5) - math.log(n + 0.5) for n in df]
+    if idf:
+        eps = epsilon * (sum(idf) / len(idf))
+        idf = [eps if v < 0 else v for v in idf]
+    return np.array(idf, dtype=np.float64)
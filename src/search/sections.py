@@ -0,0 +1,271 @@
+"""Compact in-memory storage for the sections behind a BM25 index.
+
+``SectionTable`` keeps one row per section in typed ``array`` columns.
+Document-level strings are stored once per document and referenced by index,
+headings and evidence grades are dictionary-encoded, and inline section text
+lives in one UTF-8 buffer addressed by offsets. Indexing the table returns a
+``SectionRef`` built on demand, so no per-section Python object is retained.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    overload,
+)
+
+# Marks a missing integer (record offset, text start, dictionary code)
+MISSING = -1
+
+
+class SectionRef:
+    """One section's metadata, plus either its text or where to read it from.
+
+    Either ``text`` holds the section text itself, or ``offset`` is the byte
+    offset of the JSONL record holding it and ``position`` the section's index
+    in that record's "sections" (for a section table, ``offset`` is the row).
+    """
+
+    __slots__ = (
+        "doc_id",
+        "title",
+        "source",
+        "section_heading",
+        "section_level",
+        "publication_date",
+        "last_updated",
+        "text",
+        "offset",
+        "position",
+        "evidence_grade",
+    )
+
+    def __init__(
+        self,
+        doc_id: str,
+        title: Optional[str],
+        source: Optional[str],
+        section_heading: Optional[str],
+        section_level: int,
+        publication_date: Optional[str],
+        last_updated: Optional[str],
+        text: Optional[str] = None,
+        offset: Optional[int] = None,
+        position: int = 0,
+        evidence_grade: Optional[str] = None,
+    ):
+        self.doc_id = doc_id
+        self.title = title
+        self.source = source
+        self.section_heading = section_heading
+        self.section_level = section_level
+        self.publication_date = publication_date
+        self.last_updated = last_updated
+        self.text = text
+        self.offset = offset
+        self.position = position
+        self.evidence_grade = evidence_grade
+
+    def _values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SectionRef):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{n}={getattr(self, n)!r}" for n in self.__slots__)
+        return f"SectionRef({fields})"
+
+
+class _Codes:
+    """Distinct strings and their integer codes."""
+
+    def __init__(self) -> None:
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return MISSING
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code] if code != MISSING else None
+
+
+class SectionTable(Sequence[SectionRef]):
+    """Column store of ``SectionRef`` rows; a sequence of ``SectionRef``.
+
+    Consecutive rows of the same document share one entry in the document
+    columns, so ``doc_id``, ``title``, ``source`` and the dates are kept once
+    per document rather than once per section.
+    """
+
+    def __init__(self) -> None:
+        # Per document
+        self.doc_ids: List[str] = []
+        self.titles: List[Optional[str]] = []
+        self.sources: List[Optional[str]] = []
+        self.publication_dates: List[Optional[str]] = []
+        self.last_updated: List[Optional[str]] = []
+        # Per section
+        self.doc = array("i")
+        self.heading = array("i")
+        self.level = array("h")
+        self.grade = array("h")
+        self.offset = array("q")
+        self.position = array("i")
+        self.text_start = array("q")
+        self.text_end = array("q")
+        self.text_buffer = bytearray()
+        self._headings = _Codes()
+        self._grades = _Codes()
+        self._last_doc: Optional[Tuple[Optional[str], ...]] = None
+
+    @staticmethod
+    def from_refs(refs: Iterable[SectionRef]) -> "SectionTable":
+        table = SectionTable()
+        for ref in refs:
+            table.append(
+                ref.doc_id,
+                ref.title,
+                ref.source,
+                ref.section_heading,
+                ref.section_level,
+                ref.publication_date,
+                ref.last_updated,
+                text=ref.text,
+                offset=ref.offset,
+                position=ref.position,
+                evidence_grade=ref.evidence_grade,
+            )
+        return table
+
+    def append(
+        self,
+        doc_id: str,
+        title: Optional[str],
+        source: Optional[str],
+        section_heading: Optional[str],
+        section_level: int,
+        publication_date: Optional[str],
+        last_updated: Optional[str],
+        text: Optional[str] = None,
+        offset: Optional[int] = None,
+        position: int = 0,
+        evidence_grade: Optional[str] = None,
+    ) -> None:
+        """Add one section; arguments are those of ``SectionRef``."""
+        doc_key = (doc_id, title, source, publication_date, last_updated)
+        if doc_key != self._last_doc:
+            self._last_doc = doc_key
+            self.doc_ids.append(doc_id)
+            self.titles.append(title)
+            self.sources.append(source)
+            self.publication_dates.append(publication_date)
+            self.last_updated.append(last_updated)
+        self.doc.append(len(self.doc_ids) - 1)
+        self.heading.append(self._headings.encode(section_heading))
+        self.level.append(section_level)
+        self.grade.append(self._grades.encode(evidence_grade))
+        self.offset.append(MISSING if offset is None else offset)
+        self.position.append(position)
+        if text is None:
+            self.text_start.append(MISSING)
+            self.text_end.append(MISSING)
+        else:
+            self.text_start.append(len(self.text_buffer))
+            self.text_buffer += text.encode("utf-8")
+            self.text_end.append(len(self.text_buffer))
+
+    def extend(self, other: "SectionTable") -> None:
+        """Append every row of ``other``, re-coding its dictionaries."""
+        doc_base = len(self.doc_ids)
+        self.doc_ids += other.doc_ids
+        self.titles += other.titles
+        self.sources += other.sources
+        self.publication_dates += other.publication_dates
+        self.last_updated += other.last_updated
+        self.doc.extend(d + doc_base for d in other.doc)
+        headings = [self._headings.encode(v) for v in other._headings.values]
+        self.heading.extend(headings[c] if c != MISSING else c for c in other.heading)
+        grades = [self._grades.encode(v) for v in other._grades.values]
+        self.grade.extend(grades[c] if c != MISSING else c for c in other.grade)
+        self.level.extend(other.level)
+        self.offset.extend(other.offset)
+        self.position.extend(other.position)
+        base = len(self.text_buffer)
+        for src, dst in (
+            (other.text_start, self.text_start),
+            (other.text_end, self.text_end),
+        ):
+            dst.extend(v + base if v != MISSING else v for v in src)
+        self.text_buffer += other.text_buffer
+        if len(other):
+            self._last_doc = other._last_doc
+
+    def __len__(self) -> int:
+        return len(self.doc)
+
+    @overload
+    def __getitem__(self, i: int) -> SectionRef: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[SectionRef]: ...
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return [self._row(j) for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("section index out of range")
+        return self._row(i)
+
+    def __iter__(self) -> Iterator[SectionRef]:
+        for i in range(len(self)):
+            yield self._row(i)
+
+    @property
+    def grade_values(self) -> List[str]:
+        """Distinct evidence grades, indexed by the codes in ``grade``."""
+        return self._grades.values
+
+    def text(self, i: int) -> Optional[str]:
+        """Inline text of row ``i``, or ``None`` if it is read from elsewhere."""
+        start = self.text_start[i]
+        if start == MISSING:
+            return None
+        return self.text_buffer[start : self.text_end[i]].decode("utf-8")
+
+    def _row(self, i: int) -> SectionRef:
+        d = self.doc[i]
+        offset = self.offset[i]
+        return SectionRef(
+            doc_id=self.doc_ids[d],
+            title=self.titles[d],
+            source=self.sources[d],
+            section_heading=self._headings.decode(self.heading[i]),
+            section_level=self.level[i],
+            publication_date=self.publication_dates[d],
+            last_updated=self.last_updated[d],
+            text=self.text(i),
+            offset=None if offset == MISSING else offset,
+            position=self.position[i],
+            evidence_grade=self._grades.decode(self.grade[i]),
+        )
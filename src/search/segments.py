@@ -0,0 +1,582 @@
+"""Incrementally updatable BM25 index stored as a directory of segments.
+
+Each segment is an ordinary index file (see ``index_store``) holding the
+sections of some documents. Adding or replacing documents writes a new segment
+for just those documents; removing or replacing marks the old sections deleted
+in the manifest. Queries score every segment with corpus-wide statistics over
+the live sections (section count, average length and per-term document
+frequency), so scores match a full rebuild of the same documents. The one
+exception is the floor for negative IDF, a mean over every term: a rebuild
+sums it in corpus order, which segments cannot reproduce, so floored scores
+may differ by rounding error (well under a relative 1e-12 in practice).
+
+Layout::
+
+    <dir>/segments.json    manifest, replaced atomically on every commit
+    <dir>/seg-000001.idx   segment files, never modified once written
+
+Segments are merged (dropping deleted sections) when there are more than
+``MERGE_SEGMENTS`` of them, or on demand with ``clinical-index merge``, which
+can run in the background while a server keeps reading. Readers that opened
+the previous manifest keep using their mappings of the old segment files. Only
+one process may write to an index directory at a time.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Union
+
+import numpy as np
+
+from src.guidelines.serialization import encode_record, loads
+from src.search.bm25_index import BM25SectionIndex
+from src.search.filters import FilterColumns, SearchFilter
+from src.search.index_store import MappedBM25Index, write_index
+from src.search.inverted import InvertedIndex, okapi_idf, select_top_k
+from src.search.sections import SectionTable
+from src.search.tokenizer import Tokenizer, Vocabulary
+
+MANIFEST = "segments.json"
+MANIFEST_VERSION = 1
+MERGE_SEGMENTS = 8
+
+
+def record_hash(line: Union[str, bytes]) -> str:
+    """Content hash of one JSONL line, as written by ``clinical-ingest``."""
+    if isinstance(line, str):
+        line = line.encode("utf-8")
+    return hashlib.sha1(line.rstrip(b"\r\n")).hexdigest()
+
+
+class _Segment:
+    """An open segment file with its deletions applied."""
+
+    def __init__(self, name: str, mapped: MappedBM25Index, deleted: Set[str]):
+        self.name = name
+        self.mapped = mapped
+        self.deleted = deleted
+        # None when every section is live
+        self.live: Optional[np.ndarray] = None
+        if deleted:
+            self.live = ~mapped.section_mask(deleted)
+        doc_len = mapped.index.doc_len
+        if self.live is None:
+            self.num_live = len(doc_len)
+            self.live_tokens = int(doc_len.sum())
+        else:
+            self.num_live = int(self.live.sum())
+            self.live_tokens = int(doc_len[self.live].sum())
+        self.index = mapped.index
+
+    def live_df(self) -> np.ndarray:
+        """Number of live sections containing each term, in term id order."""
+        offsets = self.index.post_offsets
+        if self.live is None:
+            return np.diff(offsets)
+        alive = np.zeros(len(self.index.post_docs) + 1, dtype=np.int64)
+        np.cumsum(self.live[self.index.post_docs], out=alive[1:])
+        df: np.ndarray = alive[offsets[1:]] - alive[offsets[:-1]]
+        return df
+
+    def close(self) -> None:
+        # Drop every view of the mapping before unmapping it
+        del self.index, self.live
+        self.mapped.close()
+
+    def mask(self, filters: Optional[SearchFilter]) -> Optional[np.ndarray]:
+        mask = self.mapped.columns.mask(filters)
+        if self.live is None:
+            return mask
+        return self.live if mask is None else mask & self.live
+
+
+class SegmentedIndex:
+    """BM25 index over a segment directory, updatable in place.
+
+    Open an existing directory with ``SegmentedIndex(path)`` or start one with
+    ``SegmentedIndex.create``. Every update is committed to disk before the
+    method returns; ``generation`` increases with each commit.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._segments: List[_Segment] = []
+        for attempt in range(3):
+            try:
+                self._load(self._read_manifest())
+                break
+            except FileNotFoundError:
+                # A merge replaced the manifest and removed the segments it
+                # listed between reading it and opening them
+                if attempt == 2:
+                    raise
+
+    @staticmethod
+    def create(
+        path: str, tokenizer: Optional[Tokenizer] = None, epsilon: float = 0.25
+    ) -> "SegmentedIndex":
+        """Create an empty index directory (which may already exist)."""
+        directory = Path(path)
+        if (directory / MANIFEST).exists():
+            raise FileExistsError(f"Index already exists: {path}")
+        directory.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "generation": 0,
+            "tokenizer": (tokenizer or Tokenizer()).to_params(),
+            "k1": 1.5,
+            "b": 0.75,
+            "epsilon": epsilon,
+            "eps": 0.0,
+            "next_segment": 1,
+            "segments": [],
+            "documents": {},
+        }
+        _write_manifest(directory, manifest)
+        return SegmentedIndex(path)
+
+    @staticmethod
+    def is_index(path: str) -> bool:
+        return (Path(path) / MANIFEST).is_file()
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        with open(self.path / MANIFEST, encoding="utf-8") as f:
+            manifest: Dict[str, Any] = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(
+                f"Unsupported segment manifest version {manifest.get('version')}"
+            )
+        return manifest
+
+    def _load(self, manifest: Dict[str, Any]) -> None:
+        """Open the segments of ``manifest``, reusing mappings already open."""
+        open_now = {seg.name: seg for seg in self._segments}
+        segments: List[_Segment] = []
+        for entry in manifest["segments"]:
+            name = entry["name"]
+            previous = open_now.pop(name, None)
+            if previous is None:
+                mapped = MappedBM25Index(str(self.path / name))
+            else:
+                mapped = previous.mapped
+            segments.append(_Segment(name, mapped, set(entry["deleted"])))
+        for seg in open_now.values():
+            seg.close()
+        self.manifest = manifest
+        self.tokenizer = Tokenizer.from_params(manifest["tokenizer"])
+        self.num_sections = sum(seg.num_live for seg in segments)
+        tokens = sum(seg.live_tokens for seg in segments)
+        self.avgdl = tokens / self.num_sections if self.num_sections else 0.0
+        k1, b = float(manifest["k1"]), float(manifest["b"])
+        for seg in segments:
+            # Same postings, normalized by the corpus-wide average length
+            seg.index = InvertedIndex(
+                seg.mapped.index.vocab,
+                seg.mapped.index.post_offsets,
+                seg.mapped.index.post_docs,
+                seg.mapped.index.post_tfs,
+                seg.mapped.index.doc_len,
+                seg.mapped.index.idf,
+                k1=k1,
+                b=b,
+                avgdl=self.avgdl,
+            )
+        self._segments = segments
+        self._starts: List[int] = []
+        start = 0
+        for seg in segments:
+            self._starts.append(start)
+            start += len(seg.mapped)
+
+    def __len__(self) -> int:
+        return self.num_sections
+
+    @property
+    def generation(self) -> int:
+        return int(self.manifest["generation"])
+
+    @property
+    def segment_names(self) -> List[str]:
+        return [seg.name for seg in self._segments]
+
+    @property
+    def documents(self) -> Dict[str, Dict[str, Any]]:
+        """Indexed documents: id -> ``{"segment": name, "hash": content hash}``."""
+        docs: Dict[str, Dict[str, Any]] = self.manifest["documents"]
+        return docs
+
+    def close(self) -> None:
+        for seg in self._segments:
+            seg.close()
+        self._segments = []
+
+    # -- Querying ----------------------------------------------------------
+
+    def _idf(self, terms: Iterable[str]) -> Dict[str, float]:
+        """Corpus-wide IDF of each term with live postings."""
+        n = self.num_sections
+        eps = float(self.manifest["eps"])
+        idf: Dict[str, float] = {}
+        for term in terms:
+            df = 0
+            for seg in self._segments:
+                tid = seg.index.term_id(term)
+                if tid < 0:
+                    continue
+                docs, _ = seg.index.postings(tid)
+                df += len(docs) if seg.live is None else int(seg.live[docs].sum())
+            if df:
+                value = math.log(n - df + 0.5) - math.log(df + 0.5)
+                idf[term] = eps if value < 0 else value
+        return idf
+
+    def search(
+        self, query: str, k: int = 5, filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        tokens = self.tokenizer.tokens(query)
+        idf = self._idf(set(tokens))
+        tokens = [t for t in tokens if t in idf]
+        id_parts: List[np.ndarray] = []
+        score_parts: List[np.ndarray] = []
+        for seg, start in zip(self._segments, self._starts):
+            term_ids: List[int] = []
+            weights: List[float] = []
+            for t in tokens:
+                tid = seg.index.term_id(t)
+                if tid >= 0:
+                    term_ids.append(tid)
+                    weights.append(idf[t])
+            if not term_ids:
+                continue
+            ids, scores = seg.index.score_terms(term_ids, seg.mask(filters), weights)
+            ids, scores = select_top_k(ids, scores, k)
+            id_parts.append(ids.astype(np.int64) + start)
+            score_parts.append(scores)
+        if not id_parts:
+            return []
+        ids, scores = select_top_k(
+            np.concatenate(id_parts), np.concatenate(score_parts), k
+        )
+        results = []
+        for gid, score in zip(ids.tolist(), scores.tolist()):
+            i = int(np.searchsorted(self._starts, gid, side="right")) - 1
+            results.append(
+                self._segments[i].mapped.result(gid - self._starts[i], score)
+            )
+        return results
+
+    def search_many(
+        self,
+        queries: Sequence[str],
+        k: int = 5,
+        workers: int = 1,
+        filters: Optional[SearchFilter] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """One ``search`` per query; ``workers`` is accepted for API parity."""
+        return [self.search(q, k, filters) for q in queries]
+
+    # -- Updating ----------------------------------------------------------
+
+    def add_documents(self, records: Sequence[Dict[str, Any]]) -> int:
+        """Index new guideline records; raises ``ValueError`` for known ids."""
+        for record in records:
+            if _doc_id(record) in self.documents:
+                raise ValueError(f"Document already indexed: {_doc_id(record)!r}")
+        return self.replace_documents(records)
+
+    def replace_documents(self, records: Sequence[Dict[str, Any]]) -> int:
+        """Index records, replacing any indexed documents with the same ids.
+
+        Records sharing an id are indexed together as one document; records
+        without an id raise ``ValueError``. Returns the number of documents
+        written.
+        """
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            groups.setdefault(_doc_id(record), []).append(record)
+        hashes = {
+            doc_id: _group_hash([encode_record(r) for r in group])
+            for doc_id, group in groups.items()
+        }
+        self._update(groups, hashes, [])
+        return len(groups)
+
+    def remove_documents(self, doc_ids: Iterable[str]) -> int:
+        """Delete documents by id; unknown ids are ignored. Returns the count."""
+        known = [d for d in dict.fromkeys(doc_ids) if d in self.documents]
+        if known:
+            self._update({}, {}, known)
+        return len(known)
+
+    def sync_jsonl(self, path: str) -> Dict[str, int]:
+        """Bring the index in line with a guidelines JSONL file.
+
+        Documents are matched by ``id`` (the file's path under the ingest
+        input directory) and compared by a hash of their JSONL lines, so only
+        new, changed and vanished documents are re-indexed. Returns counts of
+        ``added``, ``replaced``, ``removed`` and ``unchanged`` documents.
+        """
+        offsets: Dict[str, List[int]] = {}
+        lines: Dict[str, List[bytes]] = {}
+        with open(path, "rb") as f:
+            offset = 0
+            for line in f:
+                line_offset = offset
+                offset += len(line)
+                if not line.strip():
+                    continue
+                doc_id = _doc_id(loads(line))
+                offsets.setdefault(doc_id, []).append(line_offset)
+                lines.setdefault(doc_id, []).append(line)
+        hashes = {doc_id: _group_hash(group) for doc_id, group in lines.items()}
+        del lines
+        known = self.documents
+        changed = [d for d, h in hashes.items() if known.get(d, {}).get("hash") != h]
+        removed = [d for d in known if d not in hashes]
+        counts = {
+            "added": sum(1 for d in changed if d not in known),
+            "replaced": sum(1 for d in changed if d in known),
+            "removed": len(removed),
+            "unchanged": len(hashes) - len(changed),
+        }
+        if not changed and not removed:
+            return counts
+        if not known and not self._segments:
+            # First load: index straight from the file
+            index = BM25SectionIndex.from_jsonl(path, self.tokenizer)
+            self._commit_segment(index, {d: hashes[d] for d in changed}, [])
+            return counts
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        with open(path, "rb") as f:
+            for doc_id in changed:
+                group = groups[doc_id] = []
+                for line_offset in offsets[doc_id]:
+                    f.seek(line_offset)
+                    group.append(loads(f.readline()))
+        self._update(groups, {d: hashes[d] for d in changed}, removed)
+        return counts
+
+    def _update(
+        self,
+        groups: Dict[str, List[Dict[str, Any]]],
+        hashes: Dict[str, str],
+        removed: Sequence[str],
+    ) -> None:
+        records = [r for group in groups.values() for r in group]
+        index = BM25SectionIndex.from_records(records, self.tokenizer)
+        self._commit_segment(index, hashes, removed)
+
+    def _commit_segment(
+        self,
+        index: BM25SectionIndex,
+        hashes: Dict[str, str],
+        removed: Sequence[str],
+    ) -> None:
+        """Write ``index`` as a new segment holding the documents in ``hashes``,
+        delete older copies of them and of ``removed``, and commit."""
+        manifest = _copy_manifest(self.manifest)
+        documents = manifest["documents"]
+        deleted = {entry["name"]: entry["deleted"] for entry in manifest["segments"]}
+        for doc_id in list(hashes) + list(removed):
+            old = documents.pop(doc_id, None)
+            if old and old["segment"] in deleted:
+                deleted[old["segment"]].append(doc_id)
+        name = None
+        if index.sections:
+            name = _segment_name(manifest)
+            index.save(str(self.path / name))
+            manifest["segments"].append({"name": name, "deleted": []})
+        for doc_id, digest in hashes.items():
+            documents[doc_id] = {"segment": name, "hash": digest}
+        self._commit(manifest)
+        if len(self._segments) > MERGE_SEGMENTS:
+            self.merge(MERGE_SEGMENTS)
+
+    def _commit(self, manifest: Dict[str, Any]) -> None:
+        """Open ``manifest``'s segments, refresh its statistics and write it.
+
+        Segments with no live sections left are dropped and their files
+        removed once the new manifest is in place.
+        """
+        self._load(manifest)
+        empty = [seg for seg in self._segments if seg.num_live == 0]
+        if empty:
+            names = {seg.name for seg in empty}
+            manifest["segments"] = [
+                e for e in manifest["segments"] if e["name"] not in names
+            ]
+            self._load(manifest)
+        manifest["eps"] = self._idf_floor(float(manifest["epsilon"]))
+        manifest["generation"] = int(manifest["generation"]) + 1
+        _write_manifest(self.path, manifest)
+        for seg in empty:
+            (self.path / seg.name).unlink(missing_ok=True)
+
+    def _idf_floor(self, epsilon: float) -> float:
+        """``epsilon`` times the mean IDF over every term with live postings,
+        the floor ``okapi_idf`` gives negative IDF values.
+
+        ``okapi_idf`` sums in first-occurrence order, which depends on the
+        order of the JSONL file; ``fsum`` is exact, so the floor is within
+        rounding of a rebuild's whatever the segment layout.
+        """
+        df: Dict[str, int] = {}
+        for seg in self._segments:
+            for term, count in zip(seg.mapped.terms(), seg.live_df().tolist()):
+                if count:
+                    df[term] = df.get(term, 0) + count
+        if not df:
+            return 0.0
+        n = self.num_sections
+        total = math.fsum(
+            math.log(n - c + 0.5) - math.log(c + 0.5) for c in df.values()
+        )
+        return epsilon * total / len(df)
+
+    def merge(self, max_segments: int = 1) -> bool:
+        """Merge the smallest segments until at most ``max_segments`` remain.
+
+        Deleted sections are dropped from merged segments; with
+        ``max_segments=1`` a single segment with deletions is rewritten
+        without them. Returns True if anything was merged.
+        """
+        segments = sorted(self._segments, key=lambda seg: seg.num_live)
+        count = len(segments) - max(max_segments, 1) + 1
+        if count < 2:
+            count = 1 if len(segments) == 1 and segments[0].live is not None else 0
+        if count == 0:
+            return False
+        chosen = segments[:count]
+        manifest = _copy_manifest(self.manifest)
+        name = _segment_name(manifest)
+        self._write_merged(chosen, str(self.path / name))
+        names = {seg.name for seg in chosen}
+        manifest["segments"] = [
+            e for e in manifest["segments"] if e["name"] not in names
+        ] + [{"name": name, "deleted": []}]
+        for entry in manifest["documents"].values():
+            if entry["segment"] in names:
+                entry["segment"] = name
+        self._commit(manifest)
+        for old in names:
+            (self.path / old).unlink(missing_ok=True)
+        return True
+
+    def _write_merged(self, segments: Sequence[_Segment], path: str) -> None:
+        """Write the live sections of ``segments`` as one segment file."""
+        vocab = Vocabulary()
+        terms: List[np.ndarray] = []
+        docs: List[np.ndarray] = []
+        tfs: List[np.ndarray] = []
+        doc_len: List[np.ndarray] = []
+        sections = SectionTable()
+        snippets: List[str] = []
+        base = 0
+        for seg in segments:
+            index = seg.mapped.index
+            live = seg.live
+            if live is None:
+                live = np.ones(len(seg.mapped), dtype=bool)
+            remap = np.cumsum(live) - 1 + base
+            gids = np.fromiter(
+                (vocab[t] for t in seg.mapped.terms()), np.int64, len(index.vocab)
+            )
+            post_terms = np.repeat(gids, np.diff(index.post_offsets))
+            keep = live[index.post_docs]
+            terms.append(post_terms[keep])
+            docs.append(remap[index.post_docs[keep]])
+            tfs.append(index.post_tfs[keep])
+            doc_len.append(index.doc_len[live])
+            for sec in np.flatnonzero(live).tolist():
+                ref, snippet = seg.mapped.section(sec)
+                sections.append(
+                    ref.doc_id,
+                    ref.title,
+                    ref.source,
+                    ref.section_heading,
+                    ref.section_level,
+                    ref.publication_date,
+                    ref.last_updated,
+                    evidence_grade=ref.evidence_grade,
+                )
+                snippets.append(snippet)
+            base += int(live.sum())
+
+        all_terms = np.concatenate(terms)
+        df = np.bincount(all_terms, minlength=len(vocab))
+        # Drop terms whose postings were all deleted
+        used = df > 0
+        new_ids = np.cumsum(used) - 1
+        names = list(vocab)
+        merged_vocab = Vocabulary(
+            (names[tid], i) for i, tid in enumerate(np.flatnonzero(used).tolist())
+        )
+        all_terms = new_ids[all_terms]
+        df = df[used]
+        # Segments are concatenated in section order, so a stable sort on
+        # term keeps each posting list in ascending section order
+        order = np.argsort(all_terms, kind="stable")
+        post_offsets = np.zeros(len(df) + 1, dtype=np.int64)
+        np.cumsum(df, out=post_offsets[1:])
+        lengths = np.concatenate(doc_len).astype(np.int32)
+        merged = InvertedIndex(
+            merged_vocab,
+            post_offsets,
+            np.concatenate(docs)[order].astype(np.int32),
+            np.concatenate(tfs)[order].astype(np.int32),
+            lengths,
+            okapi_idf(df.tolist(), len(lengths), float(self.manifest["epsilon"])),
+            k1=float(self.manifest["k1"]),
+            b=float(self.manifest["b"]),
+        )
+        columns = FilterColumns.from_sections(sections)
+        write_index(path, sections, snippets, merged, columns, self.tokenizer)
+
+
+def open_index(path: str) -> Union[SegmentedIndex, MappedBM25Index]:
+    """Open a segment directory or a single index file."""
+    if os.path.isdir(path):
+        return SegmentedIndex(path)
+    return MappedBM25Index(path)
+
+
+def _doc_id(record: Dict[str, Any]) -> str:
+    doc_id = record.get("id")
+    if not doc_id:
+        # Every id-less record would be one document, re-indexed on any change
+        raise ValueError(
+            f"Record has no id (title {record.get('title')!r}); "
+            "re-run clinical-ingest to assign ids"
+        )
+    return str(doc_id)
+
+
+def _group_hash(lines: Sequence[bytes]) -> str:
+    if len(lines) == 1:
+        return record_hash(lines[0])
+    return record_hash(b"\n".join(line.rstrip(b"\r\n") for line in lines))
+
+
+def _segment_name(manifest: Dict[str, Any]) -> str:
+    n = int(manifest["next_segment"])
+    manifest["next_segment"] = n + 1
+    return f"seg-{n:06d}.idx"
+
+
+def _copy_manifest(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    copied: Dict[str, Any] = json.loads(json.dumps(manifest))
+    return copied
+
+
+def _write_manifest(directory: Path, manifest: Dict[str, Any]) -> None:
+    tmp = directory / (MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, directory / MANIFEST)
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+from src.search.cache import QueryCache
+from src.search.filters import SearchFilter
+from src.search.index_store import MappedBM25Index
+from src.search.segments import MANIFEST, SegmentedIndex, open_index
+
+MAX_K = 100
+
+
+class IndexHolder:
+    """Owns the live index and swaps in a rebuilt index file without downtime.
+
+    ``clinical-index build`` replaces the file atomically, so requests that
+    already hold the previous index keep reading its (now unlinked) mapping
+    until they finish; the mapping is released when the last reference goes.
+    For a segment directory the manifest is watched instead, which
+    ``clinical-index update`` and ``merge`` replace on every commit.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        version = self._stat()
+        # Index and version are swapped together as one tuple
+        self._state = (open_index(path), version)
+        self.loaded_at = time.time()
+
+    def _stat(self) -> Tuple[int, int, int]:
+        path = self.path
+        if os.path.isdir(path):
+            path = os.path.join(path, MANIFEST)
+        st = os.stat(path)
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    @property
+    def index(self) -> Union[MappedBM25Index, SegmentedIndex]:
+        return self._state[0]
+
+    @property
+    def version(self) -> str:
+        return self.snapshot()[1]
+
+    def snapshot(self) -> Tuple[Union[MappedBM25Index, SegmentedIndex], str]:
+        """The live index with its version, read consistently."""
+        index, (ino, size, mtime) = self._state
+        return index, f"{ino}-{size}-{mtime}"
+
+    def maybe_reload(self) -> bool:
+        """Reload if the index file changed on disk; returns True on swap."""
+        try:
+            current = self._stat()
+        except OSError:
+            return False
+        if current == self._state[1]:
+            return False
+        with self._lock:
+            if current == self._state[1]:
+                return False
+            self._state = (open_index(self.path), current)
+            self.loaded_at = time.time()
+        return True
+
+
+class LatencyStats:
+    """Thread-safe request counters with a sliding window of latencies."""
+
+    def __init__(self, window: int = 10000):
+        self._lock = threading.Lock()
+        self._recent: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, millis: float, ok: bool = True) -> None:
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            self._recent.append(millis)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            requests, errors = self.requests, self.errors
+
+        def pct(p: float) -> Optional[float]:
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))], 3)
+
+        return {
+            "requests": requests,
+            "errors": errors,
+            "window": len(recent),
+            "latency_ms": {
+                "p50": pct(0.50),
+                "p90": pct(0.90),
+                "p99": pct(0.99),
+                "max": round(recent[-1], 3) if recent else None,
+                "mean": round(sum(recent) / len(recent), 3) if recent else None,
+            },
+        }
+
+
+class SearchServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        holder: IndexHolder,
+        reload_interval: float = 2.0,
+        cache: Optional[QueryCache] = None,
+    ):
+        super().__init__(address, SearchHandler)
+        self.holder = holder
+        self.cache = cache
+        self.stats = LatencyStats()
+        self.reload_interval = reload_interval
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def start_watcher(self) -> None:
+        if self.reload_interval <= 0 or self._watcher is not None:
+            return
+
+        def watch() -> None:
+            while not self._stop.wait(self.reload_interval):
+                try:
+                    if self.holder.maybe_reload():
+                        print(f"Reloaded index {self.holder.path}")
+                except Exception as e:
+                    # Keep serving the previous index if the new one is bad
+                    print(f"Failed to reload {self.holder.path}: {e}")
+
+        self._watcher = threading.Thread(target=watch, daemon=True)
+        self._watcher.start()
+
+    def server_close(self) -> None:
+        self._stop.set()
+        super().server_close()
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    server: SearchServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Per-request access logs would dominate output; see /metrics instead
+        pass
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/search":
+            params = parse_qs(url.query)
+            self._search(
+                {
+                    "query": params.get("q", [""])[0],
+                    "k": params.get("k", [5])[0],
+                    "filters": {
+                        "source": params.get("source"),
+                        "date_from": params.get("date_from", [None])[0],
+                        "date_to": params.get("date_to", [None])[0],
+                        "level": params.get("level"),
+                        "grade": params.get("grade"),
+                    },
+                }
+            )
+        elif url.path == "/metrics":
+            payload = self.server.stats.snapshot()
+            if self.server.cache is not None:
+                payload["cache"] = self.server.cache.stats()
+            payload["index"] = {
+                "path": self.server.holder.path,
+                "version": self.server.holder.version,
+                "sections": len(self.server.holder.index),
+                "loaded_at": self.server.holder.loaded_at,
+            }
+            self._send(200, payload)
+        elif url.path == "/healthz":
+            self._send(200, {"status": "ok"})
+        else:
+            self._send(404, {"error": f"Unknown path: {url.path}"})
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path != "/search":
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "Request body must be JSON"})
+            return
+        if not isinstance(body, dict):
+            self._send(400, {"error": "Request body must be a JSON object"})
+            return
+        self._search(body)
+
+    def _search(self, params: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        ok = False
+        try:
+            k = min(max(int(params.get("k", 5)), 0), MAX_K)
+            search_filter = SearchFilter.from_params(params.get("filters") or {})
+        except (TypeError, ValueError) as e:
+            self._send(400, {"error": f"Invalid parameters: {e}"})
+            self.server.stats.record((time.perf_counter() - start) * 1000, ok=False)
+            return
+        # Take one reference so a concurrent hot swap cannot change it mid-request
+        index, version = self.server.holder.snapshot()
+        cache = self.server.cache
+        try:
+            payload: Dict[str, Any]
+            if "queries" in params:
+                queries: List[str] = [str(q) for q in params["queries"]]
+                if cache is not None:
+                    batch = cache.search_many(
+                        index, queries, k=k, filters=search_filter, version=version
+                    )
+                else:
+                    batch = index.search_many(queries, k=k, filters=search_filter)
+                payload = {
+                    "queries": [
+                        {"query": q, "results": r} for q, r in zip(queries, batch)
+                    ]
+                }
+            else:
+                query = str(params.get("query", ""))
+                if cache is not None:
+                    results = cache.search(
+                        index, query, k=k, filters=search_filter, version=version
+                    )
+                else:
+                    results = index.search(query, k=k, filters=search_filter)
+                payload = {"results": results}
+            ok = True
+        except Exception as e:
+            payload = {"error": str(e)}
+        took = (time.perf_counter() - start) * 1000
+        self.server.stats.record(took, ok=ok)
+        payload["took_ms"] = round(took, 3)
+        self._send(200 if ok else 500, payload)
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
@@ -0,0 +1,246 @@
+"""BM25 postings split into shards of whole documents.
+
+Each shard is an ``InvertedIndex`` over a contiguous range of sections. IDF
+values and the average section length are computed over the whole corpus and
+shared by every shard, so scores are identical to those of a single index;
+each shard's top k are merged into the global top k.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+from src.search.inverted import InvertedIndex, okapi_idf, select_top_k
+from src.search.tokenizer import Vocabulary
+
+T = TypeVar("T")
+
+
+def shard_bounds(doc: Sequence[int], shards: int) -> List[int]:
+    """Split rows into up to ``shards`` ranges of similar size.
+
+    ``doc`` holds each row's document index; ranges never split a document.
+    Returns the ``len(ranges) + 1`` row boundaries.
+    """
+    n = len(doc)
+    bounds = [0]
+    for i in range(1, max(shards, 1)):
+        cut = max(n * i // shards, bounds[-1])
+        while 0 < cut < n and doc[cut] == doc[cut - 1]:
+            cut += 1
+        if bounds[-1] < cut < n:
+            bounds.append(cut)
+    bounds.append(n)
+    return bounds
+
+
+class ShardedInvertedIndex:
+    """Scatter-gather BM25 over shard ``InvertedIndex`` objects.
+
+    ``shards`` must cover consecutive sections in order; their own IDF values
+    are replaced by corpus-wide ones. Queries are term ids from the combined
+    ``vocab`` (in first-occurrence order, as for an unsharded build). Shards
+    are scored on a thread pool of ``workers`` threads; the NumPy kernels
+    doing the work release the GIL.
+    """
+
+    def __init__(
+        self,
+        shards: Sequence[InvertedIndex],
+        epsilon: float = 0.25,
+        workers: Optional[int] = None,
+    ):
+        self.vocab = Vocabulary()
+        term_maps: List[np.ndarray] = []
+        for shard in shards:
+            if not isinstance(shard.vocab, dict):
+                raise TypeError("ShardedInvertedIndex needs shards built in memory")
+            # Builder vocabularies are dicts in id order
+            terms = shard.vocab
+            term_maps.append(
+                np.fromiter((self.vocab[t] for t in terms), np.int64, len(terms))
+            )
+        df = np.zeros(len(self.vocab), dtype=np.int64)
+        for shard, gids in zip(shards, term_maps):
+            df[gids] += np.diff(shard.post_offsets)
+        doc_len = [shard.doc_len for shard in shards]
+        num_docs = sum(len(d) for d in doc_len)
+        total = sum(int(d.sum()) for d in doc_len)
+        k1, b = (shards[0].k1, shards[0].b) if shards else (1.5, 0.75)
+        self.k1, self.b = k1, b
+        self.avgdl = total / num_docs if num_docs else 0.0
+        self.idf = okapi_idf(df.tolist(), num_docs, epsilon)
+
+        self.shards: List[InvertedIndex] = []
+        self.starts: List[int] = []
+        self._to_local: List[np.ndarray] = []
+        self._to_global = term_maps
+        start = 0
+        for shard, gids in zip(shards, term_maps):
+            self.shards.append(
+                InvertedIndex(
+                    shard.vocab,
+                    shard.post_offsets,
+                    shard.post_docs,
+                    shard.post_tfs,
+                    shard.doc_len,
+                    self.idf[gids],
+                    k1=k1,
+                    b=b,
+                    avgdl=self.avgdl,
+                )
+            )
+            to_local = np.full(len(self.vocab), -1, dtype=np.int32)
+            to_local[gids] = np.arange(len(gids), dtype=np.int32)
+            self._to_local.append(to_local)
+            self.starts.append(start)
+            start += shard.num_docs
+        self._num_docs = start
+        self.workers = workers or len(self.shards)
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def num_docs(self) -> int:
+        return self._num_docs
+
+    def term_id(self, term: str) -> int:
+        return self.vocab.get(term, -1)
+
+    def term_ids(self, tokens: Sequence[str]) -> List[int]:
+        return [t for t in (self.term_id(tok) for tok in tokens) if t >= 0]
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _map(self, fn: Callable[[int], T]) -> List[T]:
+        if self.workers <= 1 or len(self.shards) < 2:
+            return [fn(i) for i in range(len(self.shards))]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return list(self._pool.map(fn, range(len(self.shards))))
+
+    def _local(self, i: int, term_ids: Sequence[int]) -> List[int]:
+        if not term_ids:
+            return []
+        local = self._to_local[i][np.asarray(term_ids, dtype=np.int64)]
+        known: List[int] = local[local >= 0].tolist()
+        return known
+
+    def _mask(self, i: int, mask: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if mask is None:
+            return None
+        start = self.starts[i]
+        return mask[start : start + self.shards[i].num_docs]
+
+    def top_k(
+        self, tokens: Sequence[str], k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self.top_k_terms(self.term_ids(tokens), k, mask)
+
+    def top_k_terms(
+        self, term_ids: Sequence[int], k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        def run(i: int) -> Tuple[np.ndarray, np.ndarray]:
+            local = self._local(i, term_ids)
+            ids, scores = self.shards[i].top_k_terms(local, k, self._mask(i, mask))
+            return ids.astype(np.int64) + self.starts[i], scores
+
+        return _merge(self._map(run), k)
+
+    def top_k_many(
+        self,
+        queries: Sequence[Sequence[str]],
+        k: int,
+        workers: int = 1,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        return self.top_k_many_terms([self.term_ids(q) for q in queries], k, mask=mask)
+
+    def top_k_many_terms(
+        self,
+        queries: Sequence[Sequence[int]],
+        k: int,
+        workers: int = 1,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Score a batch on every shard at once; ``workers`` is unused, as
+        shards already run on the index's own threads."""
+
+        def run(i: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+            local = [self._local(i, q) for q in queries]
+            hits = self.shards[i].top_k_many_terms(local, k, 1, self._mask(i, mask))
+            return [(ids.astype(np.int64) + self.starts[i], s) for ids, s in hits]
+
+        per_shard = self._map(run)
+        return [_merge([hits[q] for hits in per_shard], k) for q in range(len(queries))]
+
+    def merged(self) -> InvertedIndex:
+        """One unsharded ``InvertedIndex`` with the same postings and scores."""
+        terms = np.concatenate(
+            [
+                np.repeat(gids, np.diff(shard.post_offsets))
+                for shard, gids in zip(self.shards, self._to_global)
+            ]
+            or [np.empty(0, dtype=np.int64)]
+        )
+        # Shards are in section order, so a stable sort on term keeps each
+        # posting list in ascending section order
+        order = np.argsort(terms, kind="stable")
+        docs = np.concatenate(
+            [s.post_docs + start for s, start in zip(self.shards, self.starts)]
+            or [np.empty(0, dtype=np.int32)]
+        )
+        tfs = np.concatenate(
+            [s.post_tfs for s in self.shards] or [np.empty(0, dtype=np.int32)]
+        )
+        post_offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocab)), out=post_offsets[1:])
+        doc_len = np.concatenate(
+            [s.doc_len for s in self.shards] or [np.empty(0, dtype=np.int32)]
+        )
+        return InvertedIndex(
+            self.vocab,
+            post_offsets,
+            docs[order].astype(np.int32),
+            tfs[order],
+            doc_len,
+            self.idf,
+            k1=self.k1,
+            b=self.b,
+            avgdl=self.avgdl,
+        )
+
+
+def _merge(
+    parts: Sequence[Tuple[np.ndarray, np.ndarray]], k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Global top k from per-shard top-k lists (ids already global)."""
+    if len(parts) == 1:
+        return parts[0]
+    ids = np.concatenate([p[0] for p in parts])
+    scores = np.concatenate([p[1] for p in parts])
+    return select_top_k(ids, scores, k)
+
+
+def line_ranges(path: str, parts: int) -> List[Tuple[int, int]]:
+    """Split a JSONL file into up to ``parts`` byte ranges of whole lines."""
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        cuts = [0]
+        for i in range(1, max(parts, 1)):
+            pos = max(size * i // parts, cuts[-1])
+            if pos == 0:
+                continue
+            # Move to the start of the next line (or stay on one)
+            f.seek(pos - 1)
+            f.readline()
+            pos = f.tell()
+            if cuts[-1] < pos < size:
+                cuts.append(pos)
+    cuts.append(size)
+    return [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
@@ -0,0 +1,102 @@
+"""Tokenization shared by index building and querying.
+
+Text is lower-cased once, split with a compiled pattern and mapped to integer
+term ids through a single ``Vocabulary``. Indexes built with a tokenizer
+record its settings so queries are tokenized the same way.
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+TOKEN = re.compile(r"\b[\w\-]+\b", re.UNICODE)
+# Medical mode: hyphens and slashes separate terms ("ACE-inhibitor")
+MEDICAL_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Greek letters as written in drug classes and receptors ("β-blocker")
+GREEK = str.maketrans(
+    {
+        "α": "alpha",
+        "β": "beta",
+        "γ": "gamma",
+        "δ": "delta",
+        "κ": "kappa",
+        "μ": "mu",
+    }
+)
+
+
+class TermLookup(Protocol):
+    def get(self, term: str, default: int, /) -> int: ...
+
+    def __len__(self) -> int: ...
+
+
+class Vocabulary(Dict[str, int]):
+    """Term -> id mapping; ``vocab[term]`` assigns the next id to unseen terms.
+
+    ``get`` never adds terms, so queries can look terms up without growing
+    the vocabulary.
+    """
+
+    def __missing__(self, term: str) -> int:
+        tid = self[term] = len(self)
+        return tid
+
+
+class Tokenizer:
+    """Splits text into lower-cased terms and maps them to vocabulary ids.
+
+    With ``medical`` set, Greek letters are spelled out and hyphenated or
+    slashed compounds are split, so "ACE-inhibitor" matches "ACE inhibitor"
+    and "β-blocker" matches "beta blocker".
+    """
+
+    def __init__(self, medical: bool = False):
+        self.medical = medical
+        self._pattern = MEDICAL_TOKEN if medical else TOKEN
+
+    def tokens(self, text: str) -> List[str]:
+        if not text:
+            return []
+        lowered = text.lower()
+        if len(lowered) != len(text) or "Σ" in text:
+            # Some case mappings change the text length, which can move word
+            # boundaries, and capital sigma lowers by position in the word:
+            # split first so terms match lower-casing each token
+            terms = [t.lower() for t in self._pattern.findall(text)]
+            if self.medical:
+                terms = [t.translate(GREEK) for t in terms]
+            return terms
+        if self.medical:
+            lowered = lowered.translate(GREEK)
+        return self._pattern.findall(lowered)
+
+    def spans(self, text: str) -> List[Tuple[int, int]]:
+        """Character ranges of the terms of ``text``, in order."""
+        return [m.span() for m in self._pattern.finditer(text)]
+
+    def ids(self, text: str, vocab: Vocabulary) -> array:
+        """Term ids of ``text``, adding unseen terms to ``vocab``."""
+        return array("i", map(vocab.__getitem__, self.tokens(text)))
+
+    def term_ids(self, text: str, vocab: TermLookup) -> List[int]:
+        """Ids of the terms of ``text`` found in ``vocab``, repeats included."""
+        get = vocab.get
+        return [tid for tid in (get(t, -1) for t in self.tokens(text)) if tid >= 0]
+
+    def to_params(self) -> Dict[str, Any]:
+        return {"medical": self.medical}
+
+    @staticmethod
+    def from_params(params: Optional[Dict[str, Any]]) -> "Tokenizer":
+        return Tokenizer(medical=bool((params or {}).get("medical", False)))
+
+
+DEFAULT_TOKENIZER = Tokenizer()
+
+
+def tokenize(text: str) -> List[str]:
+    return DEFAULT_TOKENIZER.tokens(text)
@@ -1 +1 @@
-__all__ = ["dates", "evidence"]
+__all__ = ["dates", "evidence", "manifest", "metrics"]
@@ -1,9 +1,54 @@
 from __future__ import annotations
 
+import re
+from datetime import date
+from functools import lru_cache
 from typing import Optional
 
 from dateutil import parser as date_parser  # type: ignore[import-untyped]
 
+MONTHS = {
+    "jan": 1,
+    "january": 1,
+    "feb": 2,
+    "february": 2,
+    "mar": 3,
+    "march": 3,
+    "apr": 4,
+    "april": 4,
+    "may": 5,
+    "jun": 6,
+    "june": 6,
+    "jul": 7,
+    "july": 7,
+    "aug": 8,
+    "august": 8,
+    "sep": 9,
+    "sept": 9,
+    "september": 9,
+    "oct": 10,
+    "october": 10,
+    "nov": 11,
+    "november": 11,
+    "dec": 12,
+    "december": 12,
+}
+_MONTH = "(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + ")"
+
+# Fast paths: strings that are exactly one of these formats parse to the same
+# date dateutil would produce, without the fuzzy tokenizer.
+ISO_DATE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?"
+)
+MONTH_DAY_YEAR = re.compile(_MONTH + r"\s+(\d{1,2}),?\s+(\d{4})", re.IGNORECASE)
+DAY_MONTH_YEAR = re.compile(r"(\d{1,2})\s+" + _MONTH + r",?\s+(\d{4})", re.IGNORECASE)
+
+NON_DATE_WORDS = ("width", "height", "scale", "device", "viewport", "charset")
+
+# Distinct strings remembered by the dateutil fallback
+FUZZY_CACHE_SIZE = 4096
+
 
 def parse_date(text: str) -> Optional[str]:
     if not text:
@@ -18,12 +63,37 @@ def parse_date(text: str) -> Optional[str]:
         return None
 
     # Skip strings that are clearly not dates
-    if any(
-        word in text.lower()
-        for word in ["width", "height", "scale", "device", "viewport", "charset"]
-    ):
+    lowered = text.lower()
+    if any(word in lowered for word in NON_DATE_WORDS):
         return None
 
+    key = " ".join(text.split())
+    m = ISO_DATE.fullmatch(key)
+    if m:
+        return _checked(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    m = MONTH_DAY_YEAR.fullmatch(key)
+    if m:
+        month = MONTHS[m.group(1).lower()]
+        return _checked(int(m.group(3)), month, int(m.group(2)))
+    m = DAY_MONTH_YEAR.fullmatch(key)
+    if m:
+        month = MONTHS[m.group(2).lower()]
+        return _checked(int(m.group(3)), month, int(m.group(1)))
+    return _parse_fuzzy(key)
+
+
+def _checked(year: int, month: int, day: int) -> Optional[str]:
+    # Same validation as the dateutil path: a real calendar day in range
+    if year < 1900 or year > 2030:
+        return None
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=FUZZY_CACHE_SIZE)
+def _parse_fuzzy(text: str) -> Optional[str]:
     try:
         dt = date_parser.parse(text, fuzzy=True, default=None)
         if dt:
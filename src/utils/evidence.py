@@ -1,35 +1,275 @@
 from __future__ import annotations
 
 import re
-from typing import Optional, Tuple
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
 
-CLASS_PATTERN = re.compile(r"\bClass\s+(I{1,3}|IIa|IIb|III)\b", re.IGNORECASE)
-LEVEL_PATTERN = re.compile(r"\b(Level|Evidence)\s+(A|B|C)\b", re.IGNORECASE)
+AHA = "AHA/ACC"
+GRADE = "GRADE"
+USPSTF = "USPSTF"
+NICE = "NICE"
+
+# Every grading vocabulary in one alternation, so a document is scanned once.
+# Keywords are case-insensitive, and so are AHA/ACC classes and levels after
+# "Class", "COR", "Level" or "LOE". After a bare "Evidence" and "Grade" the
+# letter must be upper case, so that prose such as "evidence a clinician..."
+# does not match.
+EVIDENCE_PATTERN = re.compile(
+    r"(?:"
+    # AHA/ACC class of recommendation: "Class IIa", "COR: I", "class iib"
+    r"(?i:\b(?:Class|COR)[:\s]+(?P<aha_class>IIa|IIb|III|II|I)\b)"
+    # AHA/ACC level of evidence: "Level A", "Level of Evidence: B-R", "LOE c-ld"
+    r"|(?i:\b(?:Level(?:\s+of\s+Evidence)?|LOE)[:\s]+"
+    r"(?P<aha_level>B-NR|B-R|C-LD|C-EO|A|B|C)\b)"
+    r"|(?i:\bEvidence[:\s]+)(?P<aha_level2>B-NR|B-R|C-LD|C-EO|A|B|C)\b"
+    # NICE/SIGN evidence levels: "Level of evidence: 1++", "evidence level 2-"
+    r"|(?i:\b(?:Level\s+of\s+evidence|Evidence\s+level|LoE)[:\s]+)"
+    r"(?P<nice_level>1\+\+|1\+|1-|2\+\+|2\+|2-|3|4)(?![\w+-])"
+    r"|(?P<nice_gpp>\[GPP\]|(?i:\bgood\s+practice\s+point\b))"
+    # GRADE certainty: "moderate-quality evidence", "certainty of evidence: low";
+    # without "evidence", "high quality care" is prose
+    r"|(?i:\b(?P<grade_quality>very\s+low|high|moderate|low)[\s-]+"
+    r"(?:quality|certainty)\s+(?:of\s+)?(?:the\s+)?evidence\b)"
+    r"|(?i:\b(?:quality|certainty)\s+of\s+(?:the\s+)?evidence[:\s]+"
+    r"(?P<grade_quality2>very\s+low|high|moderate|low)\b)"
+    # GRADE strength: "strong recommendation", "recommendation: conditional"
+    r"|(?i:\b(?P<grade_strength>strong|weak|conditional)\s+recommendation\b)"
+    r"|(?i:\brecommendation[:\s]+(?P<grade_strength2>strong|weak|conditional)\b)"
+    # USPSTF letter grades: "USPSTF Grade B", "USPSTF grade: I". A bare
+    # "Grade B" only counts in texts that mention the USPSTF ("Grade I
+    # astrocytoma" is a tumour grade)
+    r"|(?i:\bUSPSTF\s+Grade[:\s]+)(?P<uspstf>A|B|C|D|I)\b(?![-+])"
+    r"|(?i:\bGrade[:\s]+)(?P<uspstf_bare>A|B|C|D|I)\b(?![-+])"
+    r")"
+)
+
+# Every EVIDENCE_PATTERN match starts with one of these (lower-cased). A plain
+# literal alternation lets the regex engine skip ahead to candidate positions
+# instead of trying every branch at every character.
+TRIGGER_PATTERN = re.compile(
+    r"\[gpp\]|class|cor|level|loe|evidence|good|very|high|moderate|low|quality"
+    r"|certainty|strong|weak|conditional|recommendation|uspstf|grade"
+)
+
+USPSTF_MENTION = re.compile(
+    r"\bUSPSTF\b|\bPreventive\s+Services\s+Task\s+Force\b", re.IGNORECASE
+)
+
+# Mentions at most this far apart are read as one recommendation
+PAIR_WINDOW = 80
+
+_KINDS = {
+    "aha_class": (AHA, "class"),
+    "aha_level": (AHA, "level"),
+    "aha_level2": (AHA, "level"),
+    "nice_level": (NICE, "level"),
+    "nice_gpp": (NICE, "class"),
+    "grade_quality": (GRADE, "level"),
+    "grade_quality2": (GRADE, "level"),
+    "grade_strength": (GRADE, "class"),
+    "grade_strength2": (GRADE, "class"),
+    "uspstf": (USPSTF, "level"),
+    "uspstf_bare": (USPSTF, "level"),
+}
+
+
+@dataclass
+class EvidenceMatch:
+    """One grading term found in a text, with canonical ``value``.
+
+    ``kind`` is ``"class"`` for recommendation strength (AHA class, GRADE
+    strong/weak, NICE good practice point) and ``"level"`` for the evidence
+    grade (AHA level, GRADE certainty, USPSTF grade, NICE evidence level).
+    """
+
+    system: str
+    kind: str
+    value: str
+    start: int
+    end: int
+
+
+@dataclass
+class Recommendation:
+    """A graded recommendation: a strength and/or an evidence level."""
+
+    system: str
+    strength: Optional[str]
+    level: Optional[str]
+    start: int
+    end: int
+
+
+def scan_evidence(text: str) -> List[EvidenceMatch]:
+    """Return every grading term in ``text`` in a single left-to-right pass.
+
+    Bare "Grade X" letters are kept only if ``text`` mentions the USPSTF.
+    """
+    matches: List[EvidenceMatch] = []
+    if not text:
+        return matches
+    lowered = text.lower()
+    found: Iterable[re.Match[str]]
+    if len(lowered) == len(text):
+        found = _triggered_matches(text, lowered)
+    else:
+        # Lower-casing changed offsets (rare non-ASCII case mappings)
+        found = EVIDENCE_PATTERN.finditer(text)
+    uspstf: Optional[bool] = None
+    for m in found:
+        group = m.lastgroup
+        if group is None:
+            continue
+        if group == "uspstf_bare":
+            if uspstf is None:
+                uspstf = USPSTF_MENTION.search(text) is not None
+            if not uspstf:
+                continue
+        system, kind = _KINDS[group]
+        matches.append(
+            EvidenceMatch(
+                system, kind, _canonical(group, m.group(group)), m.start(), m.end()
+            )
+        )
+    return matches
+
+
+def _triggered_matches(text: str, lowered: str) -> Iterator[re.Match[str]]:
+    """Same matches as ``EVIDENCE_PATTERN.finditer(text)``, tried only where a
+    trigger word occurs."""
+    search = TRIGGER_PATTERN.search
+    match = EVIDENCE_PATTERN.match
+    pos = 0
+    while True:
+        t = search(lowered, pos)
+        if t is None:
+            return
+        m = match(text, t.start())
+        if m is None:
+            pos = t.start() + 1
+        else:
+            yield m
+            pos = m.end()
+
+
+def extract_recommendations(text: str) -> List[Recommendation]:
+    """Return every recommendation in ``text`` with its character offsets.
+
+    A strength and a level from the same grading system within
+    ``PAIR_WINDOW`` characters of each other ("Class I, Level A", "strong
+    recommendation, moderate-quality evidence") form one recommendation.
+    """
+    recs: List[Recommendation] = []
+    open_rec: Optional[Recommendation] = None
+    for m in scan_evidence(text):
+        if (
+            open_rec is not None
+            and open_rec.system == m.system
+            and m.start - open_rec.end <= PAIR_WINDOW
+        ):
+            if m.kind == "class" and open_rec.strength is None:
+                open_rec.strength = m.value
+                open_rec.end = m.end
+                open_rec = None
+                continue
+            if m.kind == "level" and open_rec.level is None:
+                open_rec.level = m.value
+                open_rec.end = m.end
+                open_rec = None
+                continue
+        rec = Recommendation(
+            system=m.system,
+            strength=m.value if m.kind == "class" else None,
+            level=m.value if m.kind == "level" else None,
+            start=m.start,
+            end=m.end,
+        )
+        recs.append(rec)
+        open_rec = rec
+    return recs
+
+
+def summarize_evidence(
+    matches: List[EvidenceMatch],
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Collapse matches into the ``(grade, system, notes)`` stored per section.
+
+    The first system found (in AHA/ACC, GRADE, USPSTF, NICE order) wins; its
+    first level is the canonical grade, falling back to its first class.
+    """
+    for system in (AHA, GRADE, USPSTF, NICE):
+        cls = lvl = None
+        for m in matches:
+            if m.system != system:
+                continue
+            if m.kind == "class" and cls is None:
+                cls = m.value
+            elif m.kind == "level" and lvl is None:
+                lvl = m.value
+        if cls is None and lvl is None:
+            continue
+        notes = None
+        if system == AHA:
+            # Sections keep the letter grade; "B-R" etc. stay in the notes
+            grade = lvl.split("-")[0] if lvl else cls
+            if cls and lvl:
+                notes = f"Class {cls}, Level {lvl}"
+        else:
+            grade = lvl or cls
+            if cls and lvl:
+                notes = f"{cls}, {lvl}"
+        return grade, system, notes
+    return None, None, None
 
 
 def extract_evidence(text: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
     if not text:
         return None, None, None
-    cls = None
-    lvl = None
+    return summarize_evidence(scan_evidence(text))
+
+
+class DocumentEvidence:
+    """Evidence matches of a whole document text, looked up by character range.
 
-    cls_m = CLASS_PATTERN.search(text)
-    if cls_m:
-        cls = cls_m.group(1)  # Keep original case for Roman numerals
+    Parsers scan the concatenated body text once and then ask for the summary
+    of each section's slice, instead of re-scanning every section (nested HTML
+    sections would otherwise be scanned once per enclosing section).
+    """
 
-    lvl_m = LEVEL_PATTERN.search(text)
-    if lvl_m:
-        lvl = lvl_m.group(2).upper()  # Uppercase for A, B, C
+    def __init__(self, text: str):
+        self.matches = scan_evidence(text)
+        self._starts = [m.start for m in self.matches]
 
-    # Canonical grade preference: Level first if present, else Class
-    canonical = lvl or cls
+    def in_range(self, start: int, end: int) -> List[EvidenceMatch]:
+        out: List[EvidenceMatch] = []
+        for i in range(bisect_left(self._starts, start), len(self.matches)):
+            m = self.matches[i]
+            if m.start >= end:
+                break
+            if m.end <= end:
+                out.append(m)
+        return out
 
-    system = None
-    if cls or lvl:
-        system = "AHA/ACC or GRADE (heuristic)"
+    def summary(
+        self, start: int, end: int
+    ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        return summarize_evidence(self.in_range(start, end))
 
-    notes = None
-    if cls and lvl:
-        notes = f"Class {cls}, Level {lvl}"
 
-    return canonical, system, notes
+def _canonical(group: str, value: str) -> str:
+    if group == "aha_class":
+        # "iia" -> "IIa": numeral upper case, letter suffix lower case
+        if value[-1] in "abAB":
+            return value[:-1].upper() + value[-1].lower()
+        return value.upper()
+    if group in ("aha_level", "aha_level2"):
+        return value.upper()
+    if group in ("grade_quality", "grade_quality2"):
+        return " ".join(value.split()).capitalize()
+    if group in ("grade_strength", "grade_strength2"):
+        # GRADE treats "conditional" and "weak" as the same strength
+        return "Weak" if value.lower() == "conditional" else value.capitalize()
+    if group == "nice_gpp":
+        return "GPP"
+    return value
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MANIFEST_NAME = "guidelines.manifest.json"
+# 2: records carry their manifest key as ``id``; older records are re-parsed
+MANIFEST_VERSION = 2
+
+
+@dataclass
+class FileEntry:
+    """Fingerprint of one input file and the location of its output record."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    offset: int = 0
+    length: int = 0
+
+
+@dataclass
+class Manifest:
+    source: Optional[str] = None
+    files: Dict[str, FileEntry] = field(default_factory=dict)
+    pdf_layout: bool = False
+
+    @staticmethod
+    def load(path: Path) -> "Manifest":
+        """Load a manifest, returning an empty one if missing or unreadable."""
+        try:
+            obj = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return Manifest()
+        if not isinstance(obj, dict) or obj.get("version") != MANIFEST_VERSION:
+            return Manifest()
+        files = {e["path"]: FileEntry(**e) for e in obj.get("files", [])}
+        return Manifest(
+            source=obj.get("source"),
+            files=files,
+            pdf_layout=bool(obj.get("pdf_layout", False)),
+        )
+
+    def save(self, path: Path) -> None:
+        payload = {
+            "version": MANIFEST_VERSION,
+            "source": self.source,
+            "pdf_layout": self.pdf_layout,
+            "files": [asdict(e) for e in self.files.values()],
+        }
+        tmp = Path(str(path) + ".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+@dataclass
+class IngestPlan:
+    unchanged: List[Tuple[Path, FileEntry]] = field(default_factory=list)
+    changed: List[Path] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+
+def manifest_key(path: Path, root: Path) -> str:
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(path: Path, root: Path, sha256: Optional[str] = None) -> FileEntry:
+    st = path.stat()
+    return FileEntry(
+        path=manifest_key(path, root),
+        size=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        sha256=sha256 if sha256 is not None else hash_file(path),
+    )
+
+
+def plan_ingest(previous: Manifest, files: Iterable[Path], root: Path) -> IngestPlan:
+    """Split ``files`` into unchanged, changed/new and removed relative to
+    ``previous``.
+
+    Size and mtime are checked first; the content hash is only computed when
+    they differ, so files that were merely touched are still reused.
+    """
+    plan = IngestPlan()
+    seen = set()
+    for f in files:
+        seen.add(manifest_key(f, root))
+        old = reusable_entry(previous, f, root)
+        if old is None:
+            plan.changed.append(f)
+        else:
+            plan.unchanged.append((f, old))
+    plan.removed = [k for k in previous.files if k not in seen]
+    return plan
+
+
+def reusable_entry(previous: Manifest, f: Path, root: Path) -> Optional[FileEntry]:
+    """The entry of ``previous`` whose record can be reused for ``f``, if any."""
+    old = previous.files.get(manifest_key(f, root))
+    if old is None:
+        return None
+    st = f.stat()
+    if st.st_size == old.size and st.st_mtime_ns == old.mtime_ns:
+        return old
+    if st.st_size == old.size and hash_file(f) == old.sha256:
+        # Touched but identical: keep the record, remember the new mtime
+        old.mtime_ns = st.st_mtime_ns
+        return old
+    return None
@@ -0,0 +1,206 @@
+"""Per-stage timing of the ingest pipeline.
+
+Parsers mark their stages with ``with stage("extract"):``. Unless a
+``StageTimer`` is active in the current thread (``clinical-ingest
+--metrics-out``) a mark is a shared no-op context manager. Time is exclusive:
+a nested stage pauses the enclosing one, so the stages of a file add up to the
+time spent on it. ``IngestMetrics`` aggregates the per-file timings of a run
+into percentiles, histograms and a list of the slowest files.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import heapq
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+# In pipeline order; "other" is time on a file outside any marked stage
+STAGES = (
+    "read",
+    "extract",
+    "metadata",
+    "sections",
+    "evidence",
+    "serialize",
+    "write",
+    "fingerprint",
+    "other",
+)
+# Upper bounds (ms) of the histogram buckets; a last bucket takes the rest
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+METRICS_VERSION = 1
+
+_local = threading.local()
+_NO_STAGE: ContextManager[None] = contextlib.nullcontext()
+
+
+class StageTimer:
+    """Collects exclusive wall time per stage while active (``with timer:``)."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.times: Dict[str, float] = {}
+        self._clock = clock
+        self._stack: List[str] = []
+        self._mark = 0.0
+        self._previous: Optional[StageTimer] = None
+
+    def __enter__(self) -> "StageTimer":
+        self._previous = getattr(_local, "timer", None)
+        _local.timer = self
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        _local.timer = self._previous
+
+    def _charge(self) -> None:
+        # Time since the last switch goes to the innermost open stage
+        now = self._clock()
+        if self._stack:
+            name = self._stack[-1]
+            self.times[name] = self.times.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._charge()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._charge()
+            self._stack.pop()
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Mark a pipeline stage for the timer active in this thread, if any."""
+    timer: Optional[StageTimer] = getattr(_local, "timer", None)
+    if timer is None:
+        return _NO_STAGE
+    return timer.stage(name)
+
+
+def _order(name: str) -> Tuple[int, str]:
+    return (STAGES.index(name) if name in STAGES else len(STAGES), name)
+
+
+def _percentile(ordered: List[float], p: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+
+def _histogram(values_ms: List[float]) -> Dict[str, int]:
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for v in values_ms:
+        for i, bound in enumerate(BUCKETS_MS):
+            if v <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<={b:g}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]:g}"]
+    return dict(zip(labels, counts))
+
+
+class IngestMetrics:
+    """Per-stage timings of every file in an ingest run.
+
+    ``record`` takes the stage seconds of one file; the ``slowest`` files by
+    total time are kept with their breakdown, size and error.
+    """
+
+    def __init__(self, slowest: int = 20):
+        self.slowest = slowest
+        self.started = time.perf_counter()
+        self.wall_seconds: Optional[float] = None
+        self.files = 0
+        self.failed = 0
+        self.reused = 0
+        self._stages: Dict[str, List[float]] = {}
+        self._types: Dict[str, List[Tuple[float, int]]] = {}
+        self._top: List[Tuple[float, int, Dict[str, Any]]] = []
+
+    def record(
+        self,
+        path: str,
+        timings: Dict[str, float],
+        size: int = 0,
+        error: Optional[str] = None,
+    ) -> None:
+        self.files += 1
+        if error is not None:
+            self.failed += 1
+        for name, seconds in timings.items():
+            self._stages.setdefault(name, []).append(seconds * 1000)
+        total = sum(timings.values())
+        suffix = os.path.splitext(path)[1].lower()
+        self._types.setdefault(suffix, []).append((total * 1000, size))
+        entry = {
+            "path": path,
+            "bytes": size,
+            "total_ms": round(total * 1000, 3),
+            "stages_ms": {
+                n: round(timings[n] * 1000, 3) for n in sorted(timings, key=_order)
+            },
+            "error": error,
+        }
+        item = (total, self.files, entry)
+        if len(self._top) < self.slowest:
+            heapq.heappush(self._top, item)
+        elif total > self._top[0][0]:
+            heapq.heapreplace(self._top, item)
+
+    def finish(self) -> None:
+        self.wall_seconds = time.perf_counter() - self.started
+
+    def slowest_files(self) -> List[Dict[str, Any]]:
+        return [entry for _, _, entry in sorted(self._top, reverse=True)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        grand_total = sum(sum(v) for v in self._stages.values())
+        stages = {}
+        for name in sorted(self._stages, key=_order):
+            values = sorted(self._stages[name])
+            total = sum(values)
+            stages[name] = {
+                "files": len(values),
+                "total_s": round(total / 1000, 6),
+                "share": round(total / grand_total, 4) if grand_total else None,
+                "mean_ms": round(total / len(values), 3),
+                "p50_ms": _percentile(values, 0.50),
+                "p90_ms": _percentile(values, 0.90),
+                "p99_ms": _percentile(values, 0.99),
+                "max_ms": round(values[-1], 3),
+                "histogram_ms": _histogram(values),
+            }
+        by_type = {}
+        for suffix, items in sorted(self._types.items()):
+            totals = sorted(t for t, _ in items)
+            by_type[suffix] = {
+                "files": len(items),
+                "bytes": sum(size for _, size in items),
+                "total_s": round(sum(totals) / 1000, 6),
+                "p50_ms": _percentile(totals, 0.50),
+                "p99_ms": _percentile(totals, 0.99),
+                "max_ms": round(totals[-1], 3),
+            }
+        return {
+            "version": METRICS_VERSION,
+            "files": self.files,
+            "failed": self.failed,
+            "reused": self.reused,
+            "wall_seconds": (
+                round(self.wall_seconds, 6) if self.wall_seconds is not None else None
+            ),
+            "stages": stages,
+            "by_type": by_type,
+            "slowest": self.slowest_files(),
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
@@ -0,0 +1,437 @@
+"""Tests for the ingest CLI helpers."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from src.cli.ingest import find_files, iter_parsed
+
+HTML_TEMPLATE = """<html><head><title>{title}</title></head><body>
+<h2>Recommendations</h2>
+<p>{body} Class I, Level A.</p>
+</body></html>
+"""
+
+
+def _write_corpus(folder: Path, n: int) -> None:
+    for i in range(n):
+        html = HTML_TEMPLATE.format(title=f"Guideline {i}", body=f"Body text {i}.")
+        (folder / f"g{i:02d}.html").write_text(html, encoding="utf-8")
+
+
+class TestParallelIngest:
+    """Test sequential and process-pool parsing."""
+
+    def test_ordered_pool_matches_sequential(self, tmp_path):
+        """Test that ordered pool output is identical to a sequential run."""
+        _write_corpus(tmp_path, 6)
+        files = sorted(find_files(str(tmp_path)))
+
+        sequential = [line for _, line, _ in iter_parsed(files)]
+        pooled = [
+            line
+            for _, line, _ in iter_parsed(
+                files, workers=2, ordered=True, max_in_flight=2
+            )
+        ]
+
+        assert pooled == sequential
+        titles = [json.loads(line)["title"] for line in pooled]
+        assert titles == [f"Guideline {i}" for i in range(6)]
+
+    def test_unordered_pool_reports_failures(self, tmp_path):
+        """Test that a failing file is reported without stopping the run."""
+        _write_corpus(tmp_path, 3)
+        files = sorted(find_files(str(tmp_path)))
+        files.append(tmp_path / "missing.pdf")
+
+        results = list(iter_parsed(files, workers=2))
+
+        assert len(results) == 4
+        failures = [(f, err) for f, line, err in results if line is None]
+        assert [f for f, _ in failures] == [tmp_path / "missing.pdf"]
+        assert failures[0][1]
+
+
+def _run_ingest(monkeypatch, capsys, *argv):
+    from src.cli.ingest import main
+
+    monkeypatch.setattr("sys.argv", ["clinical-ingest", *argv])
+    main()
+    return capsys.readouterr().out
+
+
+class TestIncrementalIngest:
+    """Test manifest-driven incremental re-ingestion."""
+
+    def test_rerun_parses_only_delta(self, tmp_path, monkeypatch, capsys):
+        """Test that unchanged files are reused and deleted files dropped."""
+        src_dir = tmp_path / "in"
+        out_dir = tmp_path / "out"
+        src_dir.mkdir()
+        _write_corpus(src_dir, 3)
+        args = ("--input", str(src_dir), "--output", str(out_dir), "--incremental")
+
+        _run_ingest(monkeypatch, capsys, *args)
+
+        (src_dir / "g00.html").unlink()
+        (src_dir / "g01.html").write_text(
+            HTML_TEMPLATE.format(title="Revised", body="New."), encoding="utf-8"
+        )
+        (src_dir / "g02.html").touch()
+        out = _run_ingest(monkeypatch, capsys, *args)
+
+        assert "Reused 1, parsed 1, removed 1" in out
+        lines = (out_dir / "guidelines.jsonl").read_text(encoding="utf-8").splitlines()
+        assert sorted(json.loads(line)["title"] for line in lines) == [
+            "Guideline 2",
+            "Revised",
+        ]
+
+        from src.utils.manifest import MANIFEST_NAME, Manifest
+
+        manifest = Manifest.load(out_dir / MANIFEST_NAME)
+        assert sorted(manifest.files) == ["g01.html", "g02.html"]
+        raw = (out_dir / "guidelines.jsonl").read_bytes()
+        for entry in manifest.files.values():
+            record = json.loads(raw[entry.offset : entry.offset + entry.length])
+            assert record["title"] in {"Guideline 2", "Revised"}
+            assert record["id"] == entry.path
+
+    def test_changing_pdf_layout_reparses_all(self, tmp_path, monkeypatch, capsys):
+        """Test that records from another PDF extraction mode are not reused."""
+        src_dir = tmp_path / "in"
+        out_dir = tmp_path / "out"
+        src_dir.mkdir()
+        _write_corpus(src_dir, 2)
+        args = ("--input", str(src_dir), "--output", str(out_dir), "--incremental")
+
+        _run_ingest(monkeypatch, capsys, *args)
+        out = _run_ingest(monkeypatch, capsys, *args, "--pdf-layout")
+        assert "Reused 0, parsed 2, removed 0" in out
+        out = _run_ingest(monkeypatch, capsys, *args, "--pdf-layout")
+        assert "Reused 2, parsed 0, removed 0" in out
+
+
+class TestAsyncIngest:
+    """Test the asyncio pipeline behind --async."""
+
+    def test_matches_sequential_run(self, tmp_path, monkeypatch, capsys):
+        """Test records, manifest and discovery order against the default path."""
+        src_dir = tmp_path / "in"
+        (src_dir / "b" / "c").mkdir(parents=True)
+        _write_corpus(src_dir, 2)
+        _write_corpus(src_dir / "b", 3)
+        _write_corpus(src_dir / "b" / "c", 1)
+        (src_dir / "b" / "broken.pdf").write_bytes(b"not a pdf")
+        base = ("--input", str(src_dir), "--ordered")
+
+        _run_ingest(monkeypatch, capsys, *base, "--output", str(tmp_path / "sync"))
+        out = _run_ingest(
+            monkeypatch,
+            capsys,
+            *base,
+            *("--output", str(tmp_path / "async"), "--async"),
+            *("--readers", "2", "--max-in-flight", "2"),
+        )
+        assert "Failed to parse" in out and "broken.pdf" in out
+        assert "Wrote 6 records" in out
+
+        def load(name):
+            path = tmp_path / name / "guidelines.jsonl"
+            return path.read_bytes().splitlines(keepends=True)
+
+        lines = load("async")
+        assert sorted(lines) == sorted(load("sync"))
+        manifest = json.loads(
+            (tmp_path / "async" / "guidelines.manifest.json").read_text()
+        )
+        keys = [entry["path"] for entry in manifest["files"]]
+        # Depth-first walk in name order
+        assert keys == [
+            "g00.html",
+            "g01.html",
+            "b/g00.html",
+            "b/g01.html",
+            "b/g02.html",
+            "b/c/g00.html",
+        ]
+        data = (tmp_path / "async" / "guidelines.jsonl").read_bytes()
+        for entry, line in zip(manifest["files"], lines):
+            assert data[entry["offset"] : entry["offset"] + entry["length"]] == line
+
+    def test_incremental_rerun(self, tmp_path, monkeypatch, capsys):
+        """Test that --async --incremental reuses, re-parses and drops records."""
+        src_dir = tmp_path / "in"
+        out_dir = tmp_path / "out"
+        src_dir.mkdir()
+        _write_corpus(src_dir, 3)
+        args = ("--input", str(src_dir), "--output", str(out_dir))
+        args += ("--incremental", "--async", "--workers", "2")
+
+        out = _run_ingest(monkeypatch, capsys, *args)
+        assert "Reused 0, parsed 3, removed 0" in out
+
+        (src_dir / "g00.html").unlink()
+        (src_dir / "g01.html").write_text(
+            HTML_TEMPLATE.format(title="Revised", body="New."), encoding="utf-8"
+        )
+        out = _run_ingest(monkeypatch, capsys, *args)
+        assert "Reused 1, parsed 1, removed 1" in out
+
+        lines = (out_dir / "guidelines.jsonl").read_text(encoding="utf-8")
+        titles = sorted(json.loads(line)["title"] for line in lines.splitlines())
+        assert titles == ["Guideline 2", "Revised"]
+
+    def test_table_format_rejected(self, tmp_path, monkeypatch, capsys):
+        """Test that --async is rejected for table output."""
+        with pytest.raises(SystemExit):
+            _run_ingest(
+                monkeypatch,
+                capsys,
+                *("--input", str(tmp_path), "--output", str(tmp_path / "out")),
+                *("--format", "parquet", "--async"),
+            )
+
+
+class TestColumnarIngest:
+    """Test Parquet / Arrow section table output."""
+
+    @pytest.mark.parametrize(
+        "fmt,name", [("parquet", "guidelines.parquet"), ("arrow", "guidelines.arrows")]
+    )
+    def test_table_matches_jsonl(self, tmp_path, monkeypatch, capsys, fmt, name):
+        """Test one row per section and search parity with the JSONL corpus."""
+        pa = pytest.importorskip("pyarrow")
+        from src.guidelines.columnar import read_sections
+        from src.search.bm25_index import BM25SectionIndex
+
+        src_dir = tmp_path / "in"
+        src_dir.mkdir()
+        _write_corpus(src_dir, 4)
+        base = ("--input", str(src_dir), "--source", "NICE", "--ordered")
+        _run_ingest(monkeypatch, capsys, *base, "--output", str(tmp_path / "jsonl"))
+        out = _run_ingest(
+            monkeypatch, capsys, *base, "--output", str(tmp_path / fmt), "--format", fmt
+        )
+        assert "Wrote 4 records (4 rows)" in out
+
+        path = str(tmp_path / fmt / name)
+        table = read_sections(path)
+        assert table.num_rows == 4
+        assert pa.types.is_dictionary(table.schema.field("source").type)
+        assert pa.types.is_dictionary(table.schema.field("title").type)
+        assert table.column("source").to_pylist() == ["NICE"] * 4
+        assert table.column("evidence_grade").to_pylist() == ["A"] * 4
+
+        jsonl = BM25SectionIndex.from_jsonl(
+            str(tmp_path / "jsonl" / "guidelines.jsonl")
+        )
+        columnar = BM25SectionIndex.from_table(path)
+        assert columnar.search("body text 2", k=3) == jsonl.search("body text 2", k=3)
+        assert list(columnar.iter_texts()) == list(jsonl.iter_texts())
+
+    def test_writer_row_groups_and_empty_documents(self, tmp_path):
+        """Test row-group flushing and the null row of a section-less record."""
+        pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        from src.guidelines.columnar import SectionTableWriter, read_sections
+
+        path = str(tmp_path / "sections.parquet")
+        section = {"heading": "H", "level": 2, "text": "Body", "evidence": None}
+        with SectionTableWriter(path, row_group_rows=3) as writer:
+            for i in range(4):
+                writer.add({"id": f"d{i}", "title": "T", "sections": [section] * 2})
+            writer.add({"id": "empty", "title": "T", "sections": []})
+        assert (writer.documents, writer.rows) == (5, 9)
+        assert pq.ParquetFile(path).metadata.num_row_groups == 3
+
+        table = read_sections(path, ["doc_id", "section_index", "text"])
+        assert table.column_names == ["doc_id", "section_index", "text"]
+        assert table.column("section_index").to_pylist()[-3:] == [0, 1, None]
+        assert table.column("text").to_pylist()[-1] is None
+
+    def test_incremental_needs_jsonl(self, tmp_path, monkeypatch, capsys):
+        """Test that --incremental is rejected for table output."""
+        with pytest.raises(SystemExit):
+            _run_ingest(
+                monkeypatch,
+                capsys,
+                *("--input", str(tmp_path), "--output", str(tmp_path / "out")),
+                *("--format", "parquet", "--incremental"),
+            )
+
+
+class TestIngestMetrics:
+    """Test per-stage timing and the --metrics-out / --profile options."""
+
+    def test_stage_time_is_exclusive(self):
+        """Test that a nested stage pauses the one around it."""
+        from src.utils.metrics import StageTimer, stage
+
+        ticks = iter([0.0, 1.0, 3.0, 6.0])
+        with StageTimer(clock=lambda: next(ticks)) as timer:
+            with stage("extract"):
+                with stage("evidence"):
+                    pass
+        assert timer.times == {"extract": 4.0, "evidence": 2.0}
+        # Without an active timer stages are no-ops
+        with stage("extract"):
+            pass
+        assert timer.times == {"extract": 4.0, "evidence": 2.0}
+
+    def test_metrics_and_profile_files(self, tmp_path, monkeypatch, capsys):
+        """Test the metrics JSON, slowest-file report and profile dump."""
+        import pstats
+
+        src_dir = tmp_path / "in"
+        src_dir.mkdir()
+        _write_corpus(src_dir, 3)
+        (src_dir / "broken.pdf").write_bytes(b"not a pdf")
+        metrics_path = tmp_path / "metrics.json"
+        profile_path = tmp_path / "ingest.prof"
+
+        out = _run_ingest(
+            monkeypatch,
+            capsys,
+            *("--input", str(src_dir), "--output", str(tmp_path / "out")),
+            *("--metrics-out", str(metrics_path), "--profile", str(profile_path)),
+            *("--slowest", "2"),
+        )
+        assert "Slowest files:" in out
+
+        metrics = json.loads(metrics_path.read_text(encoding="utf-8"))
+        assert (metrics["files"], metrics["failed"]) == (4, 1)
+        for name in ("read", "extract", "metadata", "sections", "evidence"):
+            assert metrics["stages"][name]["files"] >= 3
+        for name in ("serialize", "write"):
+            assert metrics["stages"][name]["files"] == 3
+        # Files are hashed as they are read, before parsing
+        assert metrics["stages"]["fingerprint"]["files"] == 4
+        extract = metrics["stages"]["extract"]
+        assert sum(extract["histogram_ms"].values()) == extract["files"]
+        assert metrics["by_type"][".html"]["files"] == 3
+        assert len(metrics["slowest"]) == 2
+        totals = [entry["total_ms"] for entry in metrics["slowest"]]
+        assert totals == sorted(totals, reverse=True)
+        first = metrics["slowest"][0]
+        assert first["total_ms"] == pytest.approx(
+            sum(first["stages_ms"].values()), abs=0.01
+        )
+
+        stats = pstats.Stats(str(profile_path))
+        assert any(func[2] == "parse_html" for func in stats.stats)
+
+
+class TestSerialization:
+    """Test the JSONL record encoder against model_dump() + json.dumps."""
+
+    def _documents(self):
+        from pydantic import BaseModel
+
+        from src.guidelines.models import Evidence, GuidelineDocument, GuidelineSection
+
+        class TaggedSection(GuidelineSection):
+            tags: list = []
+            weight: float = 0.5
+
+        awkward = (
+            'Quote " backslash \\ tab\t nl\n ctrl \x01 \u00e9 \u03b2 \U0001f600 \u2028'
+        )
+        sections = [
+            GuidelineSection(heading=awkward, level=2, text=awkward),
+            GuidelineSection(
+                text="Class I", evidence=Evidence(grade="A", system="AHA/ACC")
+            ),
+            TaggedSection(heading=None, text="", tags=["x", 1, None, True]),
+        ]
+        full = GuidelineDocument(
+            id="g-1",
+            title=awkward,
+            source="NICE",
+            publication_date="2024-01-02",
+            sections=sections,
+            raw_text_chars=1234,
+        )
+
+        class Other(BaseModel):
+            name: str = "other"
+            values: dict = {"k": [1.5, float("inf"), False]}
+
+        return [full, GuidelineDocument(), Other()]
+
+    def test_bytes_match_json_dumps(self):
+        """Test that every backend writes the bytes json.dumps would."""
+        import json
+
+        from src.guidelines.serialization import BACKENDS, encode_record
+
+        for value in self._documents():
+            expected = (
+                json.dumps(value.model_dump(), ensure_ascii=False) + "\n"
+            ).encode("utf-8")
+            for backend in BACKENDS:
+                assert encode_record(value, backend) == expected
+                assert encode_record(value.model_dump(), backend) == expected
+
+    def test_loads_backends(self):
+        """Test decoding with every backend and rejecting unknown ones."""
+        from src.guidelines.serialization import BACKENDS, encode_record, loads
+
+        line = encode_record(self._documents()[0])
+        decoded = [loads(line, backend) for backend in BACKENDS]
+        assert all(d == decoded[0] for d in decoded)
+        assert decoded[0]["sections"][1]["evidence"]["grade"] == "A"
+        with pytest.raises(ValueError):
+            encode_record({}, "pickle")
+        with pytest.raises(ValueError):
+            loads(line, "pickle")
+
+
+def _modules_after(code):
+    import subprocess
+    import sys
+
+    probe = (
+        f"{code}\n"
+        "import sys\n"
+        "heavy = ('fitz', 'pymupdf', 'bs4', 'lxml', 'pydantic', 'rich', 'numpy')\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    root = Path(__file__).parent.parent
+    out = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(filter(None, out.strip().split(",")))
+
+
+class TestLazyImports:
+    """Test that parser backends are imported only when needed."""
+
+    def test_cli_import_loads_no_backends(self):
+        """Test that importing the ingest CLI pulls in no heavy dependency."""
+        assert _modules_after("import src.cli.ingest") == set()
+
+    def test_html_only_run_skips_pymupdf(self, tmp_path):
+        """Test that parsing HTML never imports PyMuPDF."""
+        _write_corpus(tmp_path, 1)
+        loaded = _modules_after(
+            "from pathlib import Path\n"
+            "from src.cli.ingest import parse_file\n"
+            f"parse_file(Path({str(tmp_path / 'g00.html')!r}))"
+        )
+        assert "lxml" in loaded
+        assert not loaded & {"fitz", "pymupdf"}
+
+    def test_unsupported_suffix(self):
+        """Test that unknown suffixes still raise ValueError."""
+        from src.cli.ingest import parse_file
+
+        with pytest.raises(ValueError, match="Unsupported file type: .docx"):
+            parse_file(Path("guideline.docx"))
@@ -34,6 +34,58 @@ class TestHTMLParser:
         assert ace_section.evidence is not None
         assert ace_section.evidence.grade == "A"
 
+    def test_nested_sections(self, tmp_path):
+        """Test that a section runs until its parent closes or a sibling header starts."""
+        html = tmp_path / "nested.html"
+        html.write_text(
+            "<html><body><div><h1>Intro</h1><p>one</p>"
+            "<div><h2>Inner</h2><p>two</p></div>"
+            "<h2>Next</h2><p>three</p></div>"
+            "<h3>Outside</h3>tail</body></html>"
+        )
+
+        doc = parse_html(str(html))
+
+        assert [(s.heading, s.level) for s in doc.sections] == [
+            ("Intro", 1), ("Inner", 2), ("Next", 2), ("Outside", 3)
+        ]
+        assert doc.sections[0].text == "one\nInner\ntwo"
+        assert doc.sections[1].text == "two"
+        assert doc.sections[2].text == "three"
+        assert doc.sections[3].text == "tail"
+
+    def test_title_dates_and_scripts(self, tmp_path):
+        """Test metadata extraction and that script/style text is ignored."""
+        html = tmp_path / "meta.html"
+        html.write_text(
+            "<html><head><title> Guideline </title>"
+            '<meta name="publication-date" content="2020-01-05">'
+            "<style>h1 { color: red }</style></head><body>"
+            '<time itemprop="dateModified" datetime="2023-04-01">April</time>'
+            "<h2>Therapy</h2><script>var s = 'hidden';</script>"
+            "<p>Class I, Level of Evidence: A</p></body></html>"
+        )
+
+        doc = parse_html(str(html))
+
+        assert doc.title == "Guideline"
+        assert doc.publication_date == "2020-01-05"
+        assert doc.last_updated == "2023-04-01"
+        assert "hidden" not in doc.sections[0].text
+        assert doc.sections[0].evidence is not None
+
+    def test_no_headers_and_legacy_encoding(self, tmp_path):
+        """Test the whole-page fallback section on a Windows-1252 file."""
+        html = tmp_path / "plain.html"
+        html.write_bytes(b"<html><body><h5>caf\xe9</h5><p>r\xe9sum\xe9</p></body></html>")
+
+        doc = parse_html(str(html))
+
+        assert len(doc.sections) == 1
+        assert doc.sections[0].heading is None
+        assert doc.sections[0].text == "caf\u00e9\nr\u00e9sum\u00e9"
+        assert doc.raw_text_chars == len("caf\u00e9\nr\u00e9sum\u00e9")
+
 
 class TestPDFParser:
     """Test PDF parsing functionality."""
@@ -48,6 +100,59 @@ class TestPDFParser:
         # This would need a test PDF file to be meaningful
         pytest.skip("No test PDF available")
 
+    def test_sections_span_pages(self, tmp_path):
+        """Test that section bodies are carried across page breaks."""
+        fitz = pytest.importorskip("fitz")
+        pdf = tmp_path / "guideline.pdf"
+        doc = fitz.open()
+        pages = [
+            "Heart Failure Guideline\nPublished: May 10, 2023\n1. Therapy\nFirst line",
+            "Second line Level B evidence\n2. Monitoring\nCheck weight",
+        ]
+        for text in pages:
+            doc.new_page().insert_text((72, 72), text)
+        doc.save(str(pdf))
+        doc.close()
+
+        result = parse_pdf(str(pdf))
+
+        assert result.title == "Heart Failure Guideline"
+        assert result.publication_date == "2023-05-10"
+        assert [s.heading for s in result.sections] == [None, "1. Therapy", "2. Monitoring"]
+        assert result.sections[1].text == "First line\nSecond line Level B evidence"
+        assert result.sections[1].evidence.grade == "B"
+        assert result.raw_text_chars == len("\n".join("\n".join(pages).splitlines()))
+
+    def test_layout_mode_headings(self, tmp_path):
+        """Test font-based headings and running header/footer removal."""
+        fitz = pytest.importorskip("fitz")
+        pdf = tmp_path / "layout.pdf"
+        doc = fitz.open()
+        for i in range(3):
+            page = doc.new_page()
+            page.insert_text((36, 30), "JOURNAL OF CARDIOLOGY", fontsize=8)
+            page.insert_text((36, 820), f"Page {i + 1}", fontsize=8)
+            if i == 0:
+                page.insert_text((36, 80), "Heart Failure Update", fontsize=20, fontname="hebo")
+            page.insert_text((36, 120), f"{i + 1}. Therapy Step", fontsize=14, fontname="hebo")
+            body = ["DRUG   DOSE", "Beta blockers lower mortality."] * 10
+            page.insert_text((36, 150), "\n".join(body), fontsize=9)
+        doc.save(str(pdf))
+        doc.close()
+
+        text_mode = parse_pdf(str(pdf))
+        result = parse_pdf(str(pdf), layout=True)
+
+        assert result.title == "Heart Failure Update"
+        assert [(s.heading, s.level) for s in result.sections] == [
+            ("1. Therapy Step", 2), ("2. Therapy Step", 2), ("3. Therapy Step", 2)
+        ]
+        assert len(text_mode.sections) > len(result.sections)
+        for sec in result.sections:
+            assert "JOURNAL" not in sec.text
+            assert "Page" not in sec.text
+            assert "DRUG   DOSE" in sec.text
+
 
 class TestEvidenceExtraction:
     """Test evidence grade extraction."""
@@ -72,6 +177,70 @@ class TestEvidenceExtraction:
         assert grade == "IIa"
         assert system is not None
 
+    def test_lowercase_class_and_level(self):
+        """Test that lower-case AHA/ACC classes and levels are still found."""
+        from src.utils.evidence import extract_evidence
+
+        assert extract_evidence("level b") == ("B", "AHA/ACC", None)
+        assert extract_evidence("Level b") == ("B", "AHA/ACC", None)
+        assert extract_evidence("class i") == ("I", "AHA/ACC", None)
+        assert extract_evidence("Class i") == ("I", "AHA/ACC", None)
+        assert extract_evidence("class ii recommendation") == ("II", "AHA/ACC", None)
+        assert extract_evidence("Class i, level b") == ("B", "AHA/ACC", "Class I, Level B")
+        assert extract_evidence("COR: iib, LOE: c-ld") == (
+            "C", "AHA/ACC", "Class IIb, Level C-LD"
+        )
+        # After a bare "evidence" a lower-case letter is still prose
+        assert extract_evidence("evidence a clinician sees") == (None, None, None)
+
+    def test_prose_is_not_evidence(self):
+        """Test that certainty words and tumour grades without evidence wording are ignored."""
+        from src.utils.evidence import DocumentEvidence, extract_evidence
+
+        assert extract_evidence("high quality care is important") == (None, None, None)
+        assert extract_evidence("low certainty about timing") == (None, None, None)
+        assert extract_evidence("Grade I astrocytoma is treated surgically") == (
+            None, None, None
+        )
+        # A bare letter grade is read as USPSTF only in a USPSTF document
+        text = "USPSTF recommendation statement\nScreen adults aged 50 to 75. Grade A."
+        assert DocumentEvidence(text).summary(0, len(text)) == ("A", "USPSTF", None)
+
+    def test_recommendations_with_offsets(self):
+        """Test that every grading system is found with character offsets."""
+        from src.utils.evidence import extract_recommendations
+
+        text = (
+            "Beta-blockers are recommended (COR: I, LOE: B-R). "
+            "We suggest SGLT2 inhibitors (strong recommendation, moderate-quality evidence). "
+            "Screening is advised (USPSTF Grade B). "
+            "Offer rehabilitation (level of evidence: 1+)."
+        )
+
+        recs = extract_recommendations(text)
+
+        assert [(r.system, r.strength, r.level) for r in recs] == [
+            ("AHA/ACC", "I", "B-R"),
+            ("GRADE", "Strong", "Moderate"),
+            ("USPSTF", None, "B"),
+            ("NICE", None, "1+"),
+        ]
+        assert text[recs[0].start:recs[0].end] == "COR: I, LOE: B-R"
+        assert text[recs[2].start:recs[2].end] == "USPSTF Grade B"
+
+    def test_document_evidence_ranges(self):
+        """Test that per-section summaries only see matches inside the range."""
+        from src.utils.evidence import DocumentEvidence
+
+        first = "Class IIa, Level of Evidence: C-LD"
+        second = "No grade here, although evidence a clinician sees may vary"
+        evidence = DocumentEvidence(first + "\n" + second)
+
+        assert evidence.summary(0, len(first)) == ("C", "AHA/ACC", "Class IIa, Level C-LD")
+        assert evidence.summary(len(first) + 1, len(first) + 1 + len(second)) == (
+            None, None, None
+        )
+
 
 class TestDateExtraction:
     """Test date extraction functionality."""
@@ -86,3 +255,19 @@ class TestDateExtraction:
         assert parse_date("05/10/2023") == "2023-05-10"  # MM/DD/YYYY format
         assert parse_date("invalid date") is None
         assert parse_date("") is None
+
+    def test_fast_path_formats(self):
+        """Test that regex fast paths agree with the dateutil fallback."""
+        from src.utils import dates
+
+        assert dates.parse_date("2023-05-10T09:30:00Z") == "2023-05-10"
+        assert dates.parse_date("10 May 2023") == "2023-05-10"
+        assert dates.parse_date("Sept 5,  2021") == "2021-09-05"
+        assert dates.parse_date("2023-02-30") is None
+        assert dates.parse_date("May 10, 1850") is None
+
+        dates._parse_fuzzy.cache_clear()
+        assert dates.parse_date("Published  May 10, 2023") == "2023-05-10"
+        assert dates.parse_date("Published May 10,  2023") == "2023-05-10"
+        info = dates._parse_fuzzy.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
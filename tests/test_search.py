@@ -0,0 +1,1043 @@
+"""Tests for the BM25 search index."""
+
+import json
+
+import random
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from src.search.bm25_index import BM25SectionIndex, SectionRef, tokenize
+from src.search.cache import QueryCache
+from src.search.filters import FilterColumns, SearchFilter
+from src.search.index_store import IndexFormatError, MappedBM25Index
+from src.search.inverted import InvertedIndex, select_top_k
+from src.search.sections import SectionTable
+from src.search.segments import SegmentedIndex
+from src.search.sharded import shard_bounds
+from src.search.tokenizer import Tokenizer, Vocabulary
+
+SECTION_TEXTS = [
+    "ACE inhibitors are recommended in heart failure with reduced ejection fraction.",
+    "Beta blockers reduce mortality in heart failure. Class I, Level A.",
+    "Statin therapy for primary prevention in adults with elevated LDL cholesterol.",
+    "Lifestyle modifications including exercise and sodium restriction.",
+    "Device therapy with an ICD is reasonable for selected patients.",
+    "Blood pressure targets for hypertension management in older adults.",
+    "Anticoagulation in atrial fibrillation with elevated stroke risk.",
+    "SGLT2 inhibitors improve outcomes in heart failure regardless of diabetes.",
+]
+
+
+def _sections():
+    return [
+        SectionRef(
+            doc_id=f"doc-{i // 3}",
+            title=f"Guideline {i // 3}",
+            source="AHA/ACC" if i % 2 else "NICE",
+            section_heading=f"Section {i}",
+            section_level=1 + i % 3,
+            publication_date="2023-05-10",
+            last_updated=None,
+            text=text,
+        )
+        for i, text in enumerate(SECTION_TEXTS)
+    ]
+
+
+def _write_jsonl(path, sections):
+    with open(path, "w", encoding="utf-8") as f:
+        for ref in sections:
+            record = {
+                "id": ref.doc_id,
+                "title": ref.title,
+                "source": ref.source,
+                "publication_date": ref.publication_date,
+                "last_updated": ref.last_updated,
+                "sections": [
+                    {
+                        "heading": ref.section_heading,
+                        "level": ref.section_level,
+                        "text": ref.text,
+                    }
+                ],
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def _random_corpus(n_docs, seed=7):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(40)] + ["common"] * 20
+    return [rng.choices(words, k=rng.randint(0, 30)) for _ in range(n_docs)]
+
+
+class TestInvertedIndex:
+    """Test the native inverted-index BM25 scorer."""
+
+    def test_scores_match_bm25okapi(self):
+        """Test exact score parity with rank_bm25, including negative IDF."""
+        corpus = _random_corpus(200)
+        okapi = BM25Okapi(corpus)
+        index = InvertedIndex.build(corpus)
+
+        for query in (["w1", "w2", "w1"], ["common"], ["common", "w39", "nope"]):
+            expected = okapi.get_scores(query)
+            ids, scores = index.get_scores(query)
+            assert np.array_equal(scores, expected[ids])
+            untouched = np.setdiff1d(np.arange(len(corpus)), ids)
+            assert not expected[untouched].any()
+
+    def test_top_k_matches_full_sort(self):
+        """Test that partial selection matches a stable full sort."""
+        corpus = _random_corpus(300, seed=3)
+        okapi = BM25Okapi(corpus)
+        index = InvertedIndex.build(corpus)
+        query = ["w5", "w6", "w7"]
+
+        ids, scores = index.top_k(query, 10)
+
+        expected = okapi.get_scores(query)
+        ranked = sorted(range(len(corpus)), key=lambda i: expected[i], reverse=True)
+        assert ids.tolist() == ranked[:10]
+        assert scores.tolist() == expected[ranked[:10]].tolist()
+
+    def test_select_top_k_keeps_ties_in_id_order(self):
+        """Test tie-breaking at the cut-off score."""
+        ids = np.array([9, 4, 7, 1])
+        scores = np.array([1.0, 2.0, 1.0, 1.0])
+        top_ids, _ = select_top_k(ids, scores, 3)
+        assert top_ids.tolist() == [4, 1, 7]
+
+
+class TestTokenizer:
+    """Test the shared tokenizer and vocabulary."""
+
+    def test_ids_share_one_vocabulary(self):
+        """Test that indexing adds terms and query lookups never do."""
+        tokenizer = Tokenizer()
+        vocab = Vocabulary()
+
+        assert tokenizer.tokens("ACE-Inhibitor, ACE inhibitor") == [
+            "ace-inhibitor",
+            "ace",
+            "inhibitor",
+        ]
+        assert tokenizer.ids("Heart failure heart", vocab).tolist() == [0, 1, 0]
+        assert tokenizer.term_ids("failure HEART zebra", vocab) == [1, 0]
+        assert len(vocab) == 2
+        # Capital sigma lowers by position, so it is lowered token by token
+        assert tokenizer.tokens("ΟΔΟΣ ΣΑ") == tokenize("ΟΔΟΣ ΣΑ") == ["οδος", "σα"]
+
+    def test_medical_normalization_is_stored_with_index(self, tmp_path):
+        """Test medical matching in memory and through a saved index."""
+        medical = Tokenizer(medical=True)
+        assert medical.tokens("β-Blocker and ACE-inhibitor/ARB") == [
+            "beta",
+            "blocker",
+            "and",
+            "ace",
+            "inhibitor",
+            "arb",
+        ]
+
+        refs = _sections()
+        refs[0].text = "An ACE-inhibitor is recommended."
+        refs[1].text = "Start a β-blocker after stabilization."
+        default = BM25SectionIndex(refs)
+        index = BM25SectionIndex(refs, tokenizer=medical)
+        assert default.search("ACE inhibitor", k=1) == []
+        assert index.search("ACE inhibitor", k=1)[0]["section_heading"] == "Section 0"
+
+        path = tmp_path / "guidelines.idx"
+        index.save(str(path))
+        mapped = MappedBM25Index(str(path))
+        assert mapped.tokenizer.medical
+        results = mapped.search("beta blocker", k=1)
+        assert results[0]["section_heading"] == "Section 1"
+        mapped.close()
+
+
+class TestPersistentIndex:
+    """Test saving and memory-mapping a BM25 index."""
+
+    def test_mapped_scores_match_in_memory(self, tmp_path):
+        """Test that the mapped index reproduces in-memory BM25 scores."""
+        index = BM25SectionIndex(_sections())
+        path = tmp_path / "guidelines.idx"
+        index.save(str(path))
+
+        mapped = MappedBM25Index(str(path))
+        assert len(mapped) == len(SECTION_TEXTS)
+
+        query = "heart failure inhibitors heart"
+        expected = BM25Okapi([tokenize(t) for t in SECTION_TEXTS]).get_scores(
+            tokenize(query)
+        )
+        ids, scores = mapped.index.get_scores(tokenize(query))
+        assert ids.tolist() == [0, 1, 7]
+        assert scores.tolist() == pytest.approx(expected[ids].tolist(), abs=0)
+
+        results = mapped.search(query, k=2)
+        assert [r["section_heading"] for r in results] == [
+            r["section_heading"] for r in index.search(query, k=2)
+        ]
+        assert results[0]["doc_id"] == "doc-2"
+        assert results[0]["snippet"] == SECTION_TEXTS[7]
+        mapped.close()
+
+    def test_unknown_terms_return_nothing(self, tmp_path):
+        """Test that a query with no indexed terms returns no results."""
+        path = tmp_path / "guidelines.idx"
+        BM25SectionIndex(_sections()).save(str(path))
+        assert MappedBM25Index(str(path)).search("zebra", k=5) == []
+
+    def test_rejects_non_index_file(self, tmp_path):
+        """Test that opening a non-index file raises a format error."""
+        path = tmp_path / "bogus.idx"
+        path.write_bytes(b"not an index at all, just some bytes")
+        with pytest.raises(IndexFormatError):
+            MappedBM25Index(str(path))
+
+    def test_cli_build_then_search(self, tmp_path, monkeypatch, capsys):
+        """Test `clinical-index build` followed by `clinical-search --index`."""
+        from src.cli import index as index_cli
+        from src.cli import search as search_cli
+
+        jsonl = tmp_path / "guidelines.jsonl"
+        idx = tmp_path / "guidelines.idx"
+        _write_jsonl(jsonl, _sections())
+
+        monkeypatch.setattr(
+            "sys.argv",
+            ["clinical-index", "build", "--jsonl", str(jsonl), "--out", str(idx)],
+        )
+        index_cli.main()
+        capsys.readouterr()
+
+        monkeypatch.setattr(
+            "sys.argv",
+            ["clinical-search", "--index", str(idx), "--query", "statin", "--k", "3"],
+        )
+        search_cli.main()
+        results = json.loads(capsys.readouterr().out)["results"]
+        assert [r["section_heading"] for r in results] == ["Section 2"]
+
+
+class TestSectionTable:
+    """Test the compact section store."""
+
+    def test_rows_round_trip(self):
+        """Test that rows read back equal the refs appended."""
+        refs = _sections()
+        for ref in refs:
+            ref.source = "NICE"
+        refs[1].text = None
+        refs[1].offset = 4096
+        refs[1].position = 3
+        refs[2].evidence_grade = "A"
+        refs[3].text = "caf\u00e9 \u2265 190 mg/dL"
+        table = SectionTable.from_refs(refs)
+
+        assert len(table) == len(refs)
+        assert list(table) == refs
+        assert table[-1] == refs[-1]
+        assert table[2:4] == refs[2:4]
+        assert table.text(1) is None
+        # Three sections per document in _sections(), stored once each
+        assert table.doc_ids == ["doc-0", "doc-1", "doc-2"]
+        assert len(table.text_buffer) == sum(
+            len(r.text.encode("utf-8")) for r in refs if r.text is not None
+        )
+
+    def test_filter_columns_match_per_row_build(self):
+        """Test that the columnar filter build equals the row-by-row one."""
+        refs = _sections()
+        for i, ref in enumerate(refs):
+            ref.evidence_grade = ["A", "b", None, "B"][i % 4]
+        refs[4].last_updated = "2024-01"
+        table = SectionTable.from_refs(refs)
+
+        fast = FilterColumns.from_sections(table)
+        slow = FilterColumns.from_sections(refs)
+
+        for name in ("source_codes", "dates", "levels", "grade_codes"):
+            assert getattr(fast, name).tolist() == getattr(slow, name).tolist()
+        assert fast.grades.values == slow.grades.values == ["A", "b"]
+        f = SearchFilter(grades=["B"], date_from="2024")
+        assert fast.mask(f).tolist() == slow.mask(f).tolist()
+
+
+class TestShardedIndex:
+    """Test sharded builds and scatter-gather search."""
+
+    def test_shards_match_unsharded_scores(self, tmp_path):
+        """Test identical results, filters and saved files for 1 and N shards."""
+        jsonl = tmp_path / "guidelines.jsonl"
+        rng = random.Random(5)
+        with open(jsonl, "w", encoding="utf-8") as f:
+            for d, tokens in enumerate(_random_corpus(60)):
+                record = {
+                    "id": f"doc-{d}",
+                    "source": "NICE" if d % 3 else "AHA/ACC",
+                    "sections": [
+                        {
+                            "heading": f"S{j}",
+                            "level": 1 + j,
+                            "text": " ".join(tokens[j::2]),
+                        }
+                        for j in range(rng.randint(0, 2))
+                    ],
+                }
+                f.write(json.dumps(record) + "\n")
+
+        single = BM25SectionIndex.from_jsonl(str(jsonl))
+        sharded = BM25SectionIndex.from_jsonl(str(jsonl), shards=4, workers=2)
+        assert len(sharded.index.shards) == 4
+        assert list(sharded.sections) == list(single.sections)
+
+        queries = ["w1 w2", "common w7 common", "w39", "nothing"]
+        only_nice = SearchFilter(sources=["nice"], levels=[2])
+        for q in queries:
+            assert sharded.search(q, k=6) == single.search(q, k=6)
+            assert sharded.search(q, k=3, filters=only_nice) == single.search(
+                q, k=3, filters=only_nice
+            )
+        assert sharded.search_many(queries, k=4) == single.search_many(queries, k=4)
+
+        in_memory = BM25SectionIndex(_sections(), shards=3)
+        expected = BM25SectionIndex(_sections()).search("heart failure", k=3)
+        assert in_memory.search("heart failure", k=3) == expected
+
+        path = tmp_path / "sharded.idx"
+        sharded.save(str(path))
+        mapped = MappedBM25Index(str(path))
+        for q in queries:
+            assert mapped.search(q, k=6) == single.search(q, k=6)
+        mapped.close()
+        sharded.index.close()
+
+    def test_shard_bounds_keep_documents_whole(self):
+        """Test that shard boundaries fall between documents."""
+        doc = [0, 0, 0, 1, 2, 2, 2, 2, 3]
+        assert shard_bounds(doc, 3) == [0, 3, 8, 9]
+        assert shard_bounds([0] * 5, 4) == [0, 5]
+        assert shard_bounds([], 2) == [0, 0]
+
+
+class TestSegmentedIndex:
+    """Test incremental updates to a segment directory."""
+
+    @staticmethod
+    def _record(d, tokens, source="NICE"):
+        return {
+            "id": f"doc-{d}",
+            "title": f"Guideline {d}",
+            "source": source,
+            "sections": [
+                {"heading": f"S{j}", "level": 1 + j, "text": " ".join(tokens[j::2])}
+                for j in range(2)
+            ],
+        }
+
+    @staticmethod
+    def _scores(index, query):
+        return {
+            (r["doc_id"], r["section_heading"]): r["score"]
+            for r in index.search(query, k=1000)
+        }
+
+    def test_updates_match_full_rebuild(self, tmp_path):
+        """Test that synced, replaced and removed documents score like a rebuild."""
+        corpus = _random_corpus(80)
+        records = {d: self._record(d, tokens) for d, tokens in enumerate(corpus[:40])}
+        jsonl = tmp_path / "guidelines.jsonl"
+
+        def write():
+            with open(jsonl, "w", encoding="utf-8") as f:
+                for record in records.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        write()
+        index = SegmentedIndex.create(str(tmp_path / "idx"))
+        assert index.sync_jsonl(str(jsonl))["added"] == 40
+        for day in range(3):
+            for d in range(day, 40, 9):
+                records[d] = self._record(d, corpus[79 - d], source="AHA/ACC")
+            del records[day + 3]
+            records[40 + day] = self._record(40 + day, corpus[40 + day])
+            write()
+            counts = index.sync_jsonl(str(jsonl))
+            assert (counts["added"], counts["replaced"], counts["removed"]) == (1, 5, 1)
+
+        rebuilt = BM25SectionIndex.from_jsonl(str(jsonl))
+        reopened = SegmentedIndex(str(tmp_path / "idx"))
+        assert len(reopened) == len(rebuilt.sections)
+        assert len(reopened.segment_names) == 4
+        only_aha = SearchFilter(sources=["aha/acc"], levels=[2])
+        for q in ["w1 w2", "common w7 common", "w39", "nothing"]:
+            expected = self._scores(rebuilt, q)
+            # Only the negative-IDF floor is summed in a different order
+            assert self._scores(reopened, q) == pytest.approx(expected, rel=1e-12)
+            assert reopened.search(q, k=3, filters=only_aha) == rebuilt.search(
+                q, k=3, filters=only_aha
+            )
+
+        assert reopened.merge()
+        assert len(reopened.segment_names) == 1
+        assert sorted(p.name for p in (tmp_path / "idx").iterdir()) == [
+            reopened.segment_names[0],
+            "segments.json",
+        ]
+        assert self._scores(reopened, "w1 w2") == pytest.approx(
+            self._scores(rebuilt, "w1 w2"), rel=1e-12
+        )
+        assert index.sync_jsonl(str(jsonl)) == {
+            "added": 0,
+            "replaced": 0,
+            "removed": 0,
+            "unchanged": len(records),
+        }
+        reopened.close()
+        index.close()
+
+    def test_add_replace_remove(self, tmp_path):
+        """Test the document-level API and its on-disk persistence."""
+        index = SegmentedIndex.create(str(tmp_path / "idx"))
+        index.add_documents([self._record(0, ["statin", "statin", "therapy"])])
+        index.add_documents([self._record(1, ["heart", "failure", "statin"])])
+        with pytest.raises(ValueError):
+            index.add_documents([self._record(0, ["again"])])
+        assert {r["doc_id"] for r in index.search("statin", k=5)} == {
+            "doc-0",
+            "doc-1",
+        }
+
+        index.replace_documents([self._record(0, ["heart", "block"])])
+        assert [r["doc_id"] for r in index.search("statin", k=5)] == ["doc-1"]
+        assert index.remove_documents(["doc-1", "doc-9"]) == 1
+        generation = index.generation
+
+        reopened = SegmentedIndex(str(tmp_path / "idx"))
+        assert reopened.generation == generation
+        assert reopened.search("statin", k=5) == []
+        assert [r["section_heading"] for r in reopened.search("block", k=5)] == ["S1"]
+        assert sorted(reopened.documents) == ["doc-0"]
+        # Segments left without live sections are dropped
+        assert len(reopened.segment_names) == 1
+        reopened.close()
+        index.close()
+
+    def test_sync_ingest_output(self, tmp_path, monkeypatch, capsys):
+        """Test that documents written by `clinical-ingest` are synced one by one."""
+        from src.cli import ingest as ingest_cli
+
+        src_dir = tmp_path / "in"
+        (src_dir / "hf").mkdir(parents=True)
+        page = "<html><head><title>{0}</title></head><body><h2>{0}</h2><p>{1}</p>"
+
+        def write(name, title, body):
+            (src_dir / name).write_text(page.format(title, body), encoding="utf-8")
+
+        def ingest():
+            argv = ["clinical-ingest", "--input", str(src_dir), "--output"]
+            monkeypatch.setattr("sys.argv", argv + [str(tmp_path / "out")])
+            ingest_cli.main()
+            capsys.readouterr()
+            return str(tmp_path / "out" / "guidelines.jsonl")
+
+        write("statins.html", "Statins", "Statin therapy for primary prevention.")
+        write("hf/acei.html", "ACE", "ACE inhibitors in heart failure.")
+        write("hf/beta.html", "Beta", "Beta blockers reduce mortality.")
+        index = SegmentedIndex.create(str(tmp_path / "idx"))
+        assert index.sync_jsonl(ingest())["added"] == 3
+        assert sorted(index.documents) == [
+            "hf/acei.html",
+            "hf/beta.html",
+            "statins.html",
+        ]
+
+        write("afib.html", "AF", "Anticoagulation in atrial fibrillation.")
+        write("hf/beta.html", "Beta", "Beta blockers reduce mortality. Class I.")
+        (src_dir / "statins.html").unlink()
+        assert index.sync_jsonl(ingest()) == {
+            "added": 1,
+            "replaced": 1,
+            "removed": 1,
+            "unchanged": 1,
+        }
+        assert index.search("statin", k=5) == []
+        hits = index.search("mortality anticoagulation", k=5)
+        assert sorted(r["doc_id"] for r in hits) == ["afib.html", "hf/beta.html"]
+        index.close()
+
+    def test_records_need_ids(self, tmp_path):
+        """Test that records without an id are rejected, not merged into one."""
+        jsonl = tmp_path / "guidelines.jsonl"
+        record = self._record(0, ["statin"])
+        record["id"] = None
+        jsonl.write_text(json.dumps(record) + "\n", encoding="utf-8")
+        index = SegmentedIndex.create(str(tmp_path / "idx"))
+        with pytest.raises(ValueError, match="no id"):
+            index.sync_jsonl(str(jsonl))
+        with pytest.raises(ValueError, match="no id"):
+            index.add_documents([record])
+        assert len(index) == 0
+        index.close()
+
+    def test_cli_update_then_search(self, tmp_path, monkeypatch, capsys):
+        """Test `clinical-index update` and `clinical-search` on a directory."""
+        from src.cli import index as index_cli
+        from src.cli import search as search_cli
+
+        jsonl = tmp_path / "guidelines.jsonl"
+        idx = tmp_path / "idx"
+        _write_jsonl(jsonl, _sections())
+        argv = ["clinical-index", "update", "--jsonl", str(jsonl), "--index", str(idx)]
+        monkeypatch.setattr("sys.argv", argv)
+        index_cli.main()
+        assert "Added 3, replaced 0, removed 0" in capsys.readouterr().out
+        index_cli.main()
+        assert "(3 unchanged)" in capsys.readouterr().out
+
+        monkeypatch.setattr(
+            "sys.argv",
+            ["clinical-search", "--index", str(idx), "--query", "statin", "--k", "3"],
+        )
+        search_cli.main()
+        results = json.loads(capsys.readouterr().out)["results"]
+        assert [r["section_heading"] for r in results] == ["Section 2"]
+
+
+class TestStreamingLoader:
+    """Test the streaming JSONL loader."""
+
+    def test_sections_hold_offsets_and_snippets_load_lazily(self, tmp_path):
+        """Test that loaded sections keep offsets and results read text back."""
+        jsonl = tmp_path / "guidelines.jsonl"
+        records = [
+            {
+                "id": "hf",
+                "title": "Heart Failure",
+                "sections": [
+                    {"heading": "Empty", "level": 1, "text": "   "},
+                    {"heading": "Drugs", "level": 2, "text": SECTION_TEXTS[0]},
+                    {"heading": "Beta", "level": 2, "text": SECTION_TEXTS[1]},
+                ],
+            },
+            {"id": "lipids", "sections": [{"text": "Statins for LDL ≥ 190 mg/dL."}]},
+        ]
+        jsonl.write_text(
+            "\n".join(json.dumps(r, ensure_ascii=False) for r in records) + "\n\n",
+            encoding="utf-8",
+        )
+
+        index = BM25SectionIndex.from_jsonl(str(jsonl))
+
+        assert [s.text for s in index.sections] == [None, None, None]
+        assert [(s.offset, s.position) for s in index.sections][:2] == [(0, 1), (0, 2)]
+        assert list(index.iter_texts())[2] == "Statins for LDL ≥ 190 mg/dL."
+
+        eager = BM25SectionIndex(
+            [
+                SectionRef("", None, None, None, 1, None, None, text=text)
+                for text in index.iter_texts()
+            ]
+        )
+        results = index.search("beta blockers heart failure", k=2)
+        assert [r["score"] for r in results] == [
+            r["score"] for r in eager.search("beta blockers heart failure", k=2)
+        ]
+        assert results[0]["section_heading"] == "Beta"
+        assert results[0]["snippet"] == SECTION_TEXTS[1]
+
+    def test_missing_file_gives_empty_index(self, tmp_path):
+        """Test that a missing JSONL file yields an empty index."""
+        index = BM25SectionIndex.from_jsonl(str(tmp_path / "missing.jsonl"))
+        assert index.search("anything") == []
+
+
+class TestBatchSearch:
+    """Test batched multi-query search."""
+
+    def test_search_many_matches_single_queries(self):
+        """Test that batched results equal one-at-a-time results."""
+        index = BM25SectionIndex(_sections())
+        queries = ["heart failure", "zebra", "statin ldl statin", "heart", ""]
+
+        batched = index.search_many(queries, k=3)
+
+        assert batched == [index.search(q, k=3) for q in queries]
+        assert batched[1] == [] and batched[4] == []
+
+    def test_grouped_and_threaded_batches(self, monkeypatch):
+        """Test small query groups and worker threads give identical scores."""
+        corpus = _random_corpus(150, seed=11)
+        index = InvertedIndex.build(corpus)
+        rng = random.Random(5)
+        queries = [rng.sample(corpus[i], min(3, len(corpus[i]))) for i in range(40)]
+        expected = [index.top_k(q, 5) for q in queries]
+
+        monkeypatch.setattr("src.search.inverted.DENSE_BATCH_CELLS", 150 * 3)
+        for workers in (1, 4):
+            got = index.top_k_many(queries, 5, workers=workers)
+            for (ids, scores), (exp_ids, exp_scores) in zip(got, expected):
+                assert ids.tolist() == exp_ids.tolist()
+                assert scores.tolist() == exp_scores.tolist()
+
+    def test_cli_queries_file(self, tmp_path, monkeypatch, capsys):
+        """Test `clinical-search --queries-file` against a saved index."""
+        from src.cli import search as search_cli
+
+        idx = tmp_path / "guidelines.idx"
+        BM25SectionIndex(_sections()).save(str(idx))
+        queries = tmp_path / "queries.txt"
+        queries.write_text("statin\n\nICD device\n", encoding="utf-8")
+
+        monkeypatch.setattr(
+            "sys.argv",
+            [
+                "clinical-search",
+                "--index",
+                str(idx),
+                "--queries-file",
+                str(queries),
+                "--k",
+                "1",
+            ],
+        )
+        search_cli.main()
+        payload = json.loads(capsys.readouterr().out)["queries"]
+        assert [p["query"] for p in payload] == ["statin", "ICD device"]
+        assert [p["results"][0]["section_heading"] for p in payload] == [
+            "Section 2",
+            "Section 4",
+        ]
+
+
+class TestSearchServer:
+    """Test the warm-index HTTP server."""
+
+    def test_search_metrics_and_hot_swap(self, tmp_path):
+        """Test GET/POST search, metrics and swapping in a rebuilt index."""
+        import threading
+        import urllib.request
+
+        from src.search.server import IndexHolder, SearchServer
+
+        idx = tmp_path / "guidelines.idx"
+        BM25SectionIndex(_sections()).save(str(idx))
+        server = SearchServer(("127.0.0.1", 0), IndexHolder(str(idx)), 0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        def get(path):
+            with urllib.request.urlopen(base + path) as resp:
+                return json.loads(resp.read())
+
+        def post(body):
+            req = urllib.request.Request(
+                base + "/search",
+                data=json.dumps(body).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+            )
+            with urllib.request.urlopen(req) as resp:
+                return json.loads(resp.read())
+
+        try:
+            hits = get("/search?q=statin&k=2")
+            assert [r["section_heading"] for r in hits["results"]] == ["Section 2"]
+            assert hits["took_ms"] >= 0
+
+            batch = post({"queries": ["statin", "ICD"], "k": 1})
+            assert [q["results"][0]["section_heading"] for q in batch["queries"]] == [
+                "Section 2",
+                "Section 4",
+            ]
+
+            metrics = get("/metrics")
+            assert metrics["requests"] == 2
+            assert metrics["latency_ms"]["p50"] is not None
+            assert metrics["index"]["sections"] == len(SECTION_TEXTS)
+
+            rebuilt = _sections()[:2]
+            rebuilt[0].text = "Statin therapy is first line for LDL lowering."
+            BM25SectionIndex(rebuilt).save(str(idx))
+            assert server.holder.maybe_reload()
+            hits = get("/search?q=statin")
+            assert [r["section_heading"] for r in hits["results"]] == ["Section 0"]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestQueryCache:
+    """Test the search result cache."""
+
+    def test_lru_ttl_and_normalized_keys(self):
+        """Test hits on equivalent queries, LRU eviction and expiry."""
+        now = [0.0]
+        cache = QueryCache(max_entries=2, ttl=10, clock=lambda: now[0])
+        index = BM25SectionIndex(_sections())
+
+        first = cache.search(index, "Heart failure, beta-blockers", k=3)
+        assert cache.search(index, "heart FAILURE beta-blockers", k=3) is first
+        assert first == index.search("heart failure beta-blockers", k=3)
+        assert cache.search(index, "heart failure beta-blockers", k=2) is not first
+        nice = SearchFilter(sources=["NICE"])
+        cache.search(index, "heart failure", k=3, filters=nice)
+        assert cache.stats()["evictions"] == 1
+        # The k=3 entry was least recently used and has been evicted
+        assert cache.search(index, "heart failure beta-blockers", k=3) is not first
+        assert cache.search(
+            index, "heart failure", k=3, filters=SearchFilter(sources=["nice"])
+        ) == index.search("heart failure", k=3, filters=nice)
+
+        now[0] = 11.0
+        cache.search(index, "heart failure", k=3, filters=nice)
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["expirations"]) == (2, 5, 1)
+        assert stats["entries"] == 2
+
+        batch = cache.search_many(index, ["statin", "ICD", "statin"], k=1)
+        assert batch == index.search_many(["statin", "ICD", "statin"], k=1)
+
+    def test_invalidated_when_index_changes(self, tmp_path):
+        """Test that updating a segmented index drops cached results."""
+        cache = QueryCache()
+        index = SegmentedIndex.create(str(tmp_path / "idx"))
+        index.add_documents(
+            [{"id": "a", "sections": [{"heading": "H", "text": "statin therapy"}]}]
+        )
+        assert [r["doc_id"] for r in cache.search(index, "statin")] == ["a"]
+        assert cache.search(index, "statin") == cache.search(index, "statin")
+        index.remove_documents(["a"])
+        assert cache.search(index, "statin") == []
+        assert cache.stats()["invalidations"] == 1
+        index.close()
+
+    def test_server_cache_follows_hot_swap(self, tmp_path):
+        """Test cached server responses, cache metrics and reload invalidation."""
+        import threading
+        import urllib.request
+
+        from src.search.server import IndexHolder, SearchServer
+
+        idx = tmp_path / "guidelines.idx"
+        BM25SectionIndex(_sections()).save(str(idx))
+        server = SearchServer(("127.0.0.1", 0), IndexHolder(str(idx)), 0, QueryCache())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        def get(path):
+            with urllib.request.urlopen(base + path) as resp:
+                return json.loads(resp.read())
+
+        try:
+            assert get("/search?q=statin")["results"][0]["section_heading"] == (
+                "Section 2"
+            )
+            get("/search?q=Statin")
+            assert get("/metrics")["cache"]["hits"] == 1
+
+            rebuilt = _sections()[:2]
+            rebuilt[0].text = "Statin therapy is first line for LDL lowering."
+            BM25SectionIndex(rebuilt).save(str(idx))
+            assert server.holder.maybe_reload()
+            hits = get("/search?q=statin")
+            assert [r["section_heading"] for r in hits["results"]] == ["Section 0"]
+            assert get("/metrics")["cache"]["invalidations"] == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def _filterable_sections():
+    sections = _sections()
+    for i, ref in enumerate(sections):
+        ref.last_updated = ["2021-06-01", "2023-02-15", None][i % 3]
+        ref.evidence_grade = "A" if i % 2 else "B"
+    return sections
+
+
+class TestSearchFilters:
+    """Test structured filters applied before scoring."""
+
+    def test_filters_restrict_candidates(self):
+        """Test source, grade, level and date filters on the in-memory index."""
+        from src.search.filters import SearchFilter
+
+        index = BM25SectionIndex(_filterable_sections())
+        query = "heart failure inhibitors"
+
+        aha = index.search(query, k=10, filters=SearchFilter(sources=["aha/acc"]))
+        assert sorted(r["section_heading"] for r in aha) == ["Section 1", "Section 7"]
+        assert {r["evidence_grade"] for r in aha} == {"A"}
+
+        old = index.search(query, k=10, filters=SearchFilter(date_to="2022"))
+        assert [r["section_heading"] for r in old] == ["Section 0"]
+        # Section 2 has no last_updated and falls back to publication_date
+        recent = index.search("statin", k=10, filters=SearchFilter(date_from="2023"))
+        assert [r["section_heading"] for r in recent] == ["Section 2"]
+
+        graded = index.search(
+            query, k=10, filters=SearchFilter(grades=["b"], levels=[1])
+        )
+        assert [r["section_heading"] for r in graded] == ["Section 0"]
+
+    def test_filtered_scores_equal_unfiltered_scores(self):
+        """Test that filtering changes the candidates, not their scores."""
+        from src.search.filters import SearchFilter
+
+        index = BM25SectionIndex(_filterable_sections())
+        full = {r["section_heading"]: r["score"] for r in index.search("heart", k=10)}
+        filtered = index.search("heart", k=10, filters=SearchFilter(levels=[2]))
+        assert filtered
+        for r in filtered:
+            assert r["score"] == full[r["section_heading"]]
+
+    def test_mapped_index_and_cli_flags(self, tmp_path, monkeypatch, capsys):
+        """Test that filter columns persist and the CLI flags reach them."""
+        from src.cli import search as search_cli
+        from src.search.filters import SearchFilter
+
+        idx = tmp_path / "guidelines.idx"
+        sections = _filterable_sections()
+        BM25SectionIndex(sections).save(str(idx))
+        mapped = MappedBM25Index(str(idx))
+        f = SearchFilter(sources=["NICE"], date_to="2021-12")
+        expected = BM25SectionIndex(sections).search("heart failure", k=5, filters=f)
+        assert mapped.search("heart failure", k=5, filters=f) == expected
+
+        monkeypatch.setattr(
+            "sys.argv",
+            [
+                "clinical-search",
+                "--index",
+                str(idx),
+                "--query",
+                "heart failure",
+                "--grade",
+                "A",
+                "--date-from",
+                "2023-01-01",
+            ],
+        )
+        search_cli.main()
+        results = json.loads(capsys.readouterr().out)["results"]
+        assert sorted(r["section_heading"] for r in results) == [
+            "Section 1",
+            "Section 7",
+        ]
+
+    def test_invalid_date_bound(self):
+        """Test that malformed date bounds are rejected."""
+        from src.search.filters import SearchFilter
+
+        with pytest.raises(ValueError):
+            SearchFilter.from_params({"date_from": "last year"})
+        assert SearchFilter.from_params({"source": None, "level": []}) is None
+
+
+def _long_records():
+    filler = " ".join(f"w{i}" for i in range(40))
+    return [
+        {
+            "id": "doc-0",
+            "title": "Heart failure",
+            "source": "NICE",
+            "sections": [
+                {"heading": "Treatment", "level": 1, "text": ""},
+                {
+                    "heading": "Drugs",
+                    "level": 2,
+                    # Every passage mentions statins; the last one SGLT2
+                    "text": " ".join(["statin w1 w2."] * 40 + ["SGLT2 inhibitors."]),
+                },
+                {"heading": "Devices", "level": 2, "text": f"ICD therapy. {filler}"},
+            ],
+        },
+        {
+            "id": "doc-1",
+            "title": "Lipids",
+            "source": "AHA/ACC",
+            "sections": [
+                {"heading": "Statins", "level": 1, "text": f"{filler} statin."},
+            ],
+        },
+    ]
+
+
+class TestPassageChunking:
+    """Test indexing token-budgeted passages and collapsing them to sections."""
+
+    def test_windows_fit_budget_and_overlap(self):
+        """Test balanced windows that cover the text and share overlap tokens."""
+        from src.search.chunking import Chunker
+
+        tokenizer = Tokenizer()
+        text = " ".join(str(i) for i in range(25)) + "."
+        for overlap, count, size in ((0, 3, 9), (3, 4, 9), (9, 16, 10)):
+            windows = Chunker(10, overlap).windows(text, tokenizer)
+            tokens = [[int(t) for t in tokenizer.tokens(text[a:b])] for a, b in windows]
+            assert (len(windows), {len(t) for t in tokens}) == (count, {size})
+            assert windows[0][0] == 0 and windows[-1][1] == len(text)
+            assert tokens[0][0] == 0 and tokens[-1][-1] == 24
+            for before, after in zip(tokens, tokens[1:]):
+                assert after[0] <= before[-1] + 1 - overlap
+        assert Chunker(10).windows("short text", tokenizer) == [(0, 10)]
+        with pytest.raises(ValueError):
+            Chunker(10, overlap=10)
+
+    def test_results_collapse_to_best_passage(self, tmp_path):
+        """Test one result per section with its passage, offsets and path."""
+        from src.search.chunking import Chunker
+
+        records = _long_records()
+        index = BM25SectionIndex.from_records(records, chunker=Chunker(16, 4))
+        assert len(index.sections) == 3
+        assert len(index.passages) == 10 + 4 + 4
+
+        # The passages of "Drugs" fill the first fetch, so the other section
+        # is only found by fetching more passages
+        results = index.search("statin", k=2)
+        assert [r["section_heading"] for r in results] == ["Drugs", "Statins"]
+        top = results[0]
+        assert top["heading_path"] == ["Treatment", "Drugs"]
+        text = records[0]["sections"][1]["text"]
+        assert top["snippet"] == text[top["char_start"] : top["char_end"]]
+        assert "statin" in top["snippet"]
+
+        sglt2 = index.search("SGLT2", k=5)
+        assert len(sglt2) == 1 and sglt2[0]["char_end"] == len(text)
+        assert sglt2[0]["snippet"].endswith("SGLT2 inhibitors.")
+
+        only_aha = SearchFilter(sources=["AHA/ACC"])
+        assert [r["doc_id"] for r in index.search("statin", 5, only_aha)] == ["doc-1"]
+        queries = ["statin", "ICD therapy", "SGLT2", "zebra"]
+        assert index.search_many(queries, k=2) == [index.search(q, 2) for q in queries]
+
+        jsonl = tmp_path / "guidelines.jsonl"
+        jsonl.write_text("".join(json.dumps(r) + "\n" for r in records))
+        for shards in (1, 2):
+            streamed = BM25SectionIndex.from_jsonl(
+                str(jsonl), shards=shards, workers=1, chunker=Chunker(16, 4)
+            )
+            for q in queries:
+                assert streamed.search(q, k=3) == index.search(q, k=3)
+
+        path = tmp_path / "passages.idx"
+        index.save(str(path))
+        mapped = MappedBM25Index(str(path))
+        assert mapped.chunker.to_params() == {"max_tokens": 16, "overlap": 4}
+        for q in queries:
+            assert mapped.search(q, k=3) == index.search(q, k=3)
+        assert mapped.search("statin", 5, only_aha) == index.search(
+            "statin", 5, only_aha
+        )
+        mapped.close()
+
+    def test_section_table_passages(self, tmp_path):
+        """Test that passages built from a section table match the JSONL build."""
+        pytest.importorskip("pyarrow")
+        from src.guidelines.columnar import SectionTableWriter
+        from src.search.chunking import Chunker
+
+        records = _long_records()
+        table = str(tmp_path / "sections.parquet")
+        with SectionTableWriter(table) as writer:
+            for record in records:
+                writer.add(record)
+        columnar = BM25SectionIndex.from_table(table, chunker=Chunker(16))
+        expected = BM25SectionIndex.from_records(records, chunker=Chunker(16))
+        for q in ("statin ICD", "SGLT2"):
+            assert columnar.search(q, k=3) == expected.search(q, k=3)
+
+    def test_table_heading_paths_per_document(self, tmp_path, monkeypatch, capsys):
+        """Test that table heading paths restart with each ingested document."""
+        pytest.importorskip("pyarrow")
+        from src.cli import ingest as ingest_cli
+        from src.guidelines.columnar import SectionTableWriter
+        from src.search.chunking import Chunker
+
+        src_dir = tmp_path / "in"
+        src_dir.mkdir()
+        (src_dir / "a.html").write_text(
+            "<html><body><h1>Heart Failure Guideline</h1><p>Overview.</p>"
+            "<h2>Drugs</h2><p>ACE inhibitors.</p></body></html>",
+            encoding="utf-8",
+        )
+        (src_dir / "b.html").write_text(
+            "<html><body><h3>Screening</h3><p>Lipid screening.</p></body></html>",
+            encoding="utf-8",
+        )
+        for fmt in ("jsonl", "parquet"):
+            argv = ["clinical-ingest", "--input", str(src_dir), "--ordered"]
+            argv += ["--output", str(tmp_path / fmt), "--format", fmt]
+            monkeypatch.setattr("sys.argv", argv)
+            ingest_cli.main()
+        capsys.readouterr()
+        jsonl = tmp_path / "jsonl" / "guidelines.jsonl"
+        records = [json.loads(line) for line in jsonl.read_text().splitlines()]
+        # Tables written from records without ids have null doc_id on every row
+        anonymous = str(tmp_path / "anonymous.parquet")
+        with SectionTableWriter(anonymous) as writer:
+            for record in sorted(records, key=lambda r: r["id"]):
+                writer.add({**record, "id": None})
+
+        def paths(index):
+            results = index.search("inhibitors screening overview", k=5)
+            return {r["section_heading"]: r["heading_path"] for r in results}
+
+        expected = paths(BM25SectionIndex.from_jsonl(str(jsonl), chunker=Chunker(64)))
+        assert expected["Screening"] == ["Screening"]
+        assert expected["Drugs"] == ["Heart Failure Guideline", "Drugs"]
+        for table in (str(tmp_path / "parquet" / "guidelines.parquet"), anonymous):
+            assert paths(BM25SectionIndex.from_table(table, chunker=Chunker(64))) == (
+                expected
+            )
+
+    def test_cli_build_then_search(self, tmp_path, monkeypatch, capsys):
+        """Test --passage-tokens on `clinical-index build` and its stored setting."""
+        from src.cli import index as index_cli
+        from src.cli import search as search_cli
+        from src.search.chunking import Chunker
+
+        records = _long_records()
+        expected = BM25SectionIndex.from_records(records, chunker=Chunker(16))
+        jsonl = tmp_path / "guidelines.jsonl"
+        idx = tmp_path / "guidelines.idx"
+        jsonl.write_text("".join(json.dumps(r) + "\n" for r in records))
+        monkeypatch.setattr(
+            "sys.argv",
+            [
+                "clinical-index",
+                "build",
+                "--jsonl",
+                str(jsonl),
+                "--out",
+                str(idx),
+                "--passage-tokens",
+                "16",
+            ],
+        )
+        index_cli.main()
+        assert "Indexed 3 sections (" in capsys.readouterr().out
+
+        monkeypatch.setattr(
+            "sys.argv", ["clinical-search", "--index", str(idx), "--query", "ICD"]
+        )
+        search_cli.main()
+        results = json.loads(capsys.readouterr().out)["results"]
+        assert results == expected.search("ICD", k=5)
+        assert results[0]["heading_path"] == ["Treatment", "Devices"]
+
+        monkeypatch.setattr(
+            "sys.argv",
+            ["clinical-search", "--index", str(idx), "--query", "x"]
+            + ["--passage-tokens", "16"],
+        )
+        with pytest.raises(SystemExit):
+            search_cli.main()